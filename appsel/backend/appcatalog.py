@@ -0,0 +1,87 @@
+"""
+Searchable catalog of installed applications, shared by the app pickers.
+"""
+import collections
+import locale
+
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional
+
+from appsel.backend.fingerprint import get_media_type
+
+@dataclass
+class CatalogEntry:
+    """An application in the catalog, with the precomputed keys used to search and sort it."""
+    app_id: str
+    name: str
+    # Case-folded name and ID, to match search queries against
+    search_text: str
+    # Case-folded words of the name, for ranking word-prefix matches first
+    words: tuple
+    sort_key: str
+
+class AppCatalog():
+    """
+    Sorted, searchable list of the applications shown to the user.
+
+    Names, sort keys and search text are computed once when the catalog is built, so searching only does string
+    matching. Search results can be ranked for a MIME type, putting first the apps that already handle other types of
+    the same media type (e.g. video players for a video type). That ranking is cached per media type and invalidated
+    through the manager's change listeners, so one catalog can be shared by every picker for the manager's lifetime.
+    """
+    def __init__(self, manager):
+        self.manager = manager
+        desktop_entries = manager.desktop_entries
+        entries = []
+        for app_id in desktop_entries.entries:
+            if not desktop_entries.is_shown(app_id):
+                continue
+            name = desktop_entries.get_name(app_id)
+            folded_name = name.casefold()
+            entries.append(CatalogEntry(app_id, name, f'{folded_name}\0{app_id.casefold()}',
+                                        tuple(folded_name.split()), locale.strxfrm(folded_name)))
+        entries.sort(key=lambda entry: entry.sort_key)
+        self.entries: List[CatalogEntry] = entries
+        # Media type -> number of types of that media type each app handles
+        self._media_type_support: Dict[str, collections.Counter] = {}
+        manager.add_change_listener(self.invalidate)
+
+    def invalidate(self, mimetype: str):
+        """Drops the cached ranking for the media type of a changed MIME type."""
+        self._media_type_support.pop(get_media_type(mimetype), None)
+
+    def _get_media_type_support(self, media_type: str) -> collections.Counter:
+        try:
+            return self._media_type_support[media_type]
+        except KeyError:
+            snapshot = self.manager.snapshot()
+            prefix = media_type + '/'
+            support = collections.Counter()
+            for section in (snapshot.mimeinfo_cache, snapshot.added):
+                for mimetype, apps in section.items():
+                    if mimetype.startswith(prefix):
+                        support.update(set(apps))
+            self._media_type_support[media_type] = support
+            return support
+
+    def search(self, query: str = '', mimetype: Optional[str] = None,
+               within: Optional[Iterable[CatalogEntry]] = None) -> List[CatalogEntry]:
+        """
+        Returns the entries whose name or ID contains query (case insensitive), ranked for mimetype if given.
+
+        within restricts the search to a previous result, which is how type-ahead narrows down results as the query
+        grows: any entry matching "vl" must also have matched "v".
+        """
+        query = query.casefold().strip()
+        if within is None:
+            if not query and not mimetype:
+                return list(self.entries)
+            within = self.entries
+        entries = [entry for entry in within if query in entry.search_text]
+
+        support = self._get_media_type_support(get_media_type(mimetype)) if mimetype else collections.Counter()
+        def rank(entry: CatalogEntry):
+            match = 0 if entry.search_text.startswith(query) else \
+                1 if any(word.startswith(query) for word in entry.words) else 2
+            return -support[entry.app_id], match, entry.sort_key
+        return sorted(entries, key=rank)
@@ -0,0 +1,200 @@
+"""
+Ordered log of the changes a MimeTypesManager makes to the writable mimeapps.list, so that they can be exported as
+a delta and replayed on another machine without copying (and clobbering) the whole file.
+"""
+import enum
+import json
+import logging
+
+from dataclasses import dataclass, replace
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from appsel.backend.filesystem import REAL_FILESYSTEM, FileSystem
+from appsel.backend.snapshot import SECTION_ADDED, SECTION_DEFAULTS, SECTION_REMOVED
+
+class ChangeKind(enum.Enum):
+    """Mutations recorded in the change log."""
+    SET_DEFAULT = "set_default"
+    CLEAR_DEFAULT = "clear_default"
+    ADD_ASSOCIATION = "add_association"
+    REMOVE_ASSOCIATION = "remove_association"
+    DISABLE_ASSOCIATION = "disable_association"
+    ENABLE_ASSOCIATION = "enable_association"
+
+# Association changes: the mimeapps.list section each one edits, and whether it removes the app from the section
+ASSOCIATION_CHANGES = {
+    ChangeKind.ADD_ASSOCIATION: (SECTION_ADDED, False),
+    ChangeKind.REMOVE_ASSOCIATION: (SECTION_ADDED, True),
+    ChangeKind.DISABLE_ASSOCIATION: (SECTION_REMOVED, False),
+    ChangeKind.ENABLE_ASSOCIATION: (SECTION_REMOVED, True),
+}
+
+@dataclass(frozen=True)
+class Change:
+    """A single recorded mutation."""
+    sequence: int
+    kind: ChangeKind
+    mimetype: str
+    # The app set as default, or the app of an association change. None when clearing a default
+    app_id: Optional[str] = None
+    # For default changes: the user defined default before the change, to detect conflicting edits on replay
+    previous_app: Optional[str] = None
+
+    def __str__(self):
+        return f"#{self.sequence} {self.kind.value} {self.mimetype} {self.app_id or ''}".rstrip()
+
+    def get_key(self) -> Tuple[str, str, Optional[str]]:
+        """Returns what the change edits: (section, MIME type, app ID). Defaults are keyed by MIME type only."""
+        if self.kind in ASSOCIATION_CHANGES:
+            return ASSOCIATION_CHANGES[self.kind][0], self.mimetype, self.app_id
+        return SECTION_DEFAULTS, self.mimetype, None
+
+    def to_dict(self) -> dict:
+        """Returns the change as a JSON-serializable dict."""
+        return {'sequence': self.sequence, 'kind': self.kind.value, 'mimetype': self.mimetype,
+                'app_id': self.app_id, 'previous_app': self.previous_app}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Change':
+        """Returns a change from the output of to_dict(). Raises ValueError or KeyError if it is invalid."""
+        return cls(int(data['sequence']), ChangeKind(data['kind']), data['mimetype'],
+                   data.get('app_id'), data.get('previous_app'))
+
+def compact_changes(changes: Iterable[Change]) -> List[Change]:
+    """
+    Returns only the last change to each default and association, in order. Defaults keep the previous app from
+    before their first change, and defaults that ended where they started are dropped.
+    """
+    latest: Dict[Tuple[str, str, Optional[str]], Change] = {}
+    for change in changes:
+        key = change.get_key()
+        first = latest.pop(key, None)
+        if first is not None and change.kind not in ASSOCIATION_CHANGES:
+            change = replace(change, previous_app=first.previous_app)
+        # Reinserted, so that the dict stays ordered by each key's last change
+        latest[key] = change
+    return [change for change in latest.values()
+            if change.kind in ASSOCIATION_CHANGES or
+            change.previous_app != (change.app_id if change.kind is ChangeKind.SET_DEFAULT else None)]
+
+@dataclass
+class ChangeConflict:
+    """A change that wasn't replayed because it contradicts a local edit."""
+    change: Change
+    reason: str
+
+    def __str__(self):
+        return f"{self.change}: {self.reason}"
+
+@dataclass
+class DeltaResult:
+    """Outcome of replaying a delta: changes applied, already in effect, and conflicting with local edits."""
+    applied: List[Change]
+    unchanged: List[Change]
+    conflicts: List[ChangeConflict]
+
+def export_delta(changes: List[Change], since: int = 0) -> dict:
+    """Returns the compacted changes after sequence number since, as a JSON-serializable dict."""
+    delta = compact_changes(change for change in changes if change.sequence > since)
+    return {'since': since, 'last_sequence': changes[-1].sequence if changes else since,
+            'changes': [change.to_dict() for change in delta]}
+
+def load_delta(data: dict) -> List[Change]:
+    """Returns the changes in a delta from export_delta(). Raises ValueError if it is invalid."""
+    try:
+        return [Change.from_dict(change) for change in data['changes']]
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"invalid delta: {e!r}") from e
+
+# Arguments of ChangeLog.record(): kind, MIME type, app ID and previous app
+ChangeArguments = Tuple[ChangeKind, str, Optional[str], Optional[str]]
+
+class ChangeLog():
+    """
+    Changes stored as JSON lines, one per change, so that recording a change only appends a line. The file is read
+    the first time the log is used.
+
+    Several processes (e.g. the GUI and the daemon) may record changes to the same file. Recording holds a lock on
+    the file and first reads the lines other processes appended, so that sequence numbers stay unique.
+    """
+    def __init__(self, path: str, fs: FileSystem = REAL_FILESYSTEM):
+        self.path = path
+        self.fs = fs
+        self._changes: Optional[List[Change]] = None
+        # Bytes of the file that were read so far, and the number of lines in them
+        self._offset = 0
+        self._line_count = 0
+
+    def _read_new_changes(self):
+        """Helper: reads the complete lines appended to the file since it was last read."""
+        try:
+            data = self.fs.read_bytes(self.path)
+        except FileNotFoundError:
+            data = b''
+        if len(data) < self._offset:
+            # Replaced or truncated: start over
+            self._changes, self._offset, self._line_count = [], 0, 0
+        # A line that isn't terminated yet is still being written
+        end = data.rfind(b'\n', self._offset) + 1
+        if end <= self._offset:
+            return
+        for line in data[self._offset:end].decode('utf-8', errors='replace').splitlines():
+            self._line_count += 1
+            try:
+                self._changes.append(Change.from_dict(json.loads(line)))
+            except (ValueError, KeyError, TypeError):
+                logging.warning("Skipping invalid change on line %d of %s", self._line_count, self.path)
+        self._offset = end
+
+    @property
+    def changes(self) -> List[Change]:
+        """All recorded changes, in order."""
+        if self._changes is None:
+            self._changes = []
+            self._read_new_changes()
+        return self._changes
+
+    def get_last_sequence(self) -> int:
+        """Returns the sequence number of the last change, or 0 if there are none."""
+        return self.changes[-1].sequence if self.changes else 0
+
+    def record(self, kind: ChangeKind, mimetype: str, app_id: str = None, previous_app: str = None) -> Change:
+        """Appends a change to the log, and returns it."""
+        return self.record_all([(kind, mimetype, app_id, previous_app)])[0]
+
+    def record_all(self, changes: Iterable[ChangeArguments]) -> List[Change]:
+        """
+        Appends several changes (tuples of the arguments of record()) to the log at once, and returns them.
+
+        Changes should be recorded after they were written. If the log can't be written, the changes are only
+        numbered and returned, since the mimeapps.list was already updated.
+        """
+        changes = list(changes)
+        try:
+            with self.fs.lock(self.path):
+                if self._changes is None:
+                    self._changes = []
+                self._read_new_changes()
+                recorded = self._number_changes(changes)
+                text = ''.join(json.dumps(change.to_dict()) + '\n' for change in recorded)
+                self.fs.append_text(self.path, text)
+                self._changes += recorded
+                self._offset += len(text.encode('utf-8'))
+                self._line_count += len(recorded)
+        except OSError:
+            # Only syncing the changes is affected
+            logging.warning("Could not record changes to %s", self.path, exc_info=True)
+            recorded = self._number_changes(changes)
+        return recorded
+
+    def _number_changes(self, changes: List[ChangeArguments]) -> List[Change]:
+        """Helper: returns the changes, numbered after the last change that was read."""
+        last_sequence = self._changes[-1].sequence if self._changes else 0
+        return [Change(last_sequence + number, *arguments) for number, arguments in enumerate(changes, 1)]
+
+    def export_delta(self, since: int = 0) -> dict:
+        """Returns the compacted changes made after sequence number since (see export_delta())."""
+        if self._changes is not None:
+            # Include changes recorded by other processes
+            self._read_new_changes()
+        return export_delta(self.changes, since)
@@ -0,0 +1,80 @@
+"""
+Generate synthetic XDG trees (desktop entries, mimeinfo.cache and mimeapps.list) in a MemoryFileSystem, for
+profiling appsel against installations of a known size.
+"""
+import random
+
+from dataclasses import dataclass
+from typing import Dict, List, Sequence
+
+from appsel.backend.desktopentries import DesktopEntriesList
+from appsel.backend.filesystem import MemoryFileSystem
+from appsel.backend.mimetypesmanager import MimeTypesManager
+
+APPLICATIONS_DIR = '/usr/share/applications'
+MIMEINFO_CACHE_PATH = f'{APPLICATIONS_DIR}/mimeinfo.cache'
+MIMEAPPS_LIST_PATH = '/home/user/.config/mimeapps.list'
+MEDIA_TYPES = ['application', 'audio', 'image', 'text', 'video']
+
+@dataclass
+class Corpus:
+    """A generated XDG tree, and the IDs of the apps in it."""
+    fs: MemoryFileSystem
+    app_ids: List[str]
+    mimetypes: List[str]
+    # The app supporting the most MIME types
+    largest_app: str
+
+    def create_manager(self) -> MimeTypesManager:
+        """Loads a MimeTypesManager from the generated tree."""
+        desktop_entries = DesktopEntriesList([APPLICATIONS_DIR], fs=self.fs)
+        return MimeTypesManager(desktop_entries, paths=[MIMEAPPS_LIST_PATH], cache_paths=[MIMEINFO_CACHE_PATH])
+
+def generate_corpus(n_apps: int = 200, n_types: int = 2000, types_per_app: int = 20, largest_app_types: int = 500,
+                    defaults_fraction: float = 0.3, mimetypes: Sequence[str] = None, seed: int = 0) -> Corpus:
+    """
+    Generates n_apps desktop entries supporting types_per_app MIME types each (picked mostly from one media type,
+    like real apps), plus one app supporting largest_app_types types. A fraction of the types gets a default in
+    mimeapps.list.
+
+    MIME type names are taken from mimetypes (e.g. the system's MIME database) when given, otherwise generated.
+    """
+    rng = random.Random(seed)
+    if mimetypes:
+        mimetypes = sorted(mimetypes)[:n_types]
+    else:
+        mimetypes = [f'{MEDIA_TYPES[i % len(MEDIA_TYPES)]}/x-corpus-{i}' for i in range(n_types)]
+    by_media_type: Dict[str, List[str]] = {}
+    for mimetype in mimetypes:
+        by_media_type.setdefault(mimetype.split('/', 1)[0], []).append(mimetype)
+    media_types = sorted(by_media_type)
+
+    files = {}
+    supported: Dict[str, List[str]] = {}
+    for i in range(n_apps + 1):
+        app_id = f'org.example.App{i}.desktop'
+        if i == n_apps:
+            types = rng.sample(mimetypes, min(largest_app_types, len(mimetypes)))
+        else:
+            group = by_media_type[rng.choice(media_types)]
+            types = rng.sample(group, min(types_per_app * 3 // 4, len(group)))
+            types += rng.sample(mimetypes, min(max(types_per_app - len(types), 0), len(mimetypes)))
+        supported[app_id] = types = sorted(set(types))
+        files[f'{APPLICATIONS_DIR}/{app_id}'] = (
+            f'[Desktop Entry]\nType=Application\nName=Example App {i}\nExec=example-app-{i} %F\n'
+            f'Icon=application-x-executable\nMimeType={";".join(types)};\n')
+
+    handlers: Dict[str, List[str]] = {}
+    for app_id, types in supported.items():
+        for mimetype in types:
+            handlers.setdefault(mimetype, []).append(app_id)
+    files[MIMEINFO_CACHE_PATH] = '[MIME Cache]\n' + ''.join(
+        f'{mimetype}={";".join(apps)};\n' for mimetype, apps in sorted(handlers.items()))
+
+    defaults = rng.sample(sorted(handlers), int(len(handlers) * defaults_fraction))
+    files[MIMEAPPS_LIST_PATH] = '[Default Applications]\n' + ''.join(
+        f'{mimetype}={rng.choice(handlers[mimetype])};\n' for mimetype in sorted(defaults))
+
+    app_ids = sorted(supported)
+    largest_app = max(app_ids, key=lambda app_id: len(supported[app_id]))
+    return Corpus(MemoryFileSystem(files), app_ids, mimetypes, largest_app)
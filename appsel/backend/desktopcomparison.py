@@ -0,0 +1,61 @@
+"""
+Compare effective default applications and app visibility across several desktop environments at once.
+"""
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional
+
+from appsel.backend.mimetypesmanager import MimeTypesManager, SECTION_DEFAULTS
+
+@dataclass
+class DesktopComparisonRow:
+    """Represents the value of one item (a MIME type's default app, or an app's visibility) on each desktop."""
+    name: str
+    values: Dict[str, object]
+
+    @property
+    def differs(self) -> bool:
+        """Returns whether the desktops disagree on this item."""
+        return len(set(self.values.values())) > 1
+
+class DesktopComparison():
+    """
+    Resolves default applications for several desktop environments in one pass.
+
+    Each desktop is given in the same format as $XDG_CURRENT_DESKTOP (e.g. "GNOME" or "ubuntu:GNOME"). Desktop
+    specific mimeapps.list layers are read for each desktop, while layers shared between desktops (mimeapps.list,
+    mimeinfo.cache) are only parsed once.
+    """
+    def __init__(self, desktop_entries, desktops: List[str]):
+        self.desktop_entries = desktop_entries
+        self.desktops = desktops
+        parsed_files = {}
+        self.managers = {
+            desktop: MimeTypesManager(
+                desktop_entries, parsed_files=parsed_files,
+                paths=MimeTypesManager._get_mimeapps_list_paths(  # pylint: disable=protected-access
+                    desktop.split(':'), fs=desktop_entries.fs))
+            for desktop in desktops
+        }
+
+    def get_mimetypes(self) -> List[str]:
+        """Returns all MIME types that have a default or a supporting app on any of the desktops."""
+        mimetypes = set()
+        for manager in self.managers.values():
+            mimetypes.update(manager.mimeinfo_cache)
+            mimetypes.update(manager.mimeapps_db[SECTION_DEFAULTS])
+        return sorted(mimetypes)
+
+    def get_default_apps(self, mimetype: str) -> Dict[str, Optional[str]]:
+        """Returns the default application for a MIME type on each desktop."""
+        return {desktop: manager.get_default_app(mimetype) for desktop, manager in self.managers.items()}
+
+    def iter_default_apps(self) -> Iterator[DesktopComparisonRow]:
+        """Yields the default application on each desktop for every known MIME type."""
+        for mimetype in self.get_mimetypes():
+            yield DesktopComparisonRow(mimetype, self.get_default_apps(mimetype))
+
+    def iter_visibility(self) -> Iterator[DesktopComparisonRow]:
+        """Yields whether each app is shown in the applications list on each desktop."""
+        for app_id in sorted(self.desktop_entries.entries):
+            yield DesktopComparisonRow(app_id, {desktop: self.desktop_entries.is_shown(app_id, desktop.split(':'))
+                                                for desktop in self.desktops})
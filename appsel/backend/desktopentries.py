@@ -1,40 +1,89 @@
 """
 Enumerate application .desktop entries on the system
 """
+import io
 import logging
 import os
 import os.path
-import shutil
 
 from typing import List
 
 import xdg.DesktopEntry
-from PyQt5.QtCore import QStandardPaths
-from PyQt5.QtGui import QIcon
+import xdg.Exceptions
 
+from appsel.backend import metrics, xdgpaths
+from appsel.backend.filesystem import REAL_FILESYSTEM, FileSystem
+
+DESKTOP_ENTRY_GROUPS = ("Desktop Entry", "KDE Desktop Entry")
+
+def parse_desktop_entry(path: str, text: str) -> xdg.DesktopEntry.DesktopEntry:
+    """
+    Returns a pyxdg DesktopEntry from the contents of a .desktop file.
+
+    pyxdg can only parse files on disk, so this follows its IniFile.parse() exactly: a repeated group starts over,
+    a repeated key replaces the earlier value, and invalid lines or a missing Desktop Entry group raise
+    xdg.Exceptions.ParsingError. Like pyxdg, repeated groups and keys are errors when xdg.Exceptions.debug is set.
+    """
+    entry = xdg.DesktopEntry.DesktopEntry()
+    group_name = None
+    # Split lines like a file opened in text mode, only at \n, \r\n and \r
+    for line in io.StringIO(text, newline=None):
+        line = line.strip()
+        if not line or line[0] == '#':
+            continue
+        if line[0] == '[':
+            group_name = line.lstrip('[').rstrip(']')
+            if xdg.Exceptions.debug and group_name in entry.content:
+                raise xdg.Exceptions.DuplicateGroupError(group_name, path)
+            entry.content[group_name] = {}
+            continue
+        key, separator, value = line.partition('=')
+        if not separator:
+            raise xdg.Exceptions.ParsingError("Invalid line: " + line, path)
+        if group_name is None:
+            raise xdg.Exceptions.ParsingError("Parsing error on key, group missing", path)
+        key = key.strip()
+        if xdg.Exceptions.debug and key in entry.content[group_name]:
+            raise xdg.Exceptions.DuplicateKeyError(key, group_name, path)
+        entry.content[group_name][key] = value.strip()
+    entry.filename = path
+    entry.defaultGroup = next((name for name in DESKTOP_ENTRY_GROUPS if name in entry.content), None)
+    if entry.defaultGroup is None:
+        raise xdg.Exceptions.ParsingError(f"[{DESKTOP_ENTRY_GROUPS[0]}]-Header missing", path)
+    return entry
+
+@metrics.instrument_methods
 class DesktopEntriesList():
     """
     Enumerate and provide display information for .desktop entries on the system.
     All functions in this class expect MIME types as strings instead of QMimeType instances.
     """
 
-    def __init__(self):
+    def __init__(self, locations: List[str] = None, *, fs: FileSystem = REAL_FILESYSTEM):
         self.entries = {}
+        self.fs = fs
 
         # For each .desktop entry in any path they are read from (~/.local/share/applications,
         # /usr/local/share/applications, /usr/share/applications), read only the highest priority
         # path for the desktop entry ID
         self.desktop_entry_paths = {}
-        for location in QStandardPaths.standardLocations(QStandardPaths.ApplicationsLocation):
-            for root, _dirs, files in os.walk(location):
+        if locations is None:
+            locations = xdgpaths.standard_locations(xdgpaths.APPLICATIONS_LOCATION)
+        self.locations = locations
+        for location in self.locations:
+            for root, _dirs, files in fs.walk(location):
                 for filename in files:
                     if os.path.splitext(filename)[1] == '.desktop' and filename not in self.desktop_entry_paths:
                         fullpath = os.path.join(root, filename)
                         self.desktop_entry_paths[filename] = fullpath
-                        print(f'Registered {filename} to {fullpath}')
+                        logging.debug('Registered %s to %s', filename, fullpath)
 
-        for name, path in self.desktop_entry_paths.items():
-            self.entries[name] = xdg.DesktopEntry.DesktopEntry(filename=path)
+        for name, path in list(self.desktop_entry_paths.items()):
+            try:
+                self.entries[name] = parse_desktop_entry(path, fs.read_text(path))
+            except (OSError, xdg.Exceptions.Error) as e:
+                logging.warning("Skipping unreadable desktop entry %s: %s", path, e)
+                del self.desktop_entry_paths[name]
 
     def get_mimetypes(self, desktop_entry_id: str) -> List[str]:
         """Returns the MIME types supported by a desktop entry."""
@@ -50,24 +99,20 @@ class DesktopEntriesList():
         except KeyError:
             return desktop_entry_id
 
-    def get_icon(self, desktop_entry_id: str) -> QIcon or None:
-        """Returns a QIcon representing a desktop entry, if it exists."""
+    def get_icon_name(self, desktop_entry_id: str) -> str or None:
+        """
+        Returns the icon of a desktop entry, if it exists. This can be a name (icon pulled from the current
+        icon theme) or an absolute path.
+        """
         try:
-            entry = self.entries[desktop_entry_id]
+            return self.entries[desktop_entry_id].getIcon()
         except KeyError:
             return None
 
-        # Icon definitions in .desktop entries can be a name (icon pulled from the current icon theme)
-        # or an absolute path.
-        iconname = entry.getIcon()
-        if os.path.isabs(iconname):
-            return QIcon(iconname)
-        else:
-            return QIcon.fromTheme(iconname)
-
-    def is_shown(self, desktop_entry_id: str) -> bool:
+    def is_shown(self, desktop_entry_id: str, current_desktops: List[str] = None) -> bool:
         """
         Returns whether the desktop entry should be shown in the applications list.
+        current_desktops defaults to the desktops listed in $XDG_CURRENT_DESKTOP.
 
         Apps are displayed if they meet the following criteria:
         1) Desktop entry is not marked NoDisplay or Hidden
@@ -82,7 +127,9 @@ class DesktopEntriesList():
         if entry.getHidden() or entry.getNoDisplay():
             return False
 
-        current_desktops = set(os.environ.get('XDG_CURRENT_DESKTOP', '').split(':'))
+        if current_desktops is None:
+            current_desktops = xdgpaths.get_current_desktops()
+        current_desktops = set(current_desktops)
         onlyshowin = entry.getOnlyShowIn()
         if onlyshowin and not set(onlyshowin) & current_desktops:
             logging.debug("Not showing desktop entry %s because %s does not match %s",
@@ -98,8 +145,8 @@ class DesktopEntriesList():
         if tryexec:
             if not os.path.isabs(tryexec):
                 # tryexec path can be absolute or relative
-                tryexec = shutil.which(tryexec)
-            if tryexec is None or not os.path.exists(tryexec):
+                tryexec = self.fs.which(tryexec)
+            if tryexec is None or not self.fs.exists(tryexec):
                 logging.debug("Not showing desktop entry %s because TryExec path %s does not exist",
                             desktop_entry_id, tryexec)
                 return False
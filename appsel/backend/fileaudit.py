@@ -0,0 +1,148 @@
+"""
+Resolve the default application for large numbers of files, e.g. for auditing directory trees.
+"""
+import collections
+import concurrent.futures
+import fnmatch
+import logging
+import os
+import re
+
+from dataclasses import dataclass
+from typing import Iterable, Iterator, Optional
+
+from PyQt5.QtCore import QMimeDatabase
+
+# MIME type returned by QMimeDatabase when it cannot classify a file
+DEFAULT_MIMETYPE = "application/octet-stream"
+# Most suffixes to memoize. There is one entry per suffix in the MIME database, so this is only a safeguard
+MAX_CACHED_SUFFIXES = 4096
+
+@dataclass
+class FileHandlerResult:
+    """Represents the MIME type and default application for a single file."""
+    path: str
+    mimetype: str
+    app_id: Optional[str]
+
+def walk_files(paths: Iterable[str]) -> Iterator[str]:
+    """
+    Yields all files in the given paths, recursing into directories. Symlinks to directories are not followed.
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _dirs, files in os.walk(path):
+                for filename in files:
+                    yield os.path.join(root, filename)
+        else:
+            yield path
+
+class FileHandlerResolver():
+    """
+    Classifies files by MIME type and resolves their default applications.
+
+    File names are first matched by extension, and the content is only read when the extension is missing or
+    ambiguous. Both extension lookups and default application lookups are memoized.
+
+    Only matches by plain suffix globs (like *.tar.gz) are memoized, keyed on the longest suffix of the file name
+    that has such a glob. File names matched by any other glob (like CMakeLists.txt or README*) are always looked up.
+    """
+    def __init__(self, manager, *, sniff_content: bool = True, qmimedb: QMimeDatabase = None):
+        self.manager = manager
+        self.sniff_content = sniff_content
+        # QMimeDatabase is thread-safe, so one instance is shared by all workers
+        self.qmimedb = qmimedb or QMimeDatabase()
+        # Lowercased suffixes of the plain suffix globs, and a pattern matching all other globs
+        self._suffixes = set()
+        other_globs = []
+        for mimetype in self.qmimedb.allMimeTypes():
+            for glob in mimetype.globPatterns():
+                suffix = glob[2:]
+                if glob.startswith('*.') and suffix and not any(char in suffix for char in '*?['):
+                    self._suffixes.add(suffix.lower())
+                else:
+                    other_globs.append(fnmatch.translate(glob))
+        # Globs are case-insensitive unless marked otherwise, so this may match more names than Qt does
+        self._other_globs = re.compile('|'.join(other_globs), re.IGNORECASE) if other_globs else None
+        # Suffix -> MIME type name, or None if the suffix alone is ambiguous
+        self._extension_cache = {}
+        self._default_app_cache = {}
+
+    def _get_extension(self, filename: str) -> Optional[str]:
+        """
+        Returns the longest suffix of filename that has a plain suffix glob, or None if there is none. The suffix
+        keeps its case, since some globs are case-sensitive (e.g. *.C is C++ but *.c is C).
+        """
+        position = filename.find('.', 1)
+        while position != -1:
+            suffix = filename[position + 1:]
+            if suffix.lower() in self._suffixes:
+                return suffix
+            position = filename.find('.', position + 1)
+        return None
+
+    def get_mimetype(self, path: str) -> str:
+        """Returns the MIME type name for a file."""
+        filename = os.path.basename(path)
+        if self._other_globs is not None and self._other_globs.match(filename):
+            # Not memoized, since the match depends on more than the suffix
+            candidates = self.qmimedb.mimeTypesForFileName(filename)
+            extension = None
+            if len(candidates) == 1:
+                return candidates[0].name()
+        else:
+            extension = self._get_extension(filename)
+        if extension is not None:
+            try:
+                mimetype = self._extension_cache[extension]
+            except KeyError:
+                candidates = self.qmimedb.mimeTypesForFileName(filename)
+                mimetype = candidates[0].name() if len(candidates) == 1 else None
+                # Only memoize if the suffix glob is what matched (e.g. not a higher weight glob for a shorter suffix)
+                cacheable = len(candidates) != 1 or any(
+                    glob.lower() == f'*.{extension}'.lower() for glob in candidates[0].globPatterns())
+                # Concurrent workers may race to fill this in, but they'd all store the same value
+                if cacheable and len(self._extension_cache) < MAX_CACHED_SUFFIXES:
+                    self._extension_cache[extension] = mimetype
+            if mimetype is not None:
+                return mimetype
+
+        if self.sniff_content:
+            return self.qmimedb.mimeTypeForFile(path, QMimeDatabase.MatchDefault).name()
+        else:
+            return self.qmimedb.mimeTypeForFile(path, QMimeDatabase.MatchExtension).name()
+
+    def get_default_app(self, mimetype: str) -> Optional[str]:
+        """Returns the (memoized) default application for a MIME type."""
+        try:
+            return self._default_app_cache[mimetype]
+        except KeyError:
+            self._default_app_cache[mimetype] = app_id = self.manager.get_default_app(mimetype)
+            return app_id
+
+    def resolve(self, paths: Iterable[str], *, workers: int = None) -> Iterator[FileHandlerResult]:
+        """
+        Yields a FileHandlerResult for each file in paths, in order. Directories are walked recursively.
+
+        Classification runs on a pool of worker threads. Only a fixed number of files are in flight at a time,
+        so memory use does not grow with the number of files.
+        """
+        workers = workers or os.cpu_count() or 1
+        max_pending = workers * 16
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            pending = collections.deque()
+            for path in walk_files(paths):
+                pending.append((path, executor.submit(self.get_mimetype, path)))
+                if len(pending) >= max_pending:
+                    yield self._get_result(*pending.popleft())
+            while pending:
+                yield self._get_result(*pending.popleft())
+
+    def _get_result(self, path: str, future: concurrent.futures.Future) -> FileHandlerResult:
+        try:
+            mimetype = future.result()
+        except OSError:
+            logging.warning("Could not classify %s", path, exc_info=True)
+            mimetype = DEFAULT_MIMETYPE
+        # Default app lookups touch the manager, so they stay on the calling thread
+        return FileHandlerResult(path, mimetype, self.get_default_app(mimetype))
@@ -0,0 +1,249 @@
+"""
+Filesystem access for the backend, so that it can run against an in-memory tree in tests and benchmarks.
+
+Backend classes take an optional fs argument, defaulting to REAL_FILESYSTEM.
+"""
+import abc
+import contextlib
+import fcntl
+import mmap
+import os
+import posixpath
+import shutil
+import tempfile
+import threading
+
+from typing import ContextManager, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+class FileSystem(abc.ABC):
+    """
+    The filesystem operations used by the backend. Paths are absolute, /-separated strings.
+    """
+    @abc.abstractmethod
+    def walk(self, top: str) -> Iterator[Tuple[str, List[str], List[str]]]:
+        """Yields (directory, subdirectory names, file names) for top and every directory below it, like os.walk."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def exists(self, path: str) -> bool:
+        """Returns whether a file or directory exists."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def is_dir(self, path: str) -> bool:
+        """Returns whether a path is an existing directory."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_mtime_ns(self, path: str) -> Optional[int]:
+        """Returns the modification time of a file in nanoseconds, or None if it doesn't exist."""
+        raise NotImplementedError
+
+    def get_mtimes(self, paths: Iterable[str]) -> Dict[str, Optional[int]]:
+        """Returns the modification time of each path (None if it doesn't exist), to detect changes by polling."""
+        return {path: self.get_mtime_ns(path) for path in paths}
+
+    def iter_directories(self, tops: Iterable[str]) -> Iterator[str]:
+        """Yields top and every directory below it, for each top. Directory mtimes change when files are added."""
+        for top in tops:
+            for directory, _subdirectories, _files in self.walk(top):
+                yield directory
+
+    @abc.abstractmethod
+    def read_bytes(self, path: str) -> bytes:
+        """Returns the contents of a file. Raises FileNotFoundError if it doesn't exist."""
+        raise NotImplementedError
+
+    def read_text(self, path: str) -> str:
+        """Returns the contents of a UTF-8 text file, keeping line endings as they are."""
+        return self.read_bytes(path).decode('utf-8', errors='replace')
+
+    def map_file(self, path: str):
+        """Returns a read-only buffer with the contents of a file, which may be memory mapped."""
+        return self.read_bytes(path)
+
+    @abc.abstractmethod
+    def write_atomic(self, path: str, text: str):
+        """
+        Replaces the contents of a text file at once, so readers never see a partially written file. Parent
+        directories are created if needed.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def append_text(self, path: str, text: str):
+        """Appends to a UTF-8 text file, creating it and its parent directories if needed."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def lock(self, path: str) -> ContextManager[None]:
+        """
+        Returns a context manager holding an exclusive lock on a file (creating it and its parent directories if
+        needed), to serialize read-modify-append cycles between processes. The lock is advisory.
+        """
+        raise NotImplementedError
+
+    def which(self, command: str) -> Optional[str]:
+        """Returns the full path of an executable found in $PATH, or None."""
+        for directory in os.environ.get('PATH', os.defpath).split(os.pathsep):
+            path = posixpath.join(directory, command)
+            if directory and self.exists(path):
+                return path
+        return None
+
+class RealFileSystem(FileSystem):
+    """The local filesystem."""
+    def walk(self, top):
+        return os.walk(top)
+
+    def exists(self, path):
+        return os.path.exists(path)
+
+    def is_dir(self, path):
+        return os.path.isdir(path)
+
+    def get_mtime_ns(self, path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+
+    def read_bytes(self, path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def map_file(self, path):
+        with open(path, 'rb') as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def write_atomic(self, path, text):
+        # Write through symlinks (e.g. to a dotfiles repository) instead of replacing them
+        path = os.path.realpath(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f'.{os.path.basename(path)}.')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+                f.write(text)
+            try:
+                os.chmod(temp_path, os.stat(path).st_mode & 0o7777)
+            except FileNotFoundError:
+                os.chmod(temp_path, 0o644)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    def append_text(self, path, text):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'a', encoding='utf-8', newline='') as f:
+            f.write(text)
+
+    @contextlib.contextmanager
+    def lock(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'ab') as f:
+            # Released when the file is closed
+            fcntl.flock(f, fcntl.LOCK_EX)
+            yield
+
+    def which(self, command):
+        return shutil.which(command)
+
+class MemoryFileSystem(FileSystem):
+    """
+    A filesystem held in a dict of path to contents. Directories exist implicitly when they contain files.
+
+    Each write gets a new modification time, so change detection based on mtimes works as on disk.
+    """
+    def __init__(self, files: Dict[str, Union[str, bytes]] = None):
+        self.files: Dict[str, bytes] = {}
+        self.mtimes: Dict[str, int] = {}
+        # Directory -> number of files below it
+        self._directories: Dict[str, int] = {}
+        self._clock = 0
+        self._lock = threading.RLock()
+        for path, contents in (files or {}).items():
+            self.write_bytes(path, contents.encode('utf-8') if isinstance(contents, str) else contents)
+
+    def write_bytes(self, path: str, contents: bytes):
+        """Creates or replaces a file."""
+        path = posixpath.normpath(path)
+        if path not in self.files:
+            self._count_file(path, 1)
+        self._clock += 1
+        self.files[path] = contents
+        self.mtimes[path] = self._clock
+
+    def remove(self, path: str):
+        """Deletes a file."""
+        path = posixpath.normpath(path)
+        del self.files[path]
+        del self.mtimes[path]
+        self._count_file(path, -1)
+
+    def _count_file(self, path: str, delta: int):
+        directory = posixpath.dirname(path)
+        while True:
+            count = self._directories.get(directory, 0) + delta
+            if count:
+                self._directories[directory] = count
+            else:
+                del self._directories[directory]
+            if directory == '/' or not directory:
+                break
+            directory = posixpath.dirname(directory)
+
+    def walk(self, top):
+        top = posixpath.normpath(top)
+        prefix = top.rstrip('/') + '/'
+        tree = {}  # Directory -> (subdirectories, files)
+        for path in sorted(self.files):
+            if not path.startswith(prefix):
+                continue
+            directory, filename = posixpath.split(path)
+            tree.setdefault(directory, ({}, []))[1].append(filename)
+            # Register each intermediate directory with its parent
+            while directory != top:
+                parent, name = posixpath.split(directory)
+                tree.setdefault(parent, ({}, []))[0][name] = None
+                directory = parent
+        pending = [top] if top in tree else []
+        while pending:
+            directory = pending.pop(0)
+            subdirectories, files = tree[directory]
+            names = list(subdirectories)
+            yield directory, names, files
+            # Like os.walk, callers may prune names in place
+            pending[0:0] = [posixpath.join(directory, name) for name in names]
+
+    def exists(self, path):
+        path = posixpath.normpath(path)
+        return path in self.files or path in self._directories
+
+    def is_dir(self, path):
+        return posixpath.normpath(path) in self._directories
+
+    def get_mtime_ns(self, path):
+        return self.mtimes.get(posixpath.normpath(path))
+
+    def read_bytes(self, path):
+        try:
+            return self.files[posixpath.normpath(path)]
+        except KeyError:
+            raise FileNotFoundError(path) from None
+
+    def write_atomic(self, path, text):
+        self.write_bytes(path, text.encode('utf-8'))
+
+    def append_text(self, path, text):
+        self.write_bytes(path, self.files.get(posixpath.normpath(path), b'') + text.encode('utf-8'))
+
+    @contextlib.contextmanager
+    def lock(self, path):
+        if posixpath.normpath(path) not in self.files:
+            self.write_bytes(path, b'')
+        # Only threads can share a MemoryFileSystem, so one lock for all files is enough
+        with self._lock:
+            yield
+
+REAL_FILESYSTEM = RealFileSystem()
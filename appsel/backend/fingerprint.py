@@ -0,0 +1,120 @@
+"""
+Hashed fingerprints of effective MIME associations, for detecting drift between machines.
+
+Fingerprints form a two level Merkle tree: one hash per MIME type, combined into one hash per top-level media type
+(application, audio, ...), combined into a root hash. Two fingerprints can be compared by their root hashes first,
+and then only the media types (and MIME types) whose hashes differ need to be looked at.
+"""
+import hashlib
+
+from typing import Dict, List, Optional
+
+def _hash(*parts: str) -> str:
+    return hashlib.sha256('\0'.join(parts).encode()).hexdigest()
+
+def get_media_type(mimetype: str) -> str:
+    """Returns the top-level media type of a MIME type (e.g. "video" for "video/mp4")."""
+    return mimetype.split('/', 1)[0]
+
+class AssociationFingerprint():
+    """
+    Fingerprint of the effective associations of a MimeTypesManager.
+
+    Each MIME type is hashed from its effective default application and its enabled applications; types without any
+    default or associated applications (e.g. after their last association was removed) are left out. The fingerprint
+    listens for changes on the manager, so after an edit only the changed MIME type and its media type are rehashed.
+    """
+    def __init__(self, manager):
+        self.manager = manager
+        self._type_hashes = {}  # type: Dict[str, Dict[str, str]]
+        self._group_hashes = {}  # type: Dict[str, str]
+        self._root_hash = None
+        self._dirty = set(manager.get_all_mimetypes())
+        manager.add_change_listener(self.invalidate)
+
+    def invalidate(self, mimetype: str):
+        """Marks a MIME type as changed, so that it is rehashed on the next lookup."""
+        self._dirty.add(mimetype)
+
+    def _hash_mimetype(self, mimetype: str) -> Optional[str]:
+        supported_apps = self.manager.get_supported_apps(mimetype)
+        default_app = self.manager.get_default_app(mimetype)
+        if not supported_apps and default_app is None:
+            return None
+        enabled_apps = sorted(app_id for app_id, options in supported_apps.items() if not options.disabled)
+        return _hash(mimetype, default_app or '', *enabled_apps)
+
+    def _update(self):
+        if not self._dirty:
+            return
+        changed_groups = set()
+        for mimetype in self._dirty:
+            media_type = get_media_type(mimetype)
+            type_hashes = self._type_hashes.setdefault(media_type, {})
+            type_hash = self._hash_mimetype(mimetype)
+            if type_hash is None:
+                type_hashes.pop(mimetype, None)
+            else:
+                type_hashes[mimetype] = type_hash
+            changed_groups.add(media_type)
+        self._dirty.clear()
+
+        for media_type in changed_groups:
+            type_hashes = self._type_hashes[media_type]
+            if not type_hashes:
+                del self._type_hashes[media_type]
+                self._group_hashes.pop(media_type, None)
+                continue
+            self._group_hashes[media_type] = _hash(*(f"{name}={type_hashes[name]}" for name in sorted(type_hashes)))
+        self._root_hash = _hash(*(f"{name}={self._group_hashes[name]}" for name in sorted(self._group_hashes)))
+
+    @property
+    def root_hash(self) -> str:
+        """Returns the hash of all associations."""
+        self._update()
+        return self._root_hash
+
+    def get_group_hashes(self) -> Dict[str, str]:
+        """Returns the hash of each top-level media type."""
+        self._update()
+        return dict(self._group_hashes)
+
+    def get_type_hashes(self, media_type: str) -> Dict[str, str]:
+        """Returns the hash of each MIME type under a top-level media type."""
+        self._update()
+        return dict(self._type_hashes.get(media_type, {}))
+
+    def to_dict(self, *, include_types: bool = True) -> dict:
+        """
+        Returns the fingerprint as a JSON serializable dict. If include_types is False, only the root and media type
+        hashes are included.
+        """
+        self._update()
+        return {
+            'root': self._root_hash,
+            'groups': {media_type: {'hash': group_hash,
+                                    **({'types': dict(self._type_hashes[media_type])} if include_types else {})}
+                       for media_type, group_hash in sorted(self._group_hashes.items())},
+        }
+
+def compare_fingerprints(first: dict, second: dict) -> List[str]:
+    """
+    Compares two fingerprints from AssociationFingerprint.to_dict(), and returns the names of the MIME types that
+    differ (or only exist in one of them). If a fingerprint omits MIME type hashes, differing media types are
+    returned as "<media type>/*" instead.
+    """
+    if first['root'] == second['root']:
+        return []
+    differences = []
+    first_groups, second_groups = first['groups'], second['groups']
+    for media_type in sorted(first_groups.keys() | second_groups.keys()):
+        first_group, second_group = first_groups.get(media_type, {}), second_groups.get(media_type, {})
+        if first_group.get('hash') == second_group.get('hash'):
+            continue
+        if (first_group and 'types' not in first_group) or (second_group and 'types' not in second_group):
+            differences.append(f"{media_type}/*")
+            continue
+        first_types, second_types = first_group.get('types', {}), second_group.get('types', {})
+        differences += [mimetype for mimetype in sorted(first_types.keys() | second_types.keys())
+                        if first_types.get(mimetype) != second_types.get(mimetype)]
+    return differences
@@ -0,0 +1,152 @@
+"""
+Opt-in runtime instrumentation: call counts, timings and latency histograms for backend methods and model data().
+
+Set APPSEL_METRICS=1 in the environment to enable. When disabled, the decorators in this module return the
+decorated classes unchanged, so there is no overhead.
+"""
+import contextlib
+import functools
+import inspect
+import logging
+import os
+import threading
+import time
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+ENABLED = os.environ.get('APPSEL_METRICS', '') not in {'', '0'}
+# UI actions that take longer than this (in seconds) are logged along with a breakdown of their calls
+SLOW_ACTION_THRESHOLD = float(os.environ.get('APPSEL_METRICS_SLOW_THRESHOLD', '0.1'))
+# Number of histogram buckets. Bucket n counts calls that took less than 2**n microseconds
+N_BUCKETS = 24
+
+@dataclass
+class CallStats:
+    """Call count and timing statistics for a single instrumented function."""
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    histogram: List[int] = field(default_factory=lambda: [0] * N_BUCKETS)
+
+    def add(self, elapsed: float):
+        """Records a single call that took elapsed seconds."""
+        self.count += 1
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+        self.histogram[min(int(elapsed * 1e6).bit_length(), N_BUCKETS-1)] += 1
+
+    def percentile(self, fraction: float) -> float:
+        """Returns an upper bound (in seconds) for the given percentile of call latencies, from the histogram."""
+        threshold = self.count * fraction
+        seen = 0
+        for bucket, count in enumerate(self.histogram):
+            seen += count
+            if seen >= threshold:
+                return (2 ** bucket) / 1e6
+        return self.max
+
+class MetricsRegistry():
+    """Collects CallStats for instrumented functions, keyed by name."""
+    def __init__(self):
+        self.stats = {}  # type: Dict[str, CallStats]
+        self._lock = threading.Lock()
+
+    def record(self, key: str, elapsed: float):
+        """Records a call to key that took elapsed seconds."""
+        with self._lock:
+            try:
+                stats = self.stats[key]
+            except KeyError:
+                self.stats[key] = stats = CallStats()
+            stats.add(elapsed)
+
+    def get_totals(self) -> Dict[str, Tuple[int, float]]:
+        """Returns (count, total time) for each key."""
+        with self._lock:
+            return {key: (stats.count, stats.total) for key, stats in self.stats.items()}
+
+    def reset(self):
+        """Clears all collected statistics."""
+        with self._lock:
+            self.stats.clear()
+
+    def format_report(self) -> str:
+        """Returns a table of all collected statistics, slowest (by total time) first."""
+        with self._lock:
+            items = sorted(self.stats.items(), key=lambda item: item[1].total, reverse=True)
+            lines = [f"{'Name':<60} {'Calls':>8} {'Total ms':>10} {'Mean us':>10} {'p95 us':>10} {'Max us':>10}"]
+            for key, stats in items:
+                lines.append(f"{key:<60} {stats.count:>8} {stats.total * 1e3:>10.1f} "
+                             f"{stats.total / stats.count * 1e6:>10.1f} {stats.percentile(0.95) * 1e6:>10.0f} "
+                             f"{stats.max * 1e6:>10.0f}")
+        return '\n'.join(lines)
+
+registry = MetricsRegistry()
+
+def _timed(func, key):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            registry.record(key, time.perf_counter() - start)
+    return wrapper
+
+def instrument_methods(cls):
+    """
+    Class decorator: times all public methods of cls, when metrics are enabled.
+    """
+    if not ENABLED:
+        return cls
+    for name, value in list(vars(cls).items()):
+        if not name.startswith('_') and inspect.isfunction(value):
+            setattr(cls, name, _timed(value, f"{cls.__name__}.{name}"))
+    return cls
+
+def instrument_model(cls):
+    """
+    Class decorator for Qt item models: times data() calls by column and role, when metrics are enabled.
+    """
+    if not ENABLED:
+        return cls
+    data = cls.data
+
+    @functools.wraps(data)
+    def wrapper(self, index, role, *args):
+        start = time.perf_counter()
+        try:
+            return data(self, index, role, *args)
+        finally:
+            registry.record(f"{cls.__name__}.data(column={index.column()}, role={int(role)})",
+                            time.perf_counter() - start)
+    cls.data = wrapper
+    return cls
+
+@contextlib.contextmanager
+def ui_action(name: str):
+    """
+    Context manager timing a UI action (e.g. opening a dialog). If metrics are enabled and the action is slow,
+    it is logged along with the instrumented calls made while it ran.
+    """
+    if not ENABLED:
+        yield
+        return
+    totals_before = registry.get_totals()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        registry.record(f"action: {name}", elapsed)
+        if elapsed >= SLOW_ACTION_THRESHOLD:
+            breakdown = []
+            for key, (count, total) in registry.get_totals().items():
+                count_before, total_before = totals_before.get(key, (0, 0.0))
+                if count > count_before and not key.startswith('action: '):
+                    breakdown.append((total - total_before, count - count_before, key))
+            breakdown.sort(reverse=True)
+            logging.warning("Slow UI action %r took %.1f ms. Top calls:\n%s", name, elapsed * 1e3,
+                            '\n'.join(f"  {key}: {count} calls, {total * 1e3:.1f} ms"
+                                      for total, count, key in breakdown[:10]))
@@ -0,0 +1,115 @@
+"""
+Line-preserving editor for the writable mimeapps.list, so that changes don't lose comments or reorder the file.
+"""
+import io
+import logging
+
+from typing import Dict, List, Optional
+
+from appsel.backend.filesystem import REAL_FILESYSTEM, FileSystem
+
+class _Section():
+    """Lines of one [section] (header first; the preamble before any header has none), with an index of keys."""
+    def __init__(self, name: Optional[str]):
+        self.name = name
+        # Removed lines are replaced by None, so indexes of later lines stay valid
+        self.lines: List[Optional[str]] = []
+        # Key to the indexes of its lines; configparser uses the last one if a key is repeated
+        self.keys: Dict[str, List[int]] = {}
+        # Where new keys are inserted: after the last key (or header), before trailing comments and blank lines
+        self.insert_at = 0
+
+    def append(self, line: str):
+        """Adds a line read from the file."""
+        stripped = line.strip()
+        if stripped and stripped[0] not in '#;' and '=' in stripped:
+            key = stripped.split('=', 1)[0].strip()
+            self.keys.setdefault(key, []).append(len(self.lines))
+            self.insert_at = len(self.lines) + 1
+        elif stripped.startswith('['):
+            self.insert_at = len(self.lines) + 1
+        self.lines.append(line)
+
+class MimeAppsListFile():
+    """
+    A mimeapps.list file kept as a list of lines, so that setting or removing a key rewrites only that line and
+    everything else (comments, blank lines, ordering, formatting) is saved byte for byte.
+    """
+    def __init__(self, path: str, fs: FileSystem = REAL_FILESYSTEM):
+        self.path = path
+        self.fs = fs
+        self.sections: List[_Section] = [_Section(None)]
+        # Sections by name, in file order; configparser merges repeated sections
+        self._by_name: Dict[str, List[_Section]] = {}
+        try:
+            for line in io.StringIO(fs.read_text(path), newline=''):
+                self._add_line(line)
+        except FileNotFoundError:
+            logging.debug("%s does not exist yet, starting from an empty file", path)
+
+    def _add_line(self, line: str):
+        stripped = line.strip()
+        if stripped.startswith('[') and stripped.endswith(']'):
+            name = stripped[1:-1]
+            section = _Section(name)
+            self.sections.append(section)
+            self._by_name.setdefault(name, []).append(section)
+        self.sections[-1].append(line)
+
+    def _get_section(self, name: str, key: str) -> _Section:
+        """Helper: returns the section whose line for key takes effect, or where to add it, creating it if needed."""
+        if name in self._by_name:
+            sections = self._by_name[name]
+            return next((section for section in reversed(sections) if key in section.keys), sections[0])
+        else:
+            previous = self.sections[-1]
+            for index in range(len(previous.lines) - 1, -1, -1):
+                if previous.lines[index] is not None:
+                    if not previous.lines[index].endswith('\n'):
+                        previous.lines[index] += '\n'
+                    break
+            section = _Section(name)
+            self._by_name[name] = [section]
+            self.sections.append(section)
+            section.append(f'[{name}]\n')
+            return section
+
+    def set(self, section_name: str, key: str, value: str):
+        """Sets key to value, replacing the existing line or adding one at the end of the section."""
+        section = self._get_section(section_name, key)
+        line = f'{key}={value}\n'
+        indexes = section.keys.get(key)
+        if indexes:
+            section.lines[indexes[-1]] = line
+        else:
+            section.lines.insert(section.insert_at, line)
+            section.keys[key] = [section.insert_at]
+            section.insert_at += 1
+            # The previous line may be the last line of a file without a trailing newline
+            previous = section.lines[section.insert_at - 2] if section.insert_at > 1 else None
+            if previous is not None and not previous.endswith('\n'):
+                section.lines[section.insert_at - 2] = previous + '\n'
+
+    def remove(self, section_name: str, key: str):
+        """Removes every line setting key in the section, if any."""
+        for section in self._by_name.get(section_name, []):
+            for index in section.keys.pop(key, []):
+                section.lines[index] = None
+
+    def get_line_number(self, section_name: str, key: str) -> Optional[int]:
+        """Returns the line number (starting at 1) of the line setting key in a section, or None if there is none."""
+        target = next((section for section in reversed(self._by_name.get(section_name, [])) if key in section.keys),
+                      None)
+        if target is None:
+            return None
+        number = 0
+        for section in self.sections:
+            if section is target:
+                return number + sum(line is not None for line in section.lines[:section.keys[key][-1]]) + 1
+            number += sum(line is not None for line in section.lines)
+        return None
+
+    def save(self):
+        """Writes the file to a temporary file next to it, then renames it over the original."""
+        self.fs.write_atomic(self.path, ''.join(line for section in self.sections
+                                                for line in section.lines if line is not None))
@@ -0,0 +1,317 @@
+"""
+Read-only access to shared-mime-info's binary mime.cache files, without Qt.
+
+The cache files are memory mapped and looked up in place, so opening them is nearly free and only the entries
+that are asked for are ever read. File format reference:
+https://gitlab.freedesktop.org/xdg/shared-mime-info/-/blob/master/src/update-mime-database.cpp (write_cache)
+"""
+import collections
+import fnmatch
+import logging
+import mmap
+import os
+import struct
+
+from typing import Iterator, List, Optional, Tuple
+
+from appsel.backend import xdgpaths
+from appsel.backend.filesystem import REAL_FILESYSTEM, FileSystem
+
+CACHE_MAJOR_VERSION = 1
+
+_CARD32 = struct.Struct('>I')
+_PAIR = struct.Struct('>II')
+# Header: major version, minor version, then offsets of each list in the file
+_HEADER = struct.Struct('>HH9I')
+
+# Reverse suffix tree nodes are (character, number of children, offset of first child). Leaves have character 0,
+# and store (0, MIME type offset, weight and flags) instead.
+_TREE_NODE_SIZE = 12
+# Flag stored above the weight of a glob, for patterns that only match with the same case
+_CASE_SENSITIVE = 0x100
+
+def get_mime_dirs() -> List[str]:
+    """Returns the XDG mime directories, in order of decreasing priority."""
+    return [os.path.join(path, 'mime') for path in xdgpaths.standard_locations(xdgpaths.DATA_LOCATION)]
+
+class MimeCacheError(Exception):
+    """Raised when a mime.cache file is missing or invalid."""
+
+class MimeCache():
+    """
+    A single memory mapped mime.cache file.
+    """
+    def __init__(self, path: str, fs: FileSystem = REAL_FILESYSTEM):
+        self.path = path
+        try:
+            self._data = fs.map_file(path)
+        except (OSError, ValueError) as e:
+            raise MimeCacheError(f"Could not open {path}: {e}") from e
+        if len(self._data) < _HEADER.size:
+            raise MimeCacheError(f"{path} is truncated")
+
+        (major_version, _minor_version, self._alias_list, self._parent_list, self._literal_list,
+         self._suffix_tree, self._glob_list, _magic_list, _namespace_list, self._icons_list,
+         self._generic_icons_list) = _HEADER.unpack_from(self._data)
+        if major_version != CACHE_MAJOR_VERSION:
+            raise MimeCacheError(f"{path} has unsupported version {major_version}")
+
+    def close(self):
+        """Unmaps the cache file, if it was memory mapped."""
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+
+    def _get_card32(self, offset: int) -> int:
+        return _CARD32.unpack_from(self._data, offset)[0]
+
+    def _get_string(self, offset: int) -> str:
+        return self._data[offset:self._data.find(b'\0', offset)].decode()
+
+    def _bsearch_pairs(self, list_offset: int, key: str, entry_size: int = _PAIR.size) -> Optional[int]:
+        """
+        Helper: binary searches a sorted list of (string offset, value, ...) entries, and returns the value for key.
+        """
+        encoded_key = key.encode()
+        low, high = 0, self._get_card32(list_offset)
+        while low < high:
+            middle = (low + high) // 2
+            key_offset, value = _PAIR.unpack_from(self._data, list_offset + 4 + middle * entry_size)
+            current = self._data[key_offset:self._data.find(b'\0', key_offset)]
+            if current < encoded_key:
+                low = middle + 1
+            elif current > encoded_key:
+                high = middle
+            else:
+                return value
+        return None
+
+    def _iter_pairs(self, list_offset: int, entry_size: int = _PAIR.size) -> Iterator[Tuple[int, int]]:
+        for index in range(self._get_card32(list_offset)):
+            yield _PAIR.unpack_from(self._data, list_offset + 4 + index * entry_size)
+
+    def resolve_alias(self, mimetype: str) -> Optional[str]:
+        """Returns the canonical name for an aliased MIME type, or None if it is not an alias."""
+        offset = self._bsearch_pairs(self._alias_list, mimetype)
+        return None if offset is None else self._get_string(offset)
+
+    def get_parents(self, mimetype: str) -> Optional[List[str]]:
+        """Returns the direct parents of a MIME type, or None if the cache has no entry for it."""
+        offset = self._bsearch_pairs(self._parent_list, mimetype)
+        if offset is None:
+            return None
+        return [self._get_string(self._get_card32(offset + 4 + index * 4))
+                for index in range(self._get_card32(offset))]
+
+    def get_icon_name(self, mimetype: str) -> Optional[str]:
+        """Returns the icon name set for a MIME type, or None if it is not set."""
+        offset = self._bsearch_pairs(self._icons_list, mimetype)
+        return None if offset is None else self._get_string(offset)
+
+    def get_generic_icon_name(self, mimetype: str) -> Optional[str]:
+        """Returns the generic icon name set for a MIME type, or None if it is not set."""
+        offset = self._bsearch_pairs(self._generic_icons_list, mimetype)
+        return None if offset is None else self._get_string(offset)
+
+    def iter_globs(self) -> Iterator[Tuple[str, str, int]]:
+        """
+        Yields (glob pattern, MIME type, weight) for all filename patterns in the cache: literal file names,
+        simple suffix patterns (from the reverse suffix tree), and other glob patterns.
+        """
+        for list_offset in (self._literal_list, self._glob_list):
+            for index in range(self._get_card32(list_offset)):
+                pattern_offset, mimetype_offset, weight = struct.unpack_from(
+                    '>III', self._data, list_offset + 4 + index * 12)
+                yield self._get_string(pattern_offset), self._get_string(mimetype_offset), weight & 0xff
+
+        n_roots, first_root = _PAIR.unpack_from(self._data, self._suffix_tree)
+        # Suffixes are stored reversed, so build each pattern back to front while walking the tree
+        stack = [(first_root + index * _TREE_NODE_SIZE, '') for index in range(n_roots)]
+        while stack:
+            node, suffix = stack.pop()
+            character, n_children, first_child = struct.unpack_from('>III', self._data, node)
+            if character == 0:
+                # Leaf: n_children is the MIME type offset and first_child holds the weight
+                yield '*' + suffix, self._get_string(n_children), first_child & 0xff
+                continue
+            suffix = chr(character) + suffix
+            stack.extend((first_child + index * _TREE_NODE_SIZE, suffix) for index in reversed(range(n_children)))
+
+    def _find_tree_node(self, first_node: int, n_nodes: int, character: int) -> Optional[Tuple[int, int]]:
+        """Helper: binary searches sibling tree nodes (sorted by character), returning (n_children, first_child)."""
+        low, high = 0, n_nodes
+        while low < high:
+            middle = (low + high) // 2
+            current, n_children, first_child = struct.unpack_from('>III', self._data,
+                                                                  first_node + middle * _TREE_NODE_SIZE)
+            if current < character:
+                low = middle + 1
+            elif current > character:
+                high = middle
+            else:
+                return n_children, first_child
+        return None
+
+    def match_filename(self, filename: str) -> Optional[Tuple[str, int, int]]:
+        """
+        Returns (MIME type, weight, pattern length) for the best pattern match for a file name, or None if there is
+        none. A literal file name (e.g. Makefile) wins; otherwise the highest weight, then the longest pattern.
+        """
+        names = list(dict.fromkeys((filename, filename.lower())))
+        # Literal file names are sorted, so they can be binary searched. Entries are
+        # (name offset, MIME type offset, weight)
+        for name in names:
+            offset = self._bsearch_pairs(self._literal_list, name, entry_size=12)
+            if offset is not None:
+                return self._get_string(offset), 100, len(filename)
+
+        matches = []
+        for name in names:
+            n_nodes, first_node = _PAIR.unpack_from(self._data, self._suffix_tree)
+            for length, char in enumerate(reversed(name), start=1):
+                node = self._find_tree_node(first_node, n_nodes, ord(char))
+                if node is None:
+                    break
+                n_nodes, first_node = node
+                # Leaves (character 0) sort first among a node's children, and mark the end of a pattern
+                for index in range(n_nodes):
+                    character, mimetype_offset, weight = struct.unpack_from(
+                        '>III', self._data, first_node + index * _TREE_NODE_SIZE)
+                    if character != 0:
+                        break
+                    # The pattern is the suffix with a leading *
+                    matches.append((self._get_string(mimetype_offset), weight & 0xff, length + 1))
+
+        # Patterns that are neither literal names nor plain suffixes (e.g. *.[1-9] or README*) can only be
+        # matched one by one. Entries are (pattern offset, MIME type offset, weight and flags)
+        for index in range(self._get_card32(self._glob_list)):
+            pattern_offset, mimetype_offset, weight = struct.unpack_from(
+                '>III', self._data, self._glob_list + 4 + index * 12)
+            pattern = self._get_string(pattern_offset)
+            candidates = [filename] if weight & _CASE_SENSITIVE else names
+            if any(fnmatch.fnmatchcase(name, pattern) for name in candidates):
+                matches.append((self._get_string(mimetype_offset), weight & 0xff, len(pattern)))
+        return max(matches, key=lambda match: (match[1], match[2]), default=None)
+
+    def iter_mimetypes(self) -> Iterator[str]:
+        """Yields the names of MIME types that have parents or icons defined in this cache."""
+        for list_offset in (self._parent_list, self._icons_list, self._generic_icons_list):
+            for mimetype_offset, _ in self._iter_pairs(list_offset):
+                yield self._get_string(mimetype_offset)
+
+class MimeCacheDatabase():
+    """
+    Looks up MIME type details from all mime.cache files in the XDG mime directories, without Qt.
+
+    Higher priority directories (e.g. ~/.local/share/mime) take precedence over lower priority ones.
+    """
+    def __init__(self, mime_dirs: List[str] = None, fs: FileSystem = REAL_FILESYSTEM):
+        if mime_dirs is None:
+            mime_dirs = get_mime_dirs()
+        self.fs = fs
+        self.mime_dirs = []
+        self.caches = []
+        for mime_dir in mime_dirs:
+            path = os.path.join(mime_dir, 'mime.cache')
+            if not fs.exists(path):
+                continue
+            try:
+                self.caches.append(MimeCache(path, fs=fs))
+            except MimeCacheError:
+                logging.warning("Skipping unreadable mime.cache", exc_info=True)
+                continue
+            self.mime_dirs.append(mime_dir)
+            logging.debug("Reading MIME type info from %s", path)
+        self._suffixes = None
+
+    def _first(self, method: str, mimetype: str):
+        for cache in self.caches:
+            result = getattr(cache, method)(mimetype)
+            if result is not None:
+                return result
+        return None
+
+    def resolve_alias(self, mimetype: str) -> str:
+        """Returns the canonical name for a MIME type (which is the same name if it is not an alias)."""
+        return self._first('resolve_alias', mimetype) or mimetype
+
+    def get_parents(self, mimetype: str) -> List[str]:
+        """Returns the direct parents of a MIME type."""
+        return self._first('get_parents', self.resolve_alias(mimetype)) or []
+
+    def get_ancestors(self, mimetype: str) -> List[str]:
+        """
+        Returns all parents of a MIME type, nearest first. Following the shared-mime-info spec, this includes the
+        implicit parents: text/plain for text/* types, and application/octet-stream for all file contents.
+        """
+        mimetype = self.resolve_alias(mimetype)
+        ancestors = {}
+        pending = [mimetype]
+        while pending:
+            current = pending.pop(0)
+            parents = self.get_parents(current)
+            if current.startswith('text/') and current != 'text/plain':
+                parents = parents + ['text/plain']
+            for parent in map(self.resolve_alias, parents):
+                if parent != mimetype and parent not in ancestors:
+                    ancestors[parent] = None
+                    pending.append(parent)
+        # Directories and URL schemes have no contents to treat as bytes
+        if mimetype.split('/')[0] not in ('inode', 'x-scheme-handler') and mimetype != 'application/octet-stream':
+            ancestors.pop('application/octet-stream', None)
+            ancestors['application/octet-stream'] = None
+        return list(ancestors)
+
+    def get_icon_name(self, mimetype: str) -> str:
+        """
+        Returns the icon name for a MIME type. If not set explicitly, this is the MIME type with / replaced by -
+        """
+        mimetype = self.resolve_alias(mimetype)
+        return self._first('get_icon_name', mimetype) or mimetype.replace('/', '-')
+
+    def get_generic_icon_name(self, mimetype: str) -> str:
+        """
+        Returns the generic icon name for a MIME type. If not set explicitly, this is <media type>-x-generic
+        """
+        mimetype = self.resolve_alias(mimetype)
+        return self._first('get_generic_icon_name', mimetype) or mimetype.split('/')[0] + '-x-generic'
+
+    def get_suffixes(self, mimetype: str) -> List[str]:
+        """
+        Returns the file extensions for a MIME type (without the leading *.), with the preferred one first.
+        """
+        if self._suffixes is None:
+            # Suffixes can only be found by walking all globs, so index them on first use
+            weighted_suffixes = collections.defaultdict(dict)
+            for cache in reversed(self.caches):
+                for pattern, pattern_mimetype, weight in cache.iter_globs():
+                    suffix = pattern[2:]
+                    if pattern.startswith('*.') and suffix and not set('*?[') & set(suffix):
+                        weighted_suffixes[pattern_mimetype][suffix] = weight
+            self._suffixes = {
+                name: [suffix for suffix, _ in sorted(suffixes.items(), key=lambda item: -item[1])]
+                for name, suffixes in weighted_suffixes.items()
+            }
+        return self._suffixes.get(self.resolve_alias(mimetype), [])
+
+    def get_mimetype_for_filename(self, filename: str) -> Optional[str]:
+        """
+        Returns the MIME type for a file name, by literal name, then the highest weighted and longest matching glob
+        pattern. Returns None if nothing matches.
+        """
+        for cache in self.caches:
+            match = cache.match_filename(filename)
+            if match is not None:
+                return match[0]
+        return None
+
+    def all_mimetypes(self) -> List[str]:
+        """Returns the names of all known MIME types."""
+        mimetypes = {}
+        for mime_dir, cache in zip(self.mime_dirs, self.caches):
+            # The types file lists every type in the database; fall back to the types in the cache
+            try:
+                lines = self.fs.read_text(os.path.join(mime_dir, 'types')).splitlines()
+                mimetypes.update(dict.fromkeys(line.strip() for line in lines if line.strip()))
+            except OSError:
+                mimetypes.update(dict.fromkeys(cache.iter_mimetypes()))
+        return list(mimetypes)
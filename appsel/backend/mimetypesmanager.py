@@ -3,75 +3,203 @@ Manage app associations for MIME types, including default, custom, and disabled
 """
 import collections
 import configparser
+import enum
 import itertools
 import logging
 import os
+import threading
+import types
 
-from dataclasses import dataclass
-from typing import List, Dict
-
-from PyQt5.QtCore import QStandardPaths, QMimeDatabase
+import dataclasses
 
-SECTION_DEFAULTS = "Default Applications"
-SECTION_ADDED = "Added Associations"
-SECTION_REMOVED = "Removed Associations"
-SECTION_MIME_CACHE = "MIME Cache"
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from appsel.backend import metrics, xdgpaths
+from appsel.backend.changelog import (ASSOCIATION_CHANGES, Change, ChangeArguments, ChangeConflict, ChangeKind,
+                                      ChangeLog, DeltaResult, export_delta)
+from appsel.backend.filesystem import REAL_FILESYSTEM, FileSystem
+from appsel.backend.mimeappsfile import MimeAppsListFile
+from appsel.backend.provenance import Explanation, LayerEntry, LineNumberingConfigParser, explain
+from appsel.backend.recommendations import AssociationMatrix, DefaultAppRecommendation
+from appsel.backend.rules import DefaultAppRule, MimeTypeIndex, resolve_rules
+# pylint: disable=unused-import; MimeAppChoiceSettings is re-exported for compatibility
+from appsel.backend.snapshot import (
+    AssociationsSnapshot,
+    MimeAppChoiceSettings,
+    SECTION_ADDED,
+    SECTION_DEFAULTS,
+    SECTION_MIME_CACHE,
+    SECTION_REMOVED,
+    freeze_section,
+)
+
+class MimeAppsListIssueType(enum.Enum):
+    """Kinds of problems found in mimeapps.list files."""
+    # The desktop entry referenced does not exist (e.g. the app was uninstalled)
+    DANGLING = "dangling"
+    # The desktop entry is listed more than once for the same MIME type and section
+    DUPLICATE = "duplicate"
+    # The desktop entry is in both Added Associations and Removed Associations for the same MIME type
+    CONTRADICTORY = "contradictory"
 
 @dataclass
-class MimeAppChoiceSettings:
-    """Represents details for a default application choice."""
-    # Whether the entry is disabled via Removed Associations
-    disabled: bool = False
-
-    # Whether the entry is a custom association
-    custom: bool = False
-
-    # Whether the entry is set as default
-    default: bool = False
-
+class MimeAppsListIssue:
+    """Represents a problem with a single entry in a mimeapps.list file."""
+    issue_type: MimeAppsListIssueType
+    path: str
+    section: str
+    mimetype: str
+    app_id: str
+
+    def __str__(self):
+        return f"{self.path}: [{self.section}] {self.mimetype}: {self.issue_type.value} entry {self.app_id!r}"
+
+@metrics.instrument_methods
 class MimeTypesManager():
     """
     Class to enumerate and manage default applications for MIME types.
     All functions in this class expect MIME types as strings instead of QMimeType instances.
+
+    Lookups read from an immutable AssociationsSnapshot (see snapshot()), so they are safe from any thread. Changes
+    are serialized by a lock and publish a new snapshot once complete. mimeapps_db and mimeinfo_cache are the
+    writer's working copy and should only be read from the thread making changes.
     """
     CONFIGPARSER_CONVERTERS = {'list': lambda value: value.strip(';').split(';')}
     @classmethod
     def _get_configparser(cls):
         # strict=False Ignore duplicates when parsing
-        loader = configparser.ConfigParser(strict=False, converters=cls.CONFIGPARSER_CONVERTERS)
+        loader = LineNumberingConfigParser(strict=False, converters=cls.CONFIGPARSER_CONVERTERS)
         loader.optionxform = str  # case sensitive keys
         return loader
 
-    def __init__(self, desktop_entries: str, *, paths: List[str] = None, cache_paths: List[str] = None) -> List[str]:
+    def __init__(self, desktop_entries: str, *, paths: List[str] = None, cache_paths: List[str] = None,
+                 parsed_files: Dict[str, configparser.ConfigParser] = None, fs: FileSystem = None,
+                 change_log_path: str = None) -> List[str]:
         self.desktop_entries = desktop_entries
+        # Use the same filesystem as the desktop entries by default
+        self.fs = fs or getattr(desktop_entries, 'fs', REAL_FILESYSTEM)
+        # Changes made through this class, for syncing them to other machines (see export_changes()). Only the
+        # user's own mimeapps.list files are logged by default: managers of other trees (given as paths) aren't
+        if change_log_path is None and paths is None:
+            change_log_path = os.path.join(
+                xdgpaths.writable_location(xdgpaths.STATE_LOCATION), 'appsel', 'changes.jsonl')
+        self.change_log = None if change_log_path is None else ChangeLog(change_log_path, fs=self.fs)
+        # Parsed mimeapps.list and mimeinfo.cache files by path. This can be shared between several read-only
+        # managers to avoid parsing common layers more than once
+        self._parsed_files = {} if parsed_files is None else parsed_files
 
-        self.qmimedb = QMimeDatabase()
         self.mimeapps_db = collections.defaultdict(dict)
         self.mimeapps_local = None
         self.mimeapps_local_path = None
+        # Line model of the writable mimeapps.list, loaded on the first write
+        self._local_file = None
+        self.mimeapps_paths = []
         self.mimeinfo_cache = collections.defaultdict(list)
+        self.mimeinfo_cache_paths = []
+        # Section -> MIME type -> LayerEntry per file, recorded while loading so explain() never re-reads files
+        self.layers = collections.defaultdict(dict)
+        # Callbacks run with the MIME type name whenever associations for that type are changed
+        self._change_listeners = []
+        # Index of supported MIME types for matching rules, built on first use
+        self._rules_index = None
+        self._write_lock = threading.RLock()
+        self._snapshot = None
+        # Association matrix for recommendations, and the snapshot it was built from
+        self._matrix = (None, None)
 
         self._initialize_mimeapps(paths=paths)
         self._initialize_mimeinfo_cache(paths=cache_paths)
+        self._publish()
+
+    def snapshot(self) -> AssociationsSnapshot:
+        """Returns the current read-only snapshot of all associations."""
+        return self._snapshot
+
+    def _publish(self, sections=(SECTION_DEFAULTS, SECTION_ADDED, SECTION_REMOVED, SECTION_MIME_CACHE)):
+        """
+        Helper: publishes a new snapshot, copying the given sections from the working copy and sharing the rest
+        with the previous snapshot.
+        """
+        previous = self._snapshot
+        fields = {}
+        if SECTION_DEFAULTS in sections or previous is None:
+            fields['defaults'] = freeze_section(self.mimeapps_db[SECTION_DEFAULTS])
+            fields['local_defaults'] = frozenset(self.mimeapps_local[SECTION_DEFAULTS]) \
+                if self.mimeapps_local.has_section(SECTION_DEFAULTS) else frozenset()
+        if SECTION_ADDED in sections or previous is None:
+            fields['added'] = freeze_section(self.mimeapps_db[SECTION_ADDED])
+        if SECTION_REMOVED in sections or previous is None:
+            fields['removed'] = freeze_section(self.mimeapps_db[SECTION_REMOVED])
+            fields['local_removed'] = freeze_section({
+                # pylint: disable=no-member; false positive from custom converter
+                mimetype: self.mimeapps_local.getlist(SECTION_REMOVED, mimetype)
+                for mimetype in (self.mimeapps_local.options(SECTION_REMOVED)
+                                 if self.mimeapps_local.has_section(SECTION_REMOVED) else [])
+            })
+        if SECTION_MIME_CACHE in sections or previous is None:
+            fields['mimeinfo_cache'] = freeze_section(self.mimeinfo_cache)
+        layers = dict(previous.layers) if previous else {}
+        for section in (SECTION_DEFAULTS, SECTION_ADDED, SECTION_REMOVED, SECTION_MIME_CACHE):
+            if section in sections or previous is None:
+                layers[section] = freeze_section(self.layers[section])
+        fields['layers'] = types.MappingProxyType(layers)
+
+        if previous is None:
+            self._snapshot = AssociationsSnapshot(version=0, desktop_entries=self.desktop_entries, **fields)
+        else:
+            # Assigning the new snapshot is atomic, so readers see either the old or the new version
+            self._snapshot = dataclasses.replace(previous, version=previous.version + 1, **fields)
+
+    def add_change_listener(self, callback: Callable[[str], None]):
+        """Registers a callback to run with the MIME type name whenever associations for that type change."""
+        self._change_listeners.append(callback)
+
+    def remove_change_listener(self, callback: Callable[[str], None]):
+        """Unregisters a callback added with add_change_listener()."""
+        self._change_listeners.remove(callback)
+
+    def _notify_changed(self, mimetype: str):
+        for callback in self._change_listeners:
+            callback(mimetype)
+
+    def _read_config(self, path: str) -> configparser.ConfigParser:
+        """Helper: returns the parsed contents of a mimeapps.list or mimeinfo.cache file, reading it only once."""
+        try:
+            return self._parsed_files[path]
+        except KeyError:
+            self._parsed_files[path] = loader = self._parse_file(path)
+            return loader
+
+    def _parse_file(self, path: str) -> LineNumberingConfigParser:
+        """Helper: reads and parses a mimeapps.list or mimeinfo.cache file through self.fs."""
+        loader = self._get_configparser()
+        try:
+            loader.read_string(self.fs.read_text(path), source=path)
+        except FileNotFoundError:
+            pass  # Treated as empty, like ConfigParser.read()
+        return loader
 
     def _initialize_mimeapps(self, paths=None):
         """Initialize mimeapps.list database, which is used to manage preferred applications and custom associations."""
         if paths is None:
             # Use system wide + user specific mimeapps.list paths
-            paths = self._get_mimeapps_list_paths()
-            print("mimeapps.list paths:", self._get_mimeapps_list_paths())
+            paths = self._get_mimeapps_list_paths(fs=self.fs)
+            logging.debug("mimeapps.list paths: %s", paths)
 
         if not paths:
             # If no paths were found, use $XDG_CONFIG_HOME/mimeapps.list (~/.config/mimeapps.list)
-            paths = [os.path.join(QStandardPaths.writableLocation(QStandardPaths.ConfigLocation), "mimeapps.list")]
+            paths = [os.path.join(xdgpaths.writable_location(xdgpaths.CONFIG_LOCATION), "mimeapps.list")]
 
+        self.mimeapps_paths = paths
         # For each location of mimeapps.list, merge the definitions into a single store
         # Since each section specifies a list, we can't use configparser's built-in handling of multiple files,
         # since that overrides already seen keys
         self.mimeapps_db.clear()
+        for section in (SECTION_ADDED, SECTION_DEFAULTS, SECTION_REMOVED):
+            self.layers[section] = {}
         for path in paths:
-            loader = self._get_configparser()
-            loader.read(path)
+            loader = self._read_config(path)
             logging.debug("Reading mimeapps.list entries from %s", path)
 
             # Treat the first mimeapps.list path as the writable one. Usually this will be ~/.config/mimeapps.list
@@ -86,90 +214,232 @@ class MimeTypesManager():
                     for key in loader.options(section):
                         existing = db_section.get(key, [])
                         # pylint: disable=no-member; false positive from custom converter
-                        db_section[key] = existing + loader.getlist(section, key)
+                        apps = loader.getlist(section, key)
+                        db_section[key] = existing + apps
+                        self.layers[section].setdefault(key, []).append(
+                            LayerEntry(path, self._get_line_number(path, loader, section, key), tuple(apps)))
 
     def _initialize_mimeinfo_cache(self, paths=None):
         """Initialize mimeinfo.cache store, which is used to map MIME apps to a list of programs that handle them.
 
         This file is also used to set fallback file associations if no default is set by mimeapps.list"""
         if not paths:
-            paths = QStandardPaths.locateAll(QStandardPaths.ApplicationsLocation, "mimeinfo.cache")
+            paths = xdgpaths.locate_all(xdgpaths.APPLICATIONS_LOCATION, "mimeinfo.cache", fs=self.fs)
 
+        self.mimeinfo_cache_paths = paths
         self.mimeinfo_cache.clear()
+        self.layers[SECTION_MIME_CACHE] = layers = {}
         for path in paths:
-            loader = self._get_configparser()
-            loader.read(path)
+            loader = self._read_config(path)
             logging.debug("Reading mimeinfo.cache entries from %s", path)
             if loader.has_section(SECTION_MIME_CACHE):
                 for key in loader.options(SECTION_MIME_CACHE):
                     # pylint: disable=no-member; false positive from custom converter
-                    self.mimeinfo_cache[key] += loader.getlist(SECTION_MIME_CACHE, key)
+                    apps = loader.getlist(SECTION_MIME_CACHE, key)
+                    self.mimeinfo_cache[key] += apps
+                    layers.setdefault(key, []).append(
+                        LayerEntry(path, loader.line_numbers.get((SECTION_MIME_CACHE, key)), tuple(apps)))
+
+    def _get_line_number(self, path: str, loader: LineNumberingConfigParser, section: str, key: str) -> Optional[int]:
+        """Helper: returns the line a key was read from, or None if it may have moved since."""
+        if path == self.mimeapps_local_path and self._local_file is not None:
+            # The writable file was changed since it was read. explain() looks up its lines in the line model
+            return None
+        return loader.line_numbers.get((section, key))
+
+    def _update_local_layer(self, section: str, mimetype: str):
+        """Helper: replaces the writable mimeapps.list's layer entry for a key after it was written."""
+        layers = [layer for layer in self.layers[section].get(mimetype, ()) if layer.path != self.mimeapps_local_path]
+        # pylint: disable=no-member; false positive from custom converter
+        apps = self.mimeapps_local.getlist(section, mimetype, fallback=[])
+        if apps:
+            # The writable file is the first layer, since it has the highest priority
+            layers.insert(0, LayerEntry(self.mimeapps_local_path, None, tuple(apps)))
+        if layers:
+            self.layers[section][mimetype] = layers
+        else:
+            self.layers[section].pop(mimetype, None)
 
     @staticmethod
-    def _get_mimeapps_list_paths():
+    def _get_mimeapps_list_paths(current_desktops: List[str] = None, fs: FileSystem = REAL_FILESYSTEM):
         """
         Returns a list of mimeapps.list paths, in order of decreasing priority.
+        current_desktops defaults to the desktops listed in $XDG_CURRENT_DESKTOP.
 
         Based off of: https://specifications.freedesktop.org/mime-apps-spec/latest/ar01s02.html
         """
-        current_desktops = os.environ.get('XDG_CURRENT_DESKTOP', '').split(':')
+        if current_desktops is None:
+            current_desktops = xdgpaths.get_current_desktops()
 
         user_defaults_per_desktop = list(itertools.chain.from_iterable(
-            QStandardPaths.locateAll(QStandardPaths.ConfigLocation, f"{desktop}-mimeapps.list")
+            xdgpaths.locate_all(xdgpaths.CONFIG_LOCATION, f"{desktop}-mimeapps.list", fs=fs)
             for desktop in current_desktops
         ))
-        user_defaults = QStandardPaths.locateAll(QStandardPaths.ConfigLocation, "mimeapps.list")
+        user_defaults = xdgpaths.locate_all(xdgpaths.CONFIG_LOCATION, "mimeapps.list", fs=fs)
 
         global_defaults_per_desktop = list(itertools.chain.from_iterable(
-            QStandardPaths.locateAll(QStandardPaths.ApplicationsLocation,
-                                     f"{desktop}-mimeapps.list")
+            xdgpaths.locate_all(xdgpaths.APPLICATIONS_LOCATION, f"{desktop}-mimeapps.list", fs=fs)
             for desktop in current_desktops
         ))
-        global_defaults = QStandardPaths.locateAll(QStandardPaths.ApplicationsLocation, "mimeapps.list")
+        global_defaults = xdgpaths.locate_all(xdgpaths.APPLICATIONS_LOCATION, "mimeapps.list", fs=fs)
         return user_defaults_per_desktop + user_defaults + global_defaults_per_desktop + global_defaults
 
+    def get_source_paths(self) -> List[str]:
+        """
+        Returns the mimeapps.list and mimeinfo.cache files associations are loaded from, and the directories new
+        mimeapps.list files may be created in (e.g. a first ~/.config/mimeapps.list), for polling their mtimes.
+        """
+        directories = xdgpaths.standard_locations(xdgpaths.CONFIG_LOCATION) + \
+            xdgpaths.standard_locations(xdgpaths.APPLICATIONS_LOCATION)
+        return list(dict.fromkeys(self.mimeapps_paths + self.mimeinfo_cache_paths + directories))
+
+    def get_supported_mimetypes(self) -> Set[str]:
+        """Returns all MIME types supported by at least one installed app, natively or via a custom association."""
+        return self._snapshot.get_supported_mimetypes()
+
+    def preview_rules(self, rules: List[DefaultAppRule]) -> Dict[str, Tuple[Optional[str], str]]:
+        """
+        Returns the MIME types whose default would change by applying rules, as a dict of
+        MIME type to (current default app, new default app).
+
+        Rules only match MIME types supported by at least one installed app.
+        """
+        if self._rules_index is None:
+            self._rules_index = MimeTypeIndex(self.get_supported_mimetypes())
+        changes = {}
+        for mimetype, app_id in resolve_rules(rules, self._rules_index).items():
+            current_app = self.get_default_app(mimetype)
+            if current_app != app_id or not self.has_default(mimetype):
+                changes[mimetype] = (current_app, app_id)
+        return changes
+
+    def apply_rules(self, rules: List[DefaultAppRule]) -> Dict[str, Tuple[Optional[str], str]]:
+        """
+        Sets default apps according to rules in one write, and returns the changes made (see preview_rules()).
+        """
+        changes = self.preview_rules(rules)
+        self.set_default_apps({mimetype: app_id for mimetype, (_, app_id) in changes.items()})
+        return changes
+
+    def recommend_defaults(self, app_id: str,
+                           get_parents: Callable[[str], List[str]] = None) -> List[DefaultAppRecommendation]:
+        """
+        Returns the MIME types app_id should become the default for, best first: types of a media type it opens
+        more of than their current default app does, and types whose parent type (looked up with get_parents, if
+        given) already defaults to it.
+        """
+        snapshot, matrix = self._matrix
+        if snapshot is not self._snapshot:
+            # The matrix covers every app, so it is reused until associations change
+            matrix = AssociationMatrix(self._snapshot)
+            self._matrix = (self._snapshot, matrix)
+        return matrix.recommend(app_id, get_parents=get_parents)
+
+    def iter_layer_entries(self) -> Iterator[Tuple[str, str, str, int, str]]:
+        """
+        Yields (path, section, mimetype, position, app_id) for each entry in every mimeapps.list and mimeinfo.cache
+        file, in order of decreasing priority.
+        """
+        for path, sections in itertools.chain(
+                ((path, (SECTION_DEFAULTS, SECTION_ADDED, SECTION_REMOVED)) for path in self.mimeapps_paths),
+                ((path, (SECTION_MIME_CACHE,)) for path in self.mimeinfo_cache_paths)):
+            loader = self._read_config(path)
+            for section in sections:
+                if not loader.has_section(section):
+                    continue
+                for mimetype in loader.options(section):
+                    # pylint: disable=no-member; false positive from custom converter
+                    for position, app_id in enumerate(loader.getlist(section, mimetype)):
+                        yield path, section, mimetype, position, app_id
+
+    def get_all_mimetypes(self) -> Set[str]:
+        """Returns all MIME types that have an entry in mimeinfo.cache or any mimeapps.list section."""
+        return self._snapshot.get_all_mimetypes()
+
     def get_default_app(self, mimetype: str, use_fallback: bool = True):
         """
         Returns the default application for the MIME type, or None if none is set.
         """
-        default_entries = self.mimeapps_db[SECTION_DEFAULTS].get(mimetype, [])
-        disabled_entries = self.mimeapps_db[SECTION_REMOVED].get(mimetype, [])
-        for entry_id in default_entries:
-            if entry_id in self.desktop_entries.entries and entry_id not in disabled_entries:
-                return entry_id
+        return self._snapshot.get_default_app(mimetype, use_fallback=use_fallback)
 
-        if use_fallback:
-            fallback_entries = self.mimeinfo_cache.get(mimetype, [])
-            for entry_id in fallback_entries:
-                if entry_id in self.desktop_entries.entries and entry_id not in disabled_entries:
-                    return entry_id
-        return None  # Not found
-
-    def _write(self):
-        with open(self.mimeapps_local_path, 'w') as f:
-            self.mimeapps_local.write(f, space_around_delimiters=False)
+    def explain(self, mimetype: str) -> Explanation:
+        """
+        Returns how the default application for the MIME type was chosen: each entry listed for it, with the file
+        and line it comes from, and whether it was selected, skipped, or not reached.
+        """
+        explanation = explain(self._snapshot, mimetype)
+        if self._local_file is not None:
+            # Writes to the writable file move its lines, so they are looked up in its line model instead
+            with self._write_lock:
+                for step in explanation.steps:
+                    if step.path == self._local_file.path:
+                        step.line = self._local_file.get_line_number(step.section, mimetype)
+        return explanation
+
+    def _write(self, keys: Iterable[Tuple[str, str]]):
+        """
+        Helper: saves the given (section, MIME type) entries of the writable mimeapps.list, leaving the rest of the
+        file untouched.
+        """
+        if self._local_file is None:
+            self._local_file = MimeAppsListFile(self.mimeapps_local_path, fs=self.fs)
+        for section, mimetype in keys:
+            if self.mimeapps_local.has_option(section, mimetype):
+                self._local_file.set(section, mimetype, self.mimeapps_local.get(section, mimetype, raw=True))
+            else:
+                self._local_file.remove(section, mimetype)
+            self._update_local_layer(section, mimetype)
+        self._local_file.save()
+
+    def _record_changes(self, changes: List[ChangeArguments]):
+        """Helper: records changes once they were written, if this manager keeps a change log."""
+        if self.change_log is not None:
+            self.change_log.record_all(changes)
 
     def has_default(self, mimetype: str) -> bool:
         """Returns whether a default for the MIME type was explicitly set."""
-        if SECTION_DEFAULTS not in self.mimeapps_local:
-            return False
-        return mimetype in self.mimeapps_local[SECTION_DEFAULTS]
+        return self._snapshot.has_default(mimetype)
 
     def set_default_app(self, mimetype: str, app_id: str):
         """
         Sets the default application for the MIME type.
         """
+        self.set_default_apps({mimetype: app_id})
+
+    def set_default_apps(self, defaults: Dict[str, str]):
+        """
+        Sets the default application for several MIME types (a dict of MIME type to app ID), writing only once.
+        """
+        if not defaults:
+            return
+        with self._write_lock:
+            changes = []
+            for mimetype, app_id in defaults.items():
+                changes.append((ChangeKind.SET_DEFAULT, mimetype, app_id, self._get_local_default(mimetype)))
+                self._set_default_entry(mimetype, app_id)
+            self._write((SECTION_DEFAULTS, mimetype) for mimetype in defaults)
+            self._publish((SECTION_DEFAULTS,))
+            # Only changes that were saved are recorded
+            self._record_changes(changes)
+        for mimetype in defaults:
+            self._notify_changed(mimetype)
+
+    def _get_local_default(self, mimetype: str) -> Optional[str]:
+        """Helper: returns the default app set in the writable mimeapps.list, if any."""
+        # pylint: disable=no-member; false positive from custom converter
+        apps = self.mimeapps_local.getlist(SECTION_DEFAULTS, mimetype, fallback=[])
+        return apps[0] if apps else None
+
+    def _set_default_entry(self, mimetype: str, app_id: str):
+        """Helper: sets the default app in the working copy, without writing it."""
         logging.debug("Setting app %s as default for %s", app_id, mimetype)
-        self.mimeapps_db[SECTION_DEFAULTS][mimetype] = [app_id]
         if SECTION_DEFAULTS not in self.mimeapps_local:
             self.mimeapps_local[SECTION_DEFAULTS] = {}
+        self.mimeapps_db[SECTION_DEFAULTS][mimetype] = [app_id]
         self.mimeapps_local[SECTION_DEFAULTS][mimetype] = app_id
-        self._write()
 
-    def clear_default_app(self, mimetype: str):
-        """
-        Clears the user-defined default application for the MIME type.
-        """
+    def _clear_default_entry(self, mimetype: str) -> Optional[str]:
+        """Helper: clears the user defined default app in the working copy, and returns it (or None if unset)."""
         logging.debug("Clearing default for %s", mimetype)
         try:
             # pylint: disable=no-member; false positive from custom converter
@@ -178,8 +448,21 @@ class MimeTypesManager():
             self.mimeapps_db[SECTION_DEFAULTS][mimetype].remove(current_default)
         except (KeyError, IndexError, configparser.NoSectionError):
             logging.warning("Tried to clear default app on mimetype %s when none was set", mimetype, exc_info=True)
-        else:
-            self._write()
+            return None
+        return current_default
+
+    def clear_default_app(self, mimetype: str):
+        """
+        Clears the user-defined default application for the MIME type.
+        """
+        with self._write_lock:
+            current_default = self._clear_default_entry(mimetype)
+            if current_default is None:
+                return
+            self._write([(SECTION_DEFAULTS, mimetype)])
+            self._publish((SECTION_DEFAULTS,))
+            self._record_changes([(ChangeKind.CLEAR_DEFAULT, mimetype, None, current_default)])
+        self._notify_changed(mimetype)
 
     def get_supported_apps(self, mimetype: str) -> Dict[str, MimeAppChoiceSettings]:
         """
@@ -187,56 +470,17 @@ class MimeTypesManager():
 
         This includes apps that support the type natively as well as custom associations added via mimeapps.list
         """
-        disabled_apps = self.mimeapps_db[SECTION_REMOVED].get(mimetype, [])
-        default_app = self.get_default_app(mimetype, use_fallback=False)
-
-        results = {}
-        # Add all associations from .desktop entries (mimeinfo.cache)
-        for app_id in self.mimeinfo_cache.get(mimetype, []):
-            disabled = app_id in disabled_apps
-            # XXX: Mark as enabled apps that have been disabled at the global level but aren't at the local level.
-            # Technically the XDG Mime spec tells us to apply mimeapps.list removed associations at each path
-            # containing desktop entries, but we simplify to only store one global mimeapps.list DB.
-            local_apps_path = QStandardPaths.writableLocation(QStandardPaths.ApplicationsLocation)
-            # pylint: disable=no-member
-            if self.desktop_entries.desktop_entry_paths.get(app_id, '').startswith(local_apps_path) and \
-                    app_id not in self.mimeapps_local.getlist(SECTION_REMOVED, mimetype, fallback=[]):
-                logging.info("Overriding global Removed Associations state for app_id=%s, mimetype=%s",
-                             app_id, mimetype)
-                disabled = False
-            results[app_id] = MimeAppChoiceSettings(disabled=disabled, custom=False, default=app_id == default_app)
-        # Add all custom associations from mimeapps.list
-        for app_id in self.mimeapps_db[SECTION_ADDED].get(mimetype, []):
-            if app_id in disabled_apps:
-                logging.warning("Found app %s in both added and removed associations section? This is invalid. (mimetype=%s)",
-                                app_id, mimetype)
-            results[app_id] = MimeAppChoiceSettings(disabled=False, custom=True, default=app_id == default_app)
-
-        return results
+        return self._snapshot.get_supported_apps(mimetype)
 
     def get_supported_types(self, app_id: str) -> Dict[str, MimeAppChoiceSettings]:
         """
         Returns a dict of MIME types that are supported by an application, along with details of the default choice.
         """
-        # Get all types registered in the .desktop entry
-        supported = {mimetype: MimeAppChoiceSettings(disabled=False, custom=False, default=None)
-                     for mimetype in self.desktop_entries.entries[app_id].getMimeTypes()}
-        # Add in custom associations
-        for mimetype, apps in self.mimeapps_db[SECTION_ADDED].items():
-            if app_id in apps:
-                supported[mimetype] = MimeAppChoiceSettings(disabled=False, custom=True, default=None)
-        # Add in disabled associations
-        for mimetype, apps in self.mimeapps_db[SECTION_REMOVED].items():
-            if mimetype in supported and app_id in apps:
-                supported[mimetype].disabled = True
-        # Enumerate defaults for each app
-        for mimetype in supported:
-            supported[mimetype].default = app_id == self.get_default_app(mimetype)
-        return supported
-
-    def _update_list(self, mimetype: str, app_id: str, section: str, *, remove: bool = False):
-        """
-        Helper: adds or removes app_id to the specified section for mimetype.
+        return self._snapshot.get_supported_types(app_id)
+
+    def _update_list_entry(self, mimetype: str, app_id: str, section: str, *, remove: bool = False):
+        """
+        Helper: adds or removes app_id to the specified section for mimetype in the working copy, without writing it.
         """
         # Add the app to both the local DB and the combined state (global and local entries)
         # pylint: disable=no-member; false positive from custom converter
@@ -253,9 +497,8 @@ class MimeTypesManager():
             if not self.mimeapps_local.has_section(section):
                 self.mimeapps_local[section] = {}
             self.mimeapps_local[section][mimetype] = ';'.join(applist_local)
-        else:
+        elif self.mimeapps_local.has_option(section, mimetype):
             del self.mimeapps_local[section][mimetype]
-        self._write()
 
         applist_global = self.mimeapps_db[section].setdefault(mimetype, [])
         if remove:
@@ -266,14 +509,29 @@ class MimeTypesManager():
         else:
             if app_id not in applist_global:
                 applist_global.append(app_id)
+        if section == SECTION_ADDED:
+            # Custom associations change which types are supported
+            self._rules_index = None
         logging.debug('%s for %s is now %s in local copy', section, mimetype, applist_local)
         logging.debug('%s for %s is now %s in global cache', section, mimetype, applist_global)
 
+    def _update_list(self, mimetype: str, app_id: str, kind: ChangeKind):
+        """
+        Helper: adds or removes app_id to the section edited by an association change for mimetype.
+        """
+        section, remove = ASSOCIATION_CHANGES[kind]
+        with self._write_lock:
+            self._update_list_entry(mimetype, app_id, section, remove=remove)
+            self._write([(section, mimetype)])
+            self._publish((section,))
+            self._record_changes([(kind, mimetype, app_id, None)])
+        self._notify_changed(mimetype)
+
     def add_association(self, mimetype: str, app_id: str):
         """
         Registers a new desktop entry to the MIME type.
         """
-        self._update_list(mimetype, app_id, SECTION_ADDED, remove=False)
+        self._update_list(mimetype, app_id, ChangeKind.ADD_ASSOCIATION)
 
     def disable_association(self, mimetype: str, app_id: str):
         """Disable an association for a mimetype."""
@@ -282,7 +540,7 @@ class MimeTypesManager():
                             mimetype, app_id)
             return
 
-        self._update_list(mimetype, app_id, SECTION_REMOVED, remove=False)
+        self._update_list(mimetype, app_id, ChangeKind.DISABLE_ASSOCIATION)
 
     def enable_association(self, mimetype: str, app_id: str):
         """Enables an association for a mimetype."""
@@ -294,7 +552,7 @@ class MimeTypesManager():
                             app_id, mimetype)
             return
 
-        self._update_list(mimetype, app_id, SECTION_REMOVED, remove=True)
+        self._update_list(mimetype, app_id, ChangeKind.ENABLE_ASSOCIATION)
 
     def remove_association(self, mimetype: str, app_id: str):
         """Removes a custom association for a mimetype."""
@@ -307,4 +565,165 @@ class MimeTypesManager():
                             app_id, mimetype)
             return
 
-        self._update_list(mimetype, app_id, SECTION_ADDED, remove=True)
+        self._update_list(mimetype, app_id, ChangeKind.REMOVE_ASSOCIATION)
+
+    def export_changes(self, since: int = 0) -> dict:
+        """
+        Returns the changes made after sequence number since, compacted to the last change of each entry, as a
+        JSON-serializable delta for apply_delta() on another machine. Its last_sequence is the since to use next time.
+        """
+        with self._write_lock:
+            if self.change_log is None:
+                return export_delta([], since)
+            return self.change_log.export_delta(since)
+
+    def _check_change(self, change: Change) -> Tuple[bool, Optional[str]]:
+        """
+        Helper: returns whether a change from another machine is already in effect here, and why it conflicts with
+        local edits (or None if it doesn't).
+        """
+        mimetype, app_id = change.mimetype, change.app_id
+        if change.kind in ASSOCIATION_CHANGES:
+            section, remove = ASSOCIATION_CHANGES[change.kind]
+            # pylint: disable=no-member; false positive from custom converter
+            if (app_id in self.mimeapps_local.getlist(section, mimetype, fallback=[])) != remove:
+                return True, None
+            if change.kind is ChangeKind.ADD_ASSOCIATION and \
+                    app_id in self.mimeapps_db[SECTION_REMOVED].get(mimetype, []):
+                return False, "the association is disabled locally"
+            if change.kind is ChangeKind.DISABLE_ASSOCIATION and \
+                    app_id in self.mimeapps_db[SECTION_ADDED].get(mimetype, []):
+                return False, "the app is a custom association locally"
+            return False, None
+
+        local_default = self._get_local_default(mimetype)
+        if local_default == app_id:
+            return True, None
+        if local_default != change.previous_app:
+            return False, f"the default was changed locally to {local_default or 'nothing'}"
+        if app_id is not None and app_id not in self.desktop_entries.entries:
+            return False, f"{app_id} is not installed"
+        return False, None
+
+    def apply_delta(self, changes: List[Change], *, overwrite: bool = False, dry_run: bool = False) -> DeltaResult:
+        """
+        Replays changes exported from another machine (see export_changes()) in a single write, and returns which
+        were applied, which were already in effect, and which conflict with local edits.
+
+        Conflicting changes are skipped, except default changes when overwrite is set. Applied changes are recorded
+        in this machine's change log. With dry_run, nothing is changed.
+        """
+        result = DeltaResult(applied=[], unchanged=[], conflicts=[])
+        keys = {}  # (section, MIME type) entries to write, in order
+        recorded = []  # Arguments of the changes to record once they are written
+        with self._write_lock:
+            for change in changes:
+                in_effect, conflict = self._check_change(change)
+                if in_effect:
+                    result.unchanged.append(change)
+                    continue
+                if conflict and not (overwrite and change.kind not in ASSOCIATION_CHANGES):
+                    result.conflicts.append(ChangeConflict(change, conflict))
+                    continue
+                result.applied.append(change)
+                if dry_run:
+                    continue
+
+                mimetype, app_id = change.mimetype, change.app_id
+                if change.kind is ChangeKind.SET_DEFAULT:
+                    recorded.append((change.kind, mimetype, app_id, self._get_local_default(mimetype)))
+                    self._set_default_entry(mimetype, app_id)
+                elif change.kind is ChangeKind.CLEAR_DEFAULT:
+                    recorded.append((change.kind, mimetype, None, self._clear_default_entry(mimetype)))
+                else:
+                    recorded.append((change.kind, mimetype, app_id, None))
+                    section, remove = ASSOCIATION_CHANGES[change.kind]
+                    self._update_list_entry(mimetype, app_id, section, remove=remove)
+                keys[change.get_key()[:2]] = None
+            if keys:
+                self._write(keys)
+                self._publish({section for section, _mimetype in keys})
+                self._record_changes(recorded)
+        for mimetype in dict.fromkeys(mimetype for _section, mimetype in keys):
+            self._notify_changed(mimetype)
+        logging.info("Applied %d changes (%d already in effect, %d conflicts)",
+                     len(result.applied), len(result.unchanged), len(result.conflicts))
+        return result
+
+    def _check_mimeapps_list(self, path: str, loader: configparser.ConfigParser) -> List[MimeAppsListIssue]:
+        """
+        Helper: returns a list of issues found in a single mimeapps.list layer.
+        """
+        issues = []
+        for section in (SECTION_DEFAULTS, SECTION_ADDED, SECTION_REMOVED):
+            if not loader.has_section(section):
+                continue
+            for mimetype in loader.options(section):
+                seen = set()
+                # pylint: disable=no-member; false positive from custom converter
+                for app_id in loader.getlist(section, mimetype):
+                    if app_id in seen:
+                        issues.append(MimeAppsListIssue(MimeAppsListIssueType.DUPLICATE, path, section, mimetype, app_id))
+                        continue
+                    seen.add(app_id)
+                    if app_id not in self.desktop_entries.entries:
+                        issues.append(MimeAppsListIssue(MimeAppsListIssueType.DANGLING, path, section, mimetype, app_id))
+                    elif section == SECTION_ADDED and \
+                            app_id in loader.getlist(SECTION_REMOVED, mimetype, fallback=[]):
+                        issues.append(MimeAppsListIssue(MimeAppsListIssueType.CONTRADICTORY,
+                                                        path, section, mimetype, app_id))
+        return issues
+
+    def check_mimeapps_lists(self) -> List[MimeAppsListIssue]:
+        """
+        Returns a list of stale or invalid entries found in each mimeapps.list layer: references to desktop entries
+        that don't exist, duplicate entries, and apps listed in both Added and Removed Associations.
+        """
+        issues = []
+        for path in self.mimeapps_paths:
+            if path == self.mimeapps_local_path:
+                loader = self.mimeapps_local
+            else:
+                loader = self._parse_file(path)
+            issues += self._check_mimeapps_list(path, loader)
+        for issue in issues:
+            logging.info("mimeapps.list check: %s", issue)
+        return issues
+
+    def compact_mimeapps_list(self) -> List[MimeAppsListIssue]:
+        """
+        Removes stale and invalid entries from the writable mimeapps.list in one write, and returns the issues that
+        were fixed.
+
+        Dangling and duplicate entries are dropped. For contradictory entries, the custom association is removed,
+        since custom associations are removed rather than disabled elsewhere in this class.
+        """
+        with self._write_lock:
+            issues = self._check_mimeapps_list(self.mimeapps_local_path, self.mimeapps_local)
+            if not issues:
+                return issues
+
+            stale = {(issue.section, issue.mimetype, issue.app_id) for issue in issues
+                     if issue.issue_type is not MimeAppsListIssueType.DUPLICATE}
+            # Only entries with issues are rewritten, so the rest of the file keeps its formatting
+            changed = {(issue.section, issue.mimetype) for issue in issues}
+            for section, mimetype in changed:
+                # pylint: disable=no-member; false positive from custom converter
+                applist = self.mimeapps_local.getlist(section, mimetype)
+                compacted = [app_id for app_id in dict.fromkeys(applist)
+                             if (section, mimetype, app_id) not in stale]
+                if compacted:
+                    self.mimeapps_local[section][mimetype] = ';'.join(compacted)
+                else:
+                    self.mimeapps_local.remove_option(section, mimetype)
+            self._write(changed)
+
+            # Rebuild the merged view, since the local entries we dropped may have been shadowing other layers
+            self.mimeapps_local = None
+            self._initialize_mimeapps(paths=self.mimeapps_paths)
+            self._rules_index = None
+            self._publish()
+        logging.info("Removed %d stale entries from %s", len(issues), self.mimeapps_local_path)
+        for mimetype in {issue.mimetype for issue in issues}:
+            self._notify_changed(mimetype)
+        return issues
@@ -0,0 +1,48 @@
+# pylint: disable=invalid-name
+from PyQt5.QtCore import Qt, QAbstractListModel, QVariant
+
+from appsel.backend import metrics, utils
+
+@metrics.instrument_model
+class AppPickerModel(QAbstractListModel):
+    """
+    Lists applications from a shared AppCatalog matching a search query, ranked for a target MIME type.
+    """
+    def __init__(self, catalog, mimetype: str = None):
+        super().__init__()
+        self.catalog = catalog
+        self.mimetype = mimetype
+        self.query = ''
+        self.apps = catalog.search(mimetype=mimetype)
+
+    def set_query(self, query: str):
+        """Filters the list to apps matching a search query."""
+        # When the query only grew, the new results are a subset of the current ones
+        within = self.apps if self.query and query.casefold().startswith(self.query.casefold()) else None
+        self.beginResetModel()
+        self.apps = self.catalog.search(query, self.mimetype, within=within)
+        self.query = query
+        self.endResetModel()
+
+    def get_app_id(self, row: int):
+        """Returns the app ID at a row, or None if the row is out of range."""
+        try:
+            return self.apps[row].app_id
+        except IndexError:
+            return None
+
+    def data(self, index, role):
+        entry = self.apps[index.row()]
+        if role == Qt.DisplayRole:  # Display text
+            return entry.name
+        if role == Qt.DecorationRole:  # App icon
+            return utils.get_app_icon(self.catalog.manager.desktop_entries, entry.app_id)
+        if role == Qt.ToolTipRole:
+            return entry.app_id
+        return QVariant()
+
+    def rowCount(self, _index):
+        """
+        Return list of rows in the model.
+        """
+        return len(self.apps)
@@ -1,57 +1,95 @@
 
 # pylint: disable=invalid-name
-from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QVariant
+import collections
 
+from PyQt5.QtCore import Qt, QAbstractTableModel, QVariant
+
+from appsel.backend import metrics, utils
+
+@metrics.instrument_model
 class AppsListModel(QAbstractTableModel):
     """
     Enumerates a list of applications (.desktop entries)
     """
     COLUMNS = ["Application", "# Supported File Types", "# Defaults"]
-    def __init__(self, manager):
+    def __init__(self, manager, app_catalog=None):
         super().__init__()
         self.manager = manager
         self.desktop_entries = manager.desktop_entries
+        # Precomputed sort keys: column -> {app ID: key}. App names never change; the count columns
+        # are invalidated on refresh()
+        self._sort_keys = collections.defaultdict(dict)
+        if app_catalog is not None:
+            # The catalog already filtered and sorted the apps by name
+            self.apps = [entry.app_id for entry in app_catalog.entries]
+            self._sort_keys[0] = {entry.app_id: entry.sort_key for entry in app_catalog.entries}
+        else:
+            self.apps = list(filter(self.desktop_entries.is_shown, self.desktop_entries.entries))
         self.refresh(first_run=True)
         self.sort(0)
 
     def refresh(self, first_run=False):
-        self.apps = list(filter(self.desktop_entries.is_shown, self.desktop_entries.entries))
-        if not first_run:
-            self.dataChanged.emit(QModelIndex(), QModelIndex())
+        self._sort_keys.pop(1, None)
+        self._sort_keys.pop(2, None)
+        if not first_run and self.apps:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self.apps)-1, len(self.COLUMNS)-1))
 
     def _get_app_name(self, index, role):
         app_id = self.apps[index.row()]
         if role == Qt.DisplayRole:  # Display text
             return self.desktop_entries.get_name(app_id)
         if role == Qt.DecorationRole:  # App icon
-            return self.desktop_entries.get_icon(app_id)
+            return utils.get_app_icon(self.desktop_entries, app_id)
         return QVariant()
 
     def _get_num_supported_types(self, index, role):
         app_id = self.apps[index.row()]
         if role == Qt.DisplayRole:  # Display text
-            return len(self.manager.get_supported_types(app_id))
+            return self.get_sort_key(app_id, 1)
         return QVariant()
 
     def _get_num_defaults(self, index, role):
         app_id = self.apps[index.row()]
         if role == Qt.DisplayRole:  # Display text
-            supported_types = self.manager.get_supported_types(app_id)
-            return len([options for options in supported_types.values()
-                        if options.default])
+            return self.get_sort_key(app_id, 2)
         return QVariant()
 
+    def _compute_sort_key(self, app_id, column):
+        """Computes the sort key for an app in the given column."""
+        if column <= 0:
+            return utils.get_collation_key(self.desktop_entries.get_name(app_id))
+        supported_types = self.manager.get_supported_types(app_id)
+        if column == 1:
+            # The defaults count comes from the same lookup, so fill it in as well
+            self._sort_keys[2][app_id] = len([options for options in supported_types.values() if options.default])
+            return len(supported_types)
+        elif column == 2:
+            self._sort_keys[1][app_id] = len(supported_types)
+            return len([options for options in supported_types.values() if options.default])
+        return None
+
+    def get_sort_key(self, app_id, column):
+        """Returns the sort key for an app in the given column, computing it only once."""
+        keys = self._sort_keys[max(column, 0)]
+        try:
+            return keys[app_id]
+        except KeyError:
+            keys[app_id] = key = self._compute_sort_key(app_id, column)
+            return key
+
     def data(self, index, role):
+        if role == utils.SortKeyRole:
+            return self.get_sort_key(self.apps[index.row()], index.column())
         accessors = [self._get_app_name, self._get_num_supported_types, self._get_num_defaults]
         try:
             return accessors[index.column()](index, role)
         except IndexError:
             return QVariant()
 
-    def sort(self, _column, order=Qt.AscendingOrder):
+    def sort(self, column, order=Qt.AscendingOrder):
         """Sorts the model by the given column and order."""
-        self.apps.sort(key=lambda app_id: self.desktop_entries.get_name(app_id).casefold(),
-                       reverse=order != Qt.AscendingOrder)
+        utils.sort_rows(self, self.apps, key=lambda app_id: self.get_sort_key(app_id, column),
+                        reverse=order != Qt.AscendingOrder)
 
     def rowCount(self, _index):
         """
@@ -1,8 +1,11 @@
 
 # pylint: disable=invalid-name
-from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex
+from PyQt5.QtCore import Qt, QAbstractListModel
 from PyQt5.QtGui import QFont
 
+from appsel.backend import metrics, utils
+
+@metrics.instrument_model
 class DefaultAppOptionsModel(QAbstractListModel):
     """
     A model to represent app choices in the when setting the defaults for a MIME type.
@@ -16,9 +19,12 @@ class DefaultAppOptionsModel(QAbstractListModel):
         self.refresh(first_run=True)
 
     def refresh(self, first_run=False):
+        # Rows may be added or removed here, so this is a model reset rather than a data change
+        if not first_run:
+            self.beginResetModel()
         self.apps = list(self.manager.get_supported_apps(self.mimetype).items())
         if not first_run:
-            self.dataChanged.emit(QModelIndex(), QModelIndex())
+            self.endResetModel()
 
     def data(self, index, role):
         app_id, options = self.apps[index.row()]
@@ -36,7 +42,7 @@ class DefaultAppOptionsModel(QAbstractListModel):
 
             return prefix + self.manager.desktop_entries.get_name(app_id)
         if role == Qt.DecorationRole:  # App icon
-            return self.manager.desktop_entries.get_icon(app_id)
+            return utils.get_app_icon(self.manager.desktop_entries, app_id)
         if role == Qt.FontRole:  # Font rendering options
             font = QFont()
             font.setStrikeOut(options.disabled)
@@ -46,7 +52,9 @@ class DefaultAppOptionsModel(QAbstractListModel):
 
     def sort(self, _column, order=Qt.AscendingOrder):
         """Sorts the model by the given column and order."""
-        self.apps.sort(key=lambda item: item[0], reverse=order != Qt.AscendingOrder)
+        get_name = self.manager.desktop_entries.get_name
+        utils.sort_rows(self, self.apps, key=lambda item: utils.get_collation_key(get_name(item[0])),
+                        reverse=order != Qt.AscendingOrder)
 
     def rowCount(self, _index):
         """
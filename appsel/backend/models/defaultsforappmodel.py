@@ -1,10 +1,11 @@
 
 # pylint: disable=invalid-name
-from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QVariant
+from PyQt5.QtCore import Qt, QAbstractTableModel, QVariant
 from PyQt5.QtGui import QFont
 
-from appsel.backend import utils
+from appsel.backend import metrics, utils
 
+@metrics.instrument_model
 class DefaultsForAppModel(QAbstractTableModel):
     """
     Represents a list of MIME types that an application supports.
@@ -21,10 +22,13 @@ class DefaultsForAppModel(QAbstractTableModel):
         self.refresh(first_run=True)
 
     def refresh(self, first_run=False):
+        # Rows may be added or removed here, so this is a model reset rather than a data change
+        if not first_run:
+            self.beginResetModel()
         self.supported_types = list(self.manager.get_supported_types(self.app_id).items())
-        self.supported_types.sort(key=lambda item: item[0].casefold())
+        self.supported_types.sort(key=lambda item: utils.get_collation_key(item[0]))
         if not first_run:
-            self.dataChanged.emit(QModelIndex(), QModelIndex())
+            self.endResetModel()
 
     def data(self, index, role):
         accessors = [self._get_mimetype, self._get_status, self._get_extensions]
@@ -61,7 +65,7 @@ class DefaultsForAppModel(QAbstractTableModel):
                 suffix += ' (auto default)'
             return f'{prefix}{mimetype}{suffix}'
         if role == Qt.DecorationRole:
-            qm = self.manager.qmimedb.mimeTypeForName(mimetype)
+            qm = utils.QMIMEDB.mimeTypeForName(mimetype)
             return utils.get_mimetype_icon(qm)
         if role == Qt.CheckStateRole:
             # A MIME type is:
@@ -81,7 +85,7 @@ class DefaultsForAppModel(QAbstractTableModel):
     def _get_extensions(self, index, role):
         """Returns display data for the File Extensions column."""
         mimetype, options = self.supported_types[index.row()]
-        qm = self.manager.qmimedb.mimeTypeForName(mimetype)
+        qm = utils.QMIMEDB.mimeTypeForName(mimetype)
         if role == Qt.DisplayRole:
             return ",".join(qm.suffixes())
         if role == Qt.FontRole:
@@ -17,8 +17,9 @@ class FilteredAppsListModel(QSortFilterProxyModel):
         searchQuery = super().filterAcceptsRow(sourceRow, sourceParent)
 
         app_id = self.sourceModel().apps[sourceRow]
-        supported_types = self.manager.get_supported_types(app_id)
-        if not supported_types and not self.ui.showAllAppsCheckBox.checkState():
+        # Reuse the cached supported types count from the source model
+        num_supported_types = self.sourceModel().get_sort_key(app_id, 1)
+        if not num_supported_types and not self.ui.showAllAppsCheckBox.checkState():
             return False
 
         return searchQuery
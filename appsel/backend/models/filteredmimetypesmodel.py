@@ -0,0 +1,36 @@
+# pylint: disable=invalid-name
+from PyQt5.QtCore import (
+    QModelIndex,
+    QSortFilterProxyModel
+)
+
+from appsel.backend import utils
+from appsel.backend.typecatalog import TypeKind, matches_kind
+
+class FilteredMimeTypesModel(QSortFilterProxyModel):
+    """
+    Custom QSortFilterProxyModel filtering MIME types based on search query, and on their kind (file types with or
+    without apps, URL handlers).
+    """
+    def __init__(self, parent, kind: TypeKind = TypeKind.WITH_APPS):
+        super().__init__(parent)
+        self.kind = kind
+
+    def set_kind(self, kind: TypeKind):
+        """Only shows MIME types of the given kind."""
+        self.kind = kind
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, sourceRow: int, sourceParent: QModelIndex):
+        mimetype = self.sourceModel().mimetypes[sourceRow]
+        if not matches_kind(mimetype, self.sourceModel().catalog.get_sources(mimetype), self.kind):
+            return False
+        return super().filterAcceptsRow(sourceRow, sourceParent)
+
+    def lessThan(self, left: QModelIndex, right: QModelIndex):
+        if self.sortRole() != utils.SortKeyRole:
+            return super().lessThan(left, right)
+        # Some sort keys are tuples (see utils.get_optional_collation_key()), which Qt can't compare
+        source = self.sourceModel()
+        return source.get_sort_key(source.mimetypes[left.row()], left.column()) < \
+            source.get_sort_key(source.mimetypes[right.row()], right.column())
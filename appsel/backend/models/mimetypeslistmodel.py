@@ -1,41 +1,84 @@
 
 # pylint: disable=invalid-name
-from PyQt5.QtCore import Qt, QAbstractTableModel, QVariant, QModelIndex
+import collections
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QVariant
 from PyQt5.QtGui import QFont
 
-from appsel.backend import utils
+from appsel.backend import metrics, utils
+from appsel.backend.typecatalog import TypeCatalog, TypeSource
 
+@metrics.instrument_model
 class MimeTypesListModel(QAbstractTableModel):
 
     COLUMNS = ["MIME Type", "File Extensions", "Status", "Default Application"]
 
-    def __init__(self, mimetypemanager):
+    def __init__(self, mimetypemanager, type_info=None, catalog: TypeCatalog = None):
         super().__init__()
 
         self.manager = mimetypemanager
-        self.db = mimetypemanager.qmimedb
-        self.mimetypes = []
+        # Source of MIME type details: either utils.QMimeDatabaseTypeInfo or mimecache.MimeCacheDatabase
+        self.type_info = type_info or utils.QMimeDatabaseTypeInfo()
+        self.catalog = catalog or TypeCatalog(mimetypemanager, self.type_info.all_mimetypes())
+        self.catalog.add_listener(self.on_catalog_changed)
+        self.mimetypes = []  # MIME type names
+        # MIME type name -> row, built when first needed and dropped when rows move
+        self._rows = None
         self.load_mime_types()
         self._default_app_cache = {}
+        # Precomputed sort keys: column -> {MIME type name: key}. Keys for the MIME type and
+        # file extension columns only change with the sources of a type; the rest are invalidated on refresh()
+        self._sort_keys = collections.defaultdict(dict)
 
     def load_mime_types(self):
-        self.mimetypes.clear()
-        # Only show MIME types that have at least one app
-        for qmimetype in self.db.allMimeTypes():
-            if qmimetype.name() in self.manager.mimeinfo_cache:
-                self.mimetypes.append(qmimetype)
+        # All types are listed, including those without apps; views filter them by kind
+        self.mimetypes[:] = self.catalog
+        self._rows = None
+
+    def _get_row(self, mimetype: str) -> int:
+        """Returns the row of a MIME type."""
+        if self._rows is None:
+            self._rows = {mimetype: row for row, mimetype in enumerate(self.mimetypes)}
+        return self._rows[mimetype]
+
+    def _forget(self, mimetype: str):
+        """Drops the cached default app and sort keys of a MIME type."""
+        self._default_app_cache.pop(mimetype, None)
+        for keys in self._sort_keys.values():
+            keys.pop(mimetype, None)
+
+    def on_catalog_changed(self, mimetype: str, old_sources: TypeSource, new_sources: TypeSource):
+        """Catalog listener: adds or removes the row for a MIME type, or updates it if its sources changed."""
+        if not old_sources:
+            self.beginInsertRows(QModelIndex(), len(self.mimetypes), len(self.mimetypes))
+            self.mimetypes.append(mimetype)
+            if self._rows is not None:
+                self._rows[mimetype] = len(self.mimetypes) - 1
+            self.endInsertRows()
+            return
+        row = self._get_row(mimetype)
+        self._forget(mimetype)
+        if not new_sources:
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self.mimetypes[row]
+            # Rows below it moved up
+            self._rows = None
+            self.endRemoveRows()
+        else:
+            self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.COLUMNS)-1))
 
     def _get_mimetype(self, index, role):
         """Returns display data for the MIME type column."""
         mimetype = self.mimetypes[index.row()]
 
         if role == Qt.DisplayRole:
-            return mimetype.name()
+            return mimetype
         if role == Qt.DecorationRole:
-            return utils.get_mimetype_icon(mimetype)
+            return utils.get_mimetype_icon_from_names(self.type_info.get_icon_name(mimetype),
+                                                      self.type_info.get_generic_icon_name(mimetype))
         if role == Qt.FontRole:
             font = QFont()
-            font.setBold(self.manager.has_default(mimetype.name()))
+            font.setBold(self.manager.has_default(mimetype))
             return font
 
         return QVariant()
@@ -45,10 +88,10 @@ class MimeTypesListModel(QAbstractTableModel):
         mimetype = self.mimetypes[index.row()]
 
         if role == Qt.DisplayRole:
-            return ",".join(mimetype.suffixes())
+            return ",".join(self.type_info.get_suffixes(mimetype))
         if role == Qt.FontRole:
             font = QFont()
-            font.setBold(self.manager.has_default(mimetype.name()))
+            font.setBold(self.manager.has_default(mimetype))
             return font
 
         return QVariant()
@@ -56,7 +99,7 @@ class MimeTypesListModel(QAbstractTableModel):
     def _get_status(self, index, role):
         """Returns display data for the Status column."""
         mimetype = self.mimetypes[index.row()]
-        default_is_set = self.manager.has_default(mimetype.name())
+        default_is_set = self.manager.has_default(mimetype)
 
         if role == Qt.DisplayRole:
             return "User defined" if default_is_set else "Automatic"
@@ -72,26 +115,57 @@ class MimeTypesListModel(QAbstractTableModel):
         mimetype = self.mimetypes[index.row()]
         if role == Qt.FontRole:
             font = QFont()
-            font.setBold(self.manager.has_default(mimetype.name()))
+            font.setBold(self.manager.has_default(mimetype))
             return font
 
-        if mimetype.name() in self._default_app_cache:
-            default_app_id = self._default_app_cache[mimetype.name()]
-        else:
-            self._default_app_cache[mimetype.name()] = default_app_id = self.manager.get_default_app(mimetype.name())
+        default_app_id = self._lookup_default_app(mimetype)
 
         if default_app_id:
             if role == Qt.DisplayRole:  # Display text
                 return self.manager.desktop_entries.get_name(default_app_id)
             if role == Qt.DecorationRole:  # App icon
-                return self.manager.desktop_entries.get_icon(default_app_id)
+                return utils.get_app_icon(self.manager.desktop_entries, default_app_id)
         else:  # No default app found
             if role == Qt.DisplayRole:
                 return 'None selected'
 
         return QVariant()
 
+    def _lookup_default_app(self, mimetype: str):
+        """Returns the (cached) default application for a MIME type."""
+        if mimetype in self._default_app_cache:
+            return self._default_app_cache[mimetype]
+        self._default_app_cache[mimetype] = default_app_id = self.manager.get_default_app(mimetype)
+        return default_app_id
+
+    def _compute_sort_key(self, mimetype, column):
+        """Computes the sort key for a MIME type in the given column."""
+        if column <= 0:
+            return utils.get_collation_key(mimetype)
+        elif column == 1:
+            suffixes = self.type_info.get_suffixes(mimetype)
+            return utils.get_optional_collation_key(suffixes[0] if suffixes else None)
+        elif column == 2:
+            return int(self.manager.has_default(mimetype))
+        elif column == 3:
+            default_app_id = self._lookup_default_app(mimetype)
+            # Types without a default show up last
+            return utils.get_optional_collation_key(
+                None if default_app_id is None else self.manager.desktop_entries.get_name(default_app_id))
+        return None
+
+    def get_sort_key(self, mimetype, column):
+        """Returns the sort key for a MIME type in the given column, computing it only once."""
+        keys = self._sort_keys[max(column, 0)]
+        try:
+            return keys[mimetype]
+        except KeyError:
+            keys[mimetype] = key = self._compute_sort_key(mimetype, column)
+            return key
+
     def data(self, index, role):
+        if role == utils.SortKeyRole:
+            return self.get_sort_key(self.mimetypes[index.row()], index.column())
         accessors = [self._get_mimetype, self._get_extensions, self._get_status, self._get_default_app]
         try:
             return accessors[index.column()](index, role)
@@ -101,29 +175,18 @@ class MimeTypesListModel(QAbstractTableModel):
     def refresh(self):
         """Refresh the data in this model."""
         self._default_app_cache.clear()
-        self.dataChanged.emit(QModelIndex(), QModelIndex())
+        self._sort_keys.pop(2, None)
+        self._sort_keys.pop(3, None)
+        if self.mimetypes:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self.mimetypes)-1, len(self.COLUMNS)-1))
 
     def sort(self, column, order=Qt.AscendingOrder):
         """Sorts the model by the given column and order."""
         # Note column = -1 is also allowed, meaning the natural order of the list
         # https://doc.qt.io/qt-5/qtableview.html#sortByColumn
-        if column <= 0:
-            self.mimetypes.sort(key=lambda mimetype: mimetype.name(),
-                                reverse=order != Qt.AscendingOrder)
-        elif column == 1:
-            self.mimetypes.sort(key=lambda qmimetype: qmimetype.preferredSuffix() or '\uFFFF',
-                                reverse=order != Qt.AscendingOrder)
-        elif column == 2:
-            self.mimetypes.sort(key=lambda qmimetype: self.manager.has_default(qmimetype.name()),
-                                reverse=order != Qt.AscendingOrder)
-        elif column == 3:
-            def _sort_by_app(mimetype):
-                # \uFFFF is a quick hack to make types without a default show up last
-                return self.manager.get_default_app(mimetype.name()) or '\uFFFF'
-
-            self.mimetypes.sort(key=_sort_by_app,
-                                reverse=order != Qt.AscendingOrder)
-        self.refresh()
+        utils.sort_rows(self, self.mimetypes, key=lambda mimetype: self.get_sort_key(mimetype, column),
+                        reverse=order != Qt.AscendingOrder)
+        self._rows = None
 
     def headerData(self, section, orientation, role):
         if role == Qt.DisplayRole and orientation == Qt.Horizontal:
@@ -0,0 +1,169 @@
+# pylint: disable=invalid-name
+import bisect
+
+from PyQt5.QtCore import Qt, QAbstractItemModel, QModelIndex, QVariant
+from PyQt5.QtGui import QFont
+
+from appsel.backend import metrics, utils
+from appsel.backend.fingerprint import get_media_type
+from appsel.backend.typegroups import MimeTypeGroups
+
+@metrics.instrument_model
+class MimeTypesTreeModel(QAbstractItemModel):
+    """
+    MIME types grouped under their top-level media type (application/, audio/, ...).
+
+    Each group's children are only loaded when the group is expanded (see fetchMore()). Group rows show aggregates
+    from MimeTypeGroups, which are kept up to date incrementally as associations change.
+    """
+    COLUMNS = ["MIME Type", "File Extensions", "Status", "Default Application"]
+
+    def __init__(self, mimetypemanager, mimetypes, type_info=None):
+        super().__init__()
+        self.manager = mimetypemanager
+        self.type_info = type_info or utils.QMimeDatabaseTypeInfo()
+        self.groups = MimeTypeGroups(mimetypemanager, mimetypes)
+        self.filter_text = ''
+        # Media types shown at the top level, and the (filtered) MIME types of each
+        self.media_types = []
+        self._matches = {}
+        # Media types whose children were fetched
+        self._loaded = set()
+        self._apply_filter()
+        # Registered after self.groups, so the aggregates are updated by the time this runs
+        mimetypemanager.add_change_listener(self.on_type_changed)
+
+    def _apply_filter(self):
+        text = self.filter_text.casefold()
+        self._matches = {media_type: [mimetype for mimetype in summary.mimetypes if text in mimetype.casefold()]
+                         if text else summary.mimetypes
+                         for media_type, summary in self.groups.groups.items()}
+        self.media_types = [media_type for media_type, matches in self._matches.items() if matches]
+        self._loaded.clear()
+
+    def set_filter(self, text: str):
+        """Only shows MIME types whose name contains text (case insensitive), and the groups containing them."""
+        self.beginResetModel()
+        self.filter_text = text
+        self._apply_filter()
+        self.endResetModel()
+
+    def get_mimetype(self, index):
+        """Returns the MIME type for an index, or None if it is a group row."""
+        if not index.isValid() or not index.internalId():
+            return None
+        return self._matches[self.media_types[index.internalId() - 1]][index.row()]
+
+    def on_type_changed(self, mimetype: str):
+        """Change listener: updates the rows showing a MIME type and its group."""
+        media_type = get_media_type(mimetype)
+        try:
+            group_row = self.media_types.index(media_type)
+        except ValueError:
+            return
+        last_column = len(self.COLUMNS) - 1
+        self.dataChanged.emit(self.index(group_row, 0), self.index(group_row, last_column))
+        if media_type in self._loaded:
+            matches = self._matches[media_type]
+            row = bisect.bisect_left(matches, mimetype)
+            if row < len(matches) and matches[row] == mimetype:
+                group_index = self.index(group_row, 0)
+                self.dataChanged.emit(self.index(row, 0, group_index), self.index(row, last_column, group_index))
+
+    def refresh(self):
+        """Refresh the data in this model."""
+        # Edits reach the aggregates through change listeners, so this only needs to repaint
+        if self.media_types:
+            self.dataChanged.emit(self.index(0, 0), self.index(len(self.media_types)-1, len(self.COLUMNS)-1))
+
+    def _get_group_data(self, media_type, column, role):
+        summary = self.groups.get_summary(media_type)
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return f"{media_type}/ ({len(summary.mimetypes)})"
+            elif column == 2:
+                return f"{summary.user_defined} user defined, {summary.without_default} without a default"
+            elif column == 3 and summary.dominant_app:
+                return self.manager.desktop_entries.get_name(summary.dominant_app)
+        if role == Qt.DecorationRole and column == 3 and summary.dominant_app:
+            return utils.get_app_icon(self.manager.desktop_entries, summary.dominant_app)
+        if role == Qt.FontRole:
+            font = QFont()
+            font.setBold(column == 0)
+            return font
+        return QVariant()
+
+    def _get_type_data(self, mimetype, column, role):
+        user_defined, default_app_id = self.groups.get_state(mimetype)
+        if role == Qt.FontRole:
+            font = QFont()
+            font.setBold(user_defined)
+            return font
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return mimetype
+            elif column == 1:
+                return ",".join(self.type_info.get_suffixes(mimetype))
+            elif column == 2:
+                return "User defined" if user_defined else "Automatic"
+            elif column == 3:
+                return self.manager.desktop_entries.get_name(default_app_id) if default_app_id else 'None selected'
+        if role == Qt.DecorationRole:
+            if column == 0:
+                return utils.get_mimetype_icon_from_names(self.type_info.get_icon_name(mimetype),
+                                                          self.type_info.get_generic_icon_name(mimetype))
+            elif column == 3 and default_app_id:
+                return utils.get_app_icon(self.manager.desktop_entries, default_app_id)
+        return QVariant()
+
+    def data(self, index, role):
+        mimetype = self.get_mimetype(index)
+        if mimetype is None:
+            return self._get_group_data(self.media_types[index.row()], index.column(), role)
+        return self._get_type_data(mimetype, index.column(), role)
+
+    def index(self, row, column, parent=QModelIndex()):
+        if not self.hasIndex(row, column, parent):
+            return QModelIndex()
+        # Group rows have an internal ID of 0, and MIME type rows the position of their group plus one
+        return self.createIndex(row, column, parent.row() + 1 if parent.isValid() else 0)
+
+    def parent(self, index):
+        if not index.isValid() or not index.internalId():
+            return QModelIndex()
+        return self.createIndex(index.internalId() - 1, 0, 0)
+
+    def hasChildren(self, parent=QModelIndex()):
+        return not parent.isValid() or not parent.internalId()
+
+    def canFetchMore(self, parent):
+        return parent.isValid() and not parent.internalId() and \
+            self.media_types[parent.row()] not in self._loaded
+
+    def fetchMore(self, parent):
+        media_type = self.media_types[parent.row()]
+        self.beginInsertRows(parent, 0, len(self._matches[media_type]) - 1)
+        self._loaded.add(media_type)
+        self.endInsertRows()
+
+    def rowCount(self, parent=QModelIndex()):
+        """
+        Return the number of groups, or the number of loaded children of a group.
+        """
+        if not parent.isValid():
+            return len(self.media_types)
+        if parent.internalId() or parent.column() > 0:
+            return 0
+        media_type = self.media_types[parent.row()]
+        return len(self._matches[media_type]) if media_type in self._loaded else 0
+
+    def headerData(self, section, orientation, role):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section]
+        return QVariant()
+
+    def columnCount(self, _index=QModelIndex()):
+        """
+        Return list of columns in the model.
+        """
+        return len(self.COLUMNS)
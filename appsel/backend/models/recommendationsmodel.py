@@ -0,0 +1,67 @@
+# pylint: disable=invalid-name
+from PyQt5.QtCore import Qt, QAbstractListModel, QVariant
+
+from appsel.backend import metrics
+
+@metrics.instrument_model
+class RecommendationsModel(QAbstractListModel):
+    """
+    Ranked list of MIME types recommended to default to an app, each of which can be checked to be applied.
+    """
+    def __init__(self, manager, app_id: str, get_parents=None):
+        super().__init__()
+        self.manager = manager
+        self.app_id = app_id
+        self.get_parents = get_parents
+        self.recommendations = []
+        self.unchecked = set()
+        self.refresh(first_run=True)
+
+    def refresh(self, first_run=False):
+        if not first_run:
+            self.beginResetModel()
+        self.recommendations = self.manager.recommend_defaults(self.app_id, get_parents=self.get_parents)
+        self.unchecked.clear()
+        if not first_run:
+            self.endResetModel()
+
+    def get_checked(self):
+        """Returns the MIME types whose recommendation is checked."""
+        return [recommendation.mimetype for recommendation in self.recommendations
+                if recommendation.mimetype not in self.unchecked]
+
+    def data(self, index, role):
+        recommendation = self.recommendations[index.row()]
+        if role == Qt.DisplayRole:  # Display text
+            return f"{recommendation.mimetype} ({recommendation.score:.0%})"
+        if role == Qt.ToolTipRole:
+            return recommendation.reason
+        if role == Qt.CheckStateRole:
+            return Qt.Unchecked if recommendation.mimetype in self.unchecked else Qt.Checked
+        return QVariant()
+
+    def setData(self, index, value, role):
+        """
+        Update the checked state for a recommendation.
+        """
+        if role == Qt.CheckStateRole:
+            mimetype = self.recommendations[index.row()].mimetype
+            if value == Qt.Checked:
+                self.unchecked.discard(mimetype)
+            else:
+                self.unchecked.add(mimetype)
+            self.dataChanged.emit(index, index)
+            return True
+        return False
+
+    def flags(self, index):
+        """
+        Return Qt item flags for the given index.
+        """
+        return super().flags(index) | Qt.ItemIsUserCheckable
+
+    def rowCount(self, _index):
+        """
+        Return list of rows in the model.
+        """
+        return len(self.recommendations)
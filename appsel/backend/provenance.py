@@ -0,0 +1,107 @@
+"""
+Where each association entry comes from, and explanations of how the default app for a MIME type was chosen.
+"""
+import configparser
+import enum
+import io
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from appsel.backend.snapshot import SECTION_ADDED, SECTION_DEFAULTS, SECTION_MIME_CACHE, SECTION_REMOVED
+
+@dataclass(frozen=True)
+class LayerEntry:
+    """One file's entry for a MIME type in a section (e.g. a line of a mimeapps.list), before layers are merged."""
+    path: str
+    # Line number starting at 1, or None if the line may have moved since the file was read (after a write)
+    line: Optional[int]
+    apps: Tuple[str, ...]
+
+class LineNumberingConfigParser(configparser.ConfigParser):
+    """ConfigParser that also records the line each key was read from."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # (section, key) -> line number of the line that takes effect, starting at 1
+        self.line_numbers: Dict[Tuple[str, str], int] = {}
+
+    def read_string(self, string, source='<string>'):
+        super().read_string(string, source)
+        section = None
+        for number, line in enumerate(io.StringIO(string), 1):
+            stripped = line.strip()
+            if not stripped or stripped[0] in '#;':
+                continue
+            if stripped[0] == '[' and stripped[-1] == ']':
+                section = stripped[1:-1]
+            elif section is not None and '=' in stripped:
+                # Repeated keys and sections are merged, and the last line wins, as in ConfigParser
+                self.line_numbers[(section, self.optionxform(stripped.split('=', 1)[0].strip()))] = number
+
+class StepOutcome(enum.Enum):
+    """What an entry did when the default app was resolved."""
+    SELECTED = "selected as the default"
+    NOT_INSTALLED = "skipped, the desktop entry is not installed"
+    REMOVED = "skipped, the association is removed"
+    NOT_REACHED = "not reached, an earlier entry was selected"
+    REMOVES = "removes the association"
+    ADDS = "adds a custom association"
+
+@dataclass
+class ExplanationStep:
+    """A single app ID listed for the MIME type, the file and line it was read from, and its effect."""
+    section: str
+    path: str
+    line: Optional[int]
+    app_id: str
+    outcome: StepOutcome
+
+    def __str__(self):
+        location = self.path if self.line is None else f"{self.path}:{self.line}"
+        return f"{location}: [{self.section}] {self.app_id}: {self.outcome.value}"
+
+@dataclass
+class Explanation:
+    """Why a MIME type opens with its default app: every entry considered, in the order they were checked."""
+    mimetype: str
+    default_app: Optional[str]
+    steps: List[ExplanationStep] = field(default_factory=list)
+
+    def __str__(self):
+        lines = [f"{self.mimetype}: {self.default_app or 'no default application'}"]
+        lines += [f"  {step}" for step in self.steps]
+        return '\n'.join(lines)
+
+    def to_dict(self) -> dict:
+        """Returns the explanation as a JSON-serializable dict."""
+        return {'mimetype': self.mimetype, 'default_app': self.default_app,
+                'steps': [{'section': step.section, 'path': step.path, 'line': step.line, 'app_id': step.app_id,
+                           'outcome': step.outcome.name.lower()} for step in self.steps]}
+
+def explain(snapshot, mimetype: str) -> Explanation:
+    """
+    Explains the default app of a MIME type from the layers recorded in a snapshot: each Default Applications
+    entry in priority order, then the mimeinfo.cache fallback, then the Removed and Added Associations entries.
+    Only the entries for that MIME type are looked at.
+    """
+    entries = snapshot.desktop_entries.entries
+    removed_apps = snapshot.removed.get(mimetype, ())
+    explanation = Explanation(mimetype, None)
+    for section in (SECTION_DEFAULTS, SECTION_MIME_CACHE):
+        for layer in snapshot.layers[section].get(mimetype, ()):
+            for app_id in layer.apps:
+                if explanation.default_app is not None:
+                    outcome = StepOutcome.NOT_REACHED
+                elif app_id not in entries:
+                    outcome = StepOutcome.NOT_INSTALLED
+                elif app_id in removed_apps:
+                    outcome = StepOutcome.REMOVED
+                else:
+                    outcome = StepOutcome.SELECTED
+                    explanation.default_app = app_id
+                explanation.steps.append(ExplanationStep(section, layer.path, layer.line, app_id, outcome))
+    for section, outcome in ((SECTION_REMOVED, StepOutcome.REMOVES), (SECTION_ADDED, StepOutcome.ADDS)):
+        for layer in snapshot.layers[section].get(mimetype, ()):
+            explanation.steps += [ExplanationStep(section, layer.path, layer.line, app_id, outcome)
+                                  for app_id in layer.apps]
+    return explanation
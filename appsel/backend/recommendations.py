@@ -0,0 +1,94 @@
+"""
+Recommend the MIME types an application should become the default for, from how well it covers each media type.
+
+For example, if mpv can open 27 of 30 video types and Totem only 12, the video types that still default to Totem
+are recommended for mpv.
+"""
+import collections
+
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional
+
+from appsel.backend.fingerprint import get_media_type
+
+@dataclass
+class DefaultAppRecommendation:
+    """A MIME type an app is recommended to become the default for."""
+    mimetype: str
+    current_app: Optional[str]
+    # Between 0 and 1: how much better the app covers the MIME type's media type than the current default
+    score: float
+    reason: str
+
+def _popcount(mask: int) -> int:
+    return bin(mask).count('1')
+
+def _iter_bits(mask: int) -> Iterator[int]:
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+class AssociationMatrix():
+    """
+    App x MIME type matrix of enabled associations and effective defaults, built in one pass over a snapshot.
+
+    Each row (an app, or a media type group) is stored as an integer bitmask over MIME type positions, so coverage
+    of a media type by an app is one AND and a popcount rather than a lookup per MIME type.
+    """
+    def __init__(self, snapshot):
+        self.mimetypes = sorted(snapshot.get_all_mimetypes())
+        self.default_apps: List[Optional[str]] = []
+        self.supports: Dict[str, int] = collections.defaultdict(int)
+        self.defaults: Dict[str, int] = collections.defaultdict(int)
+        self.groups: Dict[str, int] = collections.defaultdict(int)
+
+        entries = snapshot.desktop_entries.entries
+        for position, mimetype in enumerate(self.mimetypes):
+            bit = 1 << position
+            self.groups[get_media_type(mimetype)] |= bit
+            disabled_apps = snapshot.removed.get(mimetype, ())
+            for section in (snapshot.mimeinfo_cache, snapshot.added):
+                for app_id in section.get(mimetype, ()):
+                    if app_id in entries and app_id not in disabled_apps:
+                        self.supports[app_id] |= bit
+            default_app = snapshot.get_default_app(mimetype)
+            self.default_apps.append(default_app)
+            if default_app is not None:
+                self.defaults[default_app] |= bit
+
+    def coverage(self, app_id: str, media_type: str) -> int:
+        """Returns how many MIME types of a media type an app supports."""
+        return _popcount(self.supports.get(app_id, 0) & self.groups.get(media_type, 0))
+
+    def recommend(self, app_id: str,
+                  get_parents: Callable[[str], List[str]] = None) -> List[DefaultAppRecommendation]:
+        """
+        Returns the MIME types app_id supports but isn't the default for, where it covers the media type better than
+        the current default (or where it is the default for a parent type), best recommendations first.
+        """
+        positions = {mimetype: position for position, mimetype in enumerate(self.mimetypes)} if get_parents else {}
+        candidates = self.supports.get(app_id, 0) & ~self.defaults.get(app_id, 0)
+        recommendations = []
+        for media_type, group in self.groups.items():
+            group_candidates = candidates & group
+            if not group_candidates:
+                continue
+            group_size = _popcount(group)
+            app_coverage = self.coverage(app_id, media_type)
+            for position in _iter_bits(group_candidates):
+                mimetype = self.mimetypes[position]
+                current_app = self.default_apps[position]
+                current_coverage = self.coverage(current_app, media_type) if current_app else 0
+                score = (app_coverage - current_coverage) / group_size
+                reason = f"opens {app_coverage} of {group_size} {media_type} types"
+                if current_app:
+                    reason += f" ({current_app} opens {current_coverage})"
+                for parent in (get_parents(mimetype) if get_parents else ()):
+                    if parent in positions and self.default_apps[positions[parent]] == app_id:
+                        score, reason = 1.0, f"default for parent type {parent}"
+                        break
+                if score > 0:
+                    recommendations.append(DefaultAppRecommendation(mimetype, current_app, score, reason))
+        recommendations.sort(key=lambda recommendation: (-recommendation.score, recommendation.mimetype))
+        return recommendations
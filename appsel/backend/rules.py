@@ -0,0 +1,63 @@
+"""
+Wildcard rules for setting default applications on many MIME types at once (e.g. "video/* -> mpv").
+"""
+import bisect
+import fnmatch
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List
+
+_WILDCARD_CHARS = '*?['
+
+@dataclass
+class DefaultAppRule:
+    """
+    Sets app_id as the default for all MIME types matching pattern, except those matching an exclude pattern.
+
+    Patterns are shell-style globs (e.g. "video/*" or "application/vnd.oasis.*"); a pattern ending in / matches
+    every type with that prefix. When several rules match a MIME type, the one with the highest priority wins,
+    and ties go to the rule listed first.
+    """
+    pattern: str
+    app_id: str
+    priority: int = 0
+    exclude: List[str] = field(default_factory=list)
+
+class MimeTypeIndex():
+    """
+    Sorted index of MIME type names, used to match glob patterns without scanning every type for each pattern.
+    """
+    def __init__(self, mimetypes: Iterable[str]):
+        self.mimetypes = sorted(set(mimetypes))
+
+    def match(self, pattern: str) -> List[str]:
+        """Returns all MIME types matching a glob or prefix pattern."""
+        if pattern.endswith('/') and not set(_WILDCARD_CHARS) & set(pattern):
+            pattern += '*'
+
+        # Only types sharing the literal prefix of the pattern can match, and those are contiguous in sorted order
+        prefix_length = min((pattern.find(char) for char in _WILDCARD_CHARS if char in pattern), default=len(pattern))
+        prefix = pattern[:prefix_length]
+        start = bisect.bisect_left(self.mimetypes, prefix)
+        end = bisect.bisect_left(self.mimetypes, prefix + '\U0010FFFF', lo=start)
+        if prefix_length == len(pattern):  # No wildcards: exact match
+            return self.mimetypes[start:start+1] if self.mimetypes[start:start+1] == [pattern] else []
+        if pattern[prefix_length:] == '*':  # Plain prefix match
+            return self.mimetypes[start:end]
+        return [mimetype for mimetype in self.mimetypes[start:end] if fnmatch.fnmatchcase(mimetype, pattern)]
+
+def resolve_rules(rules: List[DefaultAppRule], index: MimeTypeIndex) -> Dict[str, str]:
+    """Returns the default app each rule would set, by MIME type."""
+    results = {}
+    priorities = {}
+    for rule in rules:
+        excluded = set()
+        for exclude_pattern in rule.exclude:
+            excluded.update(index.match(exclude_pattern))
+        for mimetype in index.match(rule.pattern):
+            if mimetype in excluded:
+                continue
+            if mimetype not in priorities or rule.priority > priorities[mimetype]:
+                priorities[mimetype] = rule.priority
+                results[mimetype] = rule.app_id
+    return results
@@ -0,0 +1,148 @@
+"""
+Immutable snapshots of MIME association state, for lock-free reads from any thread.
+"""
+import logging
+import types
+
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Mapping, Optional, Set, Tuple
+
+from appsel.backend import xdgpaths
+
+SECTION_DEFAULTS = "Default Applications"
+SECTION_ADDED = "Added Associations"
+SECTION_REMOVED = "Removed Associations"
+SECTION_MIME_CACHE = "MIME Cache"
+
+@dataclass
+class MimeAppChoiceSettings:
+    """Represents details for a default application choice."""
+    # Whether the entry is disabled via Removed Associations
+    disabled: bool = False
+
+    # Whether the entry is a custom association
+    custom: bool = False
+
+    # Whether the entry is set as default
+    default: bool = False
+
+AppLists = Mapping[str, Tuple[str, ...]]
+
+def freeze_section(section: Mapping[str, list]) -> AppLists:
+    """Returns a read-only copy of a section (MIME type to list of app IDs)."""
+    return types.MappingProxyType({mimetype: tuple(apps) for mimetype, apps in section.items()})
+
+@dataclass(frozen=True)
+class AssociationsSnapshot:
+    """
+    A consistent, read-only view of the associations known to a MimeTypesManager at one point in time.
+
+    MimeTypesManager publishes a new snapshot after every change, copying only the sections that changed, so getting
+    the current snapshot is free and holding on to one never blocks writers. Snapshots can be shared between threads.
+    """
+    version: int
+    desktop_entries: object
+    # Merged mimeapps.list sections across all layers
+    defaults: AppLists
+    added: AppLists
+    removed: AppLists
+    mimeinfo_cache: AppLists
+    # Entries in the writable mimeapps.list only
+    local_defaults: FrozenSet[str]
+    local_removed: AppLists
+    # Unmerged entries of each section (including mimeinfo.cache): MIME type to provenance.LayerEntry tuples, in
+    # order of decreasing priority
+    layers: Mapping[str, Mapping[str, tuple]]
+
+    def get_section(self, section: str) -> AppLists:
+        """Returns the merged contents of a mimeapps.list section, or of mimeinfo.cache."""
+        return {SECTION_DEFAULTS: self.defaults, SECTION_ADDED: self.added, SECTION_REMOVED: self.removed,
+                SECTION_MIME_CACHE: self.mimeinfo_cache}[section]
+
+    def get_default_app(self, mimetype: str, use_fallback: bool = True) -> Optional[str]:
+        """
+        Returns the default application for the MIME type, or None if none is set.
+        """
+        entries = self.desktop_entries.entries
+        disabled_entries = self.removed.get(mimetype, ())
+        for entry_id in self.defaults.get(mimetype, ()):
+            if entry_id in entries and entry_id not in disabled_entries:
+                return entry_id
+
+        if use_fallback:
+            for entry_id in self.mimeinfo_cache.get(mimetype, ()):
+                if entry_id in entries and entry_id not in disabled_entries:
+                    return entry_id
+        return None  # Not found
+
+    def has_default(self, mimetype: str) -> bool:
+        """Returns whether a default for the MIME type was explicitly set."""
+        return mimetype in self.local_defaults
+
+    def get_supported_apps(self, mimetype: str) -> Dict[str, MimeAppChoiceSettings]:
+        """
+        Returns a dict of apps (str to MimeAppChoiceSettings instances) that support a MIME type.
+
+        This includes apps that support the type natively as well as custom associations added via mimeapps.list
+        """
+        disabled_apps = self.removed.get(mimetype, ())
+        default_app = self.get_default_app(mimetype, use_fallback=False)
+        local_apps_path = xdgpaths.writable_location(xdgpaths.APPLICATIONS_LOCATION)
+
+        results = {}
+        # Add all associations from .desktop entries (mimeinfo.cache)
+        for app_id in self.mimeinfo_cache.get(mimetype, ()):
+            disabled = app_id in disabled_apps
+            # XXX: Mark as enabled apps that have been disabled at the global level but aren't at the local level.
+            # Technically the XDG Mime spec tells us to apply mimeapps.list removed associations at each path
+            # containing desktop entries, but we simplify to only store one global mimeapps.list DB.
+            if disabled and self.desktop_entries.desktop_entry_paths.get(app_id, '').startswith(local_apps_path) and \
+                    app_id not in self.local_removed.get(mimetype, ()):
+                logging.info("Overriding global Removed Associations state for app_id=%s, mimetype=%s",
+                             app_id, mimetype)
+                disabled = False
+            results[app_id] = MimeAppChoiceSettings(disabled=disabled, custom=False, default=app_id == default_app)
+        # Add all custom associations from mimeapps.list
+        for app_id in self.added.get(mimetype, ()):
+            if app_id in disabled_apps:
+                logging.warning("Found app %s in both added and removed associations section? This is invalid. (mimetype=%s)",
+                                app_id, mimetype)
+            results[app_id] = MimeAppChoiceSettings(disabled=False, custom=True, default=app_id == default_app)
+
+        return results
+
+    def get_supported_types(self, app_id: str) -> Dict[str, MimeAppChoiceSettings]:
+        """
+        Returns a dict of MIME types that are supported by an application, along with details of the default choice.
+        """
+        # Get all types registered in the .desktop entry
+        supported = {mimetype: MimeAppChoiceSettings(disabled=False, custom=False, default=None)
+                     for mimetype in self.desktop_entries.entries[app_id].getMimeTypes()}
+        # Add in custom associations
+        for mimetype, apps in self.added.items():
+            if app_id in apps:
+                supported[mimetype] = MimeAppChoiceSettings(disabled=False, custom=True, default=None)
+        # Add in disabled associations
+        for mimetype, apps in self.removed.items():
+            if mimetype in supported and app_id in apps:
+                supported[mimetype].disabled = True
+        # Enumerate defaults for each app
+        for mimetype in supported:
+            supported[mimetype].default = app_id == self.get_default_app(mimetype)
+        return supported
+
+    def get_all_mimetypes(self) -> Set[str]:
+        """Returns all MIME types that have an entry in mimeinfo.cache or any mimeapps.list section."""
+        mimetypes = set(self.mimeinfo_cache)
+        for section in (self.defaults, self.added, self.removed):
+            mimetypes.update(section)
+        return mimetypes
+
+    def get_supported_mimetypes(self) -> Set[str]:
+        """Returns all MIME types supported by at least one installed app, natively or via a custom association."""
+        mimetypes = set()
+        for section in (self.mimeinfo_cache, self.added):
+            for mimetype, apps in section.items():
+                if any(app_id in self.desktop_entries.entries for app_id in apps):
+                    mimetypes.add(mimetype)
+        return mimetypes
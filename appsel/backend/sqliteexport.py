@@ -0,0 +1,176 @@
+"""
+Export resolved MIME association state to an indexed SQLite database, for querying by other tools.
+
+Exports are incremental: re-exporting into an existing database only writes rows that changed, and raw entries are
+only re-read for mimeapps.list / mimeinfo.cache files that were modified since the last export.
+"""
+import logging
+import sqlite3
+
+from typing import Iterable, Tuple
+
+from appsel.backend.mimetypesmanager import MimeTypesManager
+from appsel.backend.snapshot import AssociationsSnapshot
+
+SCHEMA_VERSION = 1
+# Stored in the database header, so that databases created by other tools are never overwritten
+APPLICATION_ID = 0x61707073  # "apps"
+# Executed one by one rather than with executescript(), which would commit the export transaction
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS apps (
+        app_id TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        path TEXT,
+        shown INTEGER NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS mimetypes (
+        mimetype TEXT PRIMARY KEY,
+        default_app TEXT,
+        -- 'mimeapps.list' if the default was set in a mimeapps.list, 'mimeinfo.cache' if it is a fallback
+        default_source TEXT,
+        user_defined INTEGER NOT NULL
+    )""",
+    "CREATE INDEX IF NOT EXISTS mimetypes_default_app ON mimetypes (default_app)",
+    """CREATE TABLE IF NOT EXISTS associations (
+        mimetype TEXT NOT NULL,
+        app_id TEXT NOT NULL,
+        disabled INTEGER NOT NULL,
+        custom INTEGER NOT NULL,
+        is_default INTEGER NOT NULL,
+        PRIMARY KEY (mimetype, app_id)
+    )""",
+    "CREATE INDEX IF NOT EXISTS associations_app_id ON associations (app_id)",
+    """CREATE TABLE IF NOT EXISTS sources (
+        path TEXT PRIMARY KEY,
+        mtime_ns INTEGER
+    )""",
+    """CREATE TABLE IF NOT EXISTS raw_entries (
+        path TEXT NOT NULL,
+        section TEXT NOT NULL,
+        mimetype TEXT NOT NULL,
+        position INTEGER NOT NULL,
+        app_id TEXT NOT NULL,
+        PRIMARY KEY (path, section, mimetype, position)
+    )""",
+    "CREATE INDEX IF NOT EXISTS raw_entries_mimetype ON raw_entries (mimetype)",
+    "CREATE INDEX IF NOT EXISTS raw_entries_app_id ON raw_entries (app_id)",
+]
+TABLES = {'apps', 'mimetypes', 'associations', 'sources', 'raw_entries'}
+
+class ForeignDatabaseError(Exception):
+    """Raised when exporting into a database that wasn't created by appsel."""
+
+def _sync_table(conn: sqlite3.Connection, table: str, key_columns: Tuple[str, ...], value_columns: Tuple[str, ...],
+                rows: Iterable[tuple]) -> int:
+    """
+    Helper: makes table contain exactly rows (tuples of key columns followed by value columns), writing only the
+    rows that were added, changed, or removed. Returns the number of rows written.
+
+    The new rows are compared with the table in SQL, through a temporary table, so memory use doesn't grow with the
+    size of the table.
+    """
+    columns = key_columns + value_columns
+    column_list = ', '.join(columns)
+    new_table = f'new_{table}'
+    keys_match = ' AND '.join(f'new.{column} = {table}.{column}' for column in key_columns)
+    conn.execute(f"CREATE TEMP TABLE {new_table} ({column_list}, PRIMARY KEY ({', '.join(key_columns)}))")
+    try:
+        conn.executemany(f"INSERT OR REPLACE INTO {new_table} ({column_list}) "
+                         f"VALUES ({', '.join('?' * len(columns))})", rows)
+        # IS compares NULLs as equal, unlike =
+        values_match = ' AND '.join(f'{table}.{column} IS new.{column}' for column in value_columns)
+        n_changes = conn.execute(
+            f"INSERT INTO {table} ({column_list}) SELECT {column_list} FROM {new_table} AS new "
+            f"WHERE NOT EXISTS (SELECT 1 FROM {table} WHERE {keys_match} AND {values_match}) "
+            f"ON CONFLICT ({', '.join(key_columns)}) DO UPDATE SET "
+            f"{', '.join(f'{column} = excluded.{column}' for column in value_columns)}").rowcount
+        # Rows that are not in the new table no longer exist
+        n_changes += conn.execute(
+            f"DELETE FROM {table} WHERE NOT EXISTS (SELECT 1 FROM {new_table} AS new WHERE {keys_match})").rowcount
+    finally:
+        conn.execute(f"DROP TABLE temp.{new_table}")
+    return n_changes
+
+def _sync_raw_entries(conn: sqlite3.Connection, manager: MimeTypesManager) -> int:
+    """Helper: re-exports raw entries for source files that changed since the last export."""
+    old_sources = dict(conn.execute("SELECT path, mtime_ns FROM sources"))
+    new_sources = {path: manager.fs.get_mtime_ns(path) for path in manager.mimeapps_paths + manager.mimeinfo_cache_paths}
+    changed = {path for path, mtime in new_sources.items() if path not in old_sources or old_sources[path] != mtime}
+    removed = set(old_sources) - set(new_sources)
+
+    n_changes = 0
+    for path in changed | removed:
+        n_changes += conn.execute("DELETE FROM raw_entries WHERE path = ?", (path,)).rowcount
+    n_changes += conn.executemany("INSERT OR REPLACE INTO raw_entries (path, section, mimetype, position, app_id) "
+                                  "VALUES (?, ?, ?, ?, ?)",
+                                  (entry for entry in manager.iter_layer_entries() if entry[0] in changed)).rowcount
+    _sync_table(conn, 'sources', ('path',), ('mtime_ns',), new_sources.items())
+    return n_changes
+
+def _iter_apps(manager: MimeTypesManager):
+    desktop_entries = manager.desktop_entries
+    for app_id in desktop_entries.entries:
+        yield (app_id, desktop_entries.get_name(app_id), desktop_entries.desktop_entry_paths.get(app_id),
+               int(desktop_entries.is_shown(app_id)))
+
+def _iter_mimetypes(snapshot: AssociationsSnapshot):
+    for mimetype in snapshot.get_all_mimetypes():
+        default_app = snapshot.get_default_app(mimetype, use_fallback=False)
+        default_source = 'mimeapps.list'
+        if default_app is None:
+            default_app = snapshot.get_default_app(mimetype)
+            default_source = None if default_app is None else 'mimeinfo.cache'
+        yield mimetype, default_app, default_source, int(snapshot.has_default(mimetype))
+
+def _iter_associations(snapshot: AssociationsSnapshot):
+    for mimetype in snapshot.get_all_mimetypes():
+        for app_id, options in snapshot.get_supported_apps(mimetype).items():
+            yield mimetype, app_id, int(options.disabled), int(options.custom), int(bool(options.default))
+
+def _prepare_schema(conn: sqlite3.Connection, force: bool):
+    """
+    Helper: creates the tables, dropping the existing ones first if they are from an older schema version (or from
+    another tool, if force is set). Raises ForeignDatabaseError if the database has tables that aren't ours.
+    """
+    tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    application_id = conn.execute("PRAGMA application_id").fetchone()[0]
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    # Exports from before the application ID was set are recognized by their tables
+    is_ours = application_id == APPLICATION_ID or (application_id == 0 and version == 1 and tables <= TABLES)
+    if tables and not is_ours and not force:
+        raise ForeignDatabaseError("the database was not created by appsel, refusing to overwrite it")
+    if tables and (not is_ours or version != SCHEMA_VERSION):
+        for table in tables:
+            conn.execute(f'DROP TABLE "{table}"')
+    conn.execute(f"PRAGMA application_id = {APPLICATION_ID}")
+    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    for statement in SCHEMA:
+        conn.execute(statement)
+
+def export_database(manager: MimeTypesManager, db_path: str, *, force: bool = False) -> int:
+    """
+    Exports the state of manager (and its desktop entries) to the SQLite database at db_path, creating it if needed.
+    Returns the number of rows that were written.
+
+    Raises ForeignDatabaseError if the database has tables and wasn't created by appsel, unless force is set, in
+    which case all of its tables are dropped.
+    """
+    # Export from one snapshot so the tables agree with each other even if the manager changes meanwhile
+    snapshot = manager.snapshot()
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            # sqlite3 only opens transactions implicitly before DML, so the schema changes need an explicit one
+            conn.execute("BEGIN")
+            _prepare_schema(conn, force)
+
+            n_changes = _sync_table(conn, 'apps', ('app_id',), ('name', 'path', 'shown'), _iter_apps(manager))
+            n_changes += _sync_table(conn, 'mimetypes', ('mimetype',),
+                                     ('default_app', 'default_source', 'user_defined'), _iter_mimetypes(snapshot))
+            n_changes += _sync_table(conn, 'associations', ('mimetype', 'app_id'),
+                                     ('disabled', 'custom', 'is_default'), _iter_associations(snapshot))
+            n_changes += _sync_raw_entries(conn, manager)
+    finally:
+        conn.close()
+    logging.info("Exported to %s: %d rows changed", db_path, n_changes)
+    return n_changes
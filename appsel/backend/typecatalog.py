@@ -0,0 +1,122 @@
+"""
+Catalog of every MIME type appsel knows about, tagged with where each one comes from.
+"""
+import enum
+
+from typing import Callable, Dict, Iterable, Iterator, List
+
+SCHEME_HANDLER_PREFIX = 'x-scheme-handler/'
+
+class TypeSource(enum.Flag):
+    """Where a MIME type was found. A type can have several sources."""
+    NONE = 0
+    # The MIME database (shared-mime-info), which knows file types whether or not any app handles them
+    DATABASE = enum.auto()
+    # mimeinfo.cache, i.e. the MimeType= key of an installed desktop entry
+    DESKTOP_ENTRY = enum.auto()
+    # Added Associations in a mimeapps.list file
+    CUSTOM_ASSOCIATION = enum.auto()
+    # Default Applications or Removed Associations in a mimeapps.list file
+    MIMEAPPS_LIST = enum.auto()
+
+class TypeKind(enum.Enum):
+    """Kinds of MIME types the catalog can be filtered by."""
+    ALL = "All types"
+    WITH_APPS = "File types with apps"
+    WITHOUT_APPS = "File types without apps"
+    SCHEME_HANDLERS = "URL handlers"
+
+def is_scheme_handler(mimetype: str) -> bool:
+    """Returns whether a MIME type is a URL scheme handler (e.g. x-scheme-handler/https)."""
+    return mimetype.startswith(SCHEME_HANDLER_PREFIX)
+
+def has_apps(sources: TypeSource) -> bool:
+    """Returns whether a type with the given sources is handled by at least one app."""
+    return bool(sources & (TypeSource.DESKTOP_ENTRY | TypeSource.CUSTOM_ASSOCIATION))
+
+def matches_kind(mimetype: str, sources: TypeSource, kind: TypeKind) -> bool:
+    """Returns whether a MIME type with the given sources belongs to a kind."""
+    if kind is TypeKind.ALL:
+        return True
+    if kind is TypeKind.SCHEME_HANDLERS:
+        return is_scheme_handler(mimetype)
+    if is_scheme_handler(mimetype):
+        return False
+    return has_apps(sources) == (kind is TypeKind.WITH_APPS)
+
+class TypeCatalog():
+    """
+    Every MIME type from the MIME database, mimeinfo.cache and mimeapps.list, including URL scheme handlers and types
+    no installed app handles.
+
+    The catalog is built once with set operations over the three sources. After that, the manager's change listeners
+    update only the changed type, and listeners registered with add_listener() are told when a type is added, changes
+    sources, or is removed.
+    """
+    def __init__(self, manager, known_types: Iterable[str]):
+        self.manager = manager
+        self._known_types = frozenset(known_types)
+        snapshot = manager.snapshot()
+        # Sections can keep keys whose app list became empty, which don't count
+        desktop_entry_types = {mimetype for mimetype, apps in snapshot.mimeinfo_cache.items() if apps}
+        custom_types = {mimetype for mimetype, apps in snapshot.added.items() if apps}
+        mimeapps_types = {mimetype for section in (snapshot.defaults, snapshot.removed)
+                          for mimetype, apps in section.items() if apps}
+
+        self.sources: Dict[str, TypeSource] = dict.fromkeys(
+            self._known_types | desktop_entry_types | custom_types | mimeapps_types, TypeSource.NONE)
+        for types, source in ((self._known_types, TypeSource.DATABASE),
+                              (desktop_entry_types, TypeSource.DESKTOP_ENTRY),
+                              (custom_types, TypeSource.CUSTOM_ASSOCIATION),
+                              (mimeapps_types, TypeSource.MIMEAPPS_LIST)):
+            for mimetype in types:
+                self.sources[mimetype] |= source
+        self._listeners: List[Callable[[str, TypeSource, TypeSource], None]] = []
+        manager.add_change_listener(self.update)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.sources)
+
+    def __len__(self) -> int:
+        return len(self.sources)
+
+    def __contains__(self, mimetype: str) -> bool:
+        return mimetype in self.sources
+
+    def get_sources(self, mimetype: str) -> TypeSource:
+        """Returns where a MIME type was found, or TypeSource.NONE if it isn't in the catalog."""
+        return self.sources.get(mimetype, TypeSource.NONE)
+
+    def filter(self, kind: TypeKind) -> List[str]:
+        """Returns the MIME types of a kind."""
+        return [mimetype for mimetype, sources in self.sources.items() if matches_kind(mimetype, sources, kind)]
+
+    def add_listener(self, callback: Callable[[str, TypeSource, TypeSource], None]):
+        """
+        Registers a callback to run with (MIME type, old sources, new sources) when a type's sources change.
+        Types are added when old sources are NONE, and removed when new sources are NONE.
+        """
+        self._listeners.append(callback)
+
+    def update(self, mimetype: str):
+        """Recomputes the sources of a MIME type after its associations changed."""
+        snapshot = self.manager.snapshot()
+        sources = TypeSource.NONE
+        if mimetype in self._known_types:
+            sources |= TypeSource.DATABASE
+        if snapshot.mimeinfo_cache.get(mimetype):
+            sources |= TypeSource.DESKTOP_ENTRY
+        if snapshot.added.get(mimetype):
+            sources |= TypeSource.CUSTOM_ASSOCIATION
+        if snapshot.defaults.get(mimetype) or snapshot.removed.get(mimetype):
+            sources |= TypeSource.MIMEAPPS_LIST
+
+        old_sources = self.sources.get(mimetype, TypeSource.NONE)
+        if sources == old_sources:
+            return
+        if sources:
+            self.sources[mimetype] = sources
+        else:
+            del self.sources[mimetype]
+        for callback in self._listeners:
+            callback(mimetype, old_sources, sources)
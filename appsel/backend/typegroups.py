@@ -0,0 +1,91 @@
+"""
+Group MIME types by top-level media type, with per-group summaries of their default applications.
+"""
+import collections
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from appsel.backend.fingerprint import get_media_type
+
+# Per MIME type: whether the default was set by the user, and the effective default app (or None)
+TypeState = Tuple[bool, Optional[str]]
+
+@dataclass
+class GroupSummary:
+    """Aggregates for the MIME types of one media type (e.g. "video")."""
+    media_type: str
+    mimetypes: List[str]
+    user_defined: int = 0
+    without_default: int = 0
+    # Number of types each app is the default for
+    default_apps: collections.Counter = field(default_factory=collections.Counter)
+
+    @property
+    def dominant_app(self) -> Optional[str]:
+        """Returns the app that is the default for the most types in the group, if any."""
+        most_common = self.default_apps.most_common(1)
+        return most_common[0][0] if most_common else None
+
+    def add_state(self, state: TypeState, sign: int = 1):
+        """Counts a MIME type's state in the aggregates, or uncounts it if sign is -1."""
+        user_defined, default_app = state
+        self.user_defined += sign * user_defined
+        if default_app is None:
+            self.without_default += sign
+        else:
+            self.default_apps[default_app] += sign
+            if not self.default_apps[default_app]:
+                del self.default_apps[default_app]
+
+class MimeTypeGroups():
+    """
+    MIME types grouped by media type.
+
+    The state of each type is resolved at most once, and each group is summarized only when first asked for. After
+    that, a change to a MIME type (reported through the manager's change listeners) re-resolves only that type and
+    adjusts its group's summary by the difference.
+    """
+    def __init__(self, manager, mimetypes: Iterable[str]):
+        self.manager = manager
+        members = collections.defaultdict(list)
+        for mimetype in mimetypes:
+            members[get_media_type(mimetype)].append(mimetype)
+        self.groups: Dict[str, GroupSummary] = {media_type: GroupSummary(media_type, sorted(types))
+                                                for media_type, types in sorted(members.items())}
+        self._states: Dict[str, TypeState] = {}
+        self._summarized = set()
+        manager.add_change_listener(self.update)
+
+    def _resolve(self, mimetype: str) -> TypeState:
+        snapshot = self.manager.snapshot()
+        return snapshot.has_default(mimetype), snapshot.get_default_app(mimetype)
+
+    def get_state(self, mimetype: str) -> TypeState:
+        """Returns whether the default for a MIME type is user defined, and its default app."""
+        try:
+            return self._states[mimetype]
+        except KeyError:
+            self._states[mimetype] = state = self._resolve(mimetype)
+            return state
+
+    def get_summary(self, media_type: str) -> GroupSummary:
+        """Returns the summary of a group, computing it on first use."""
+        summary = self.groups[media_type]
+        if media_type not in self._summarized:
+            for mimetype in summary.mimetypes:
+                summary.add_state(self.get_state(mimetype))
+            self._summarized.add(media_type)
+        return summary
+
+    def update(self, mimetype: str):
+        """Re-resolves a changed MIME type, and updates its group's summary if it was computed."""
+        old_state = self._states.pop(mimetype, None)
+        if old_state is None:
+            return  # Never looked at, so nothing depends on it yet
+        new_state = self.get_state(mimetype)
+        media_type = get_media_type(mimetype)
+        if media_type in self._summarized and new_state != old_state:
+            summary = self.groups[media_type]
+            summary.add_state(old_state, -1)
+            summary.add_state(new_state)
@@ -1,20 +1,126 @@
 """
-Misc utility functions.
+Misc utility functions, and Qt adapters for the (Qt-free) backend classes.
 """
-from PyQt5.QtCore import QMimeType
+import functools
+import locale
+import os.path
+
+from typing import List, Optional, Tuple
+
+from PyQt5.QtCore import Qt, QMimeDatabase, QMimeType
 from PyQt5.QtGui import QIcon
 
+# Item data role used by models to expose precomputed sort keys to QSortFilterProxyModel
+SortKeyRole = Qt.UserRole + 1
+
+# Shared QMimeDatabase instance for the UI. QMimeDatabase is thread-safe and all instances share the same data
+QMIMEDB = QMimeDatabase()
+
 _ICON_CACHE = {}
 def get_mimetype_icon(mimetype: QMimeType) -> QIcon:
     """
     Return a QIcon for the given QMIMEType.
     """
-    if mimetype in _ICON_CACHE:
-        return _ICON_CACHE[mimetype]
+    return get_mimetype_icon_from_names(mimetype.iconName(), mimetype.genericIconName())
+
+def get_mimetype_icon_from_names(icon_name: str, generic_icon_name: str) -> QIcon:
+    """
+    Return a QIcon for a MIME type, given its icon and generic icon names.
+    """
+    key = (icon_name, generic_icon_name)
+    if key in _ICON_CACHE:
+        return _ICON_CACHE[key]
     else:
         # Show the icon for the MIME type, falling back to the generic type icon
         # or the "unknown type" icon if it's missing in the current icon theme
         fallback_unknown = QIcon.fromTheme("unknown")
-        fallback_generic = QIcon.fromTheme(mimetype.genericIconName(), fallback_unknown)
-        _ICON_CACHE[mimetype] = icon = QIcon.fromTheme(mimetype.iconName(), fallback_generic)
+        fallback_generic = QIcon.fromTheme(generic_icon_name, fallback_unknown)
+        _ICON_CACHE[key] = icon = QIcon.fromTheme(icon_name, fallback_generic)
         return icon
+
+def get_app_icon(desktop_entries, desktop_entry_id: str) -> QIcon or None:
+    """Returns a QIcon representing a desktop entry, if it exists."""
+    iconname = desktop_entries.get_icon_name(desktop_entry_id)
+    if iconname is None:
+        return None
+
+    # Icon definitions in .desktop entries can be a name (icon pulled from the current icon theme)
+    # or an absolute path.
+    if os.path.isabs(iconname):
+        return QIcon(iconname)
+    else:
+        return QIcon.fromTheme(iconname)
+
+class QMimeDatabaseTypeInfo():
+    """
+    Looks up MIME type details from QMimeDatabase. This has the same interface as
+    appsel.backend.mimecache.MimeCacheDatabase, which can be used instead to avoid loading every type up front.
+    """
+    def __init__(self, qmimedb: QMimeDatabase = QMIMEDB):
+        self.qmimedb = qmimedb
+        self._mimetypes = {}
+
+    def _get(self, mimetype: str) -> QMimeType:
+        try:
+            return self._mimetypes[mimetype]
+        except KeyError:
+            self._mimetypes[mimetype] = qmimetype = self.qmimedb.mimeTypeForName(mimetype)
+            return qmimetype
+
+    def all_mimetypes(self) -> List[str]:
+        """Returns the names of all known MIME types."""
+        qmimetypes = self.qmimedb.allMimeTypes()
+        self._mimetypes.update((qmimetype.name(), qmimetype) for qmimetype in qmimetypes)
+        return [qmimetype.name() for qmimetype in qmimetypes]
+
+    def get_suffixes(self, mimetype: str) -> List[str]:
+        """Returns the file extensions for a MIME type, with the preferred one first."""
+        return self._get(mimetype).suffixes()
+
+    def get_parents(self, mimetype: str) -> List[str]:
+        """Returns the direct parents of a MIME type."""
+        return self._get(mimetype).parentMimeTypes()
+
+    def get_icon_name(self, mimetype: str) -> str:
+        """Returns the icon name for a MIME type."""
+        return self._get(mimetype).iconName()
+
+    def get_generic_icon_name(self, mimetype: str) -> str:
+        """Returns the generic icon name for a MIME type."""
+        return self._get(mimetype).genericIconName()
+
+@functools.lru_cache(maxsize=None)
+def get_collation_key(text: str) -> str:
+    """
+    Return a locale-aware collation key for text.
+
+    The result is a plain string, so comparing two keys is as cheap as a regular string comparison.
+    QApplication sets LC_COLLATE from the environment on startup, so this follows the user's locale.
+    """
+    return locale.strxfrm(text.casefold())
+
+def get_optional_collation_key(text: Optional[str]) -> Tuple[int, str]:
+    """
+    Return a collation key for text that may be missing (e.g. no default app), sorting missing values last.
+
+    The key is a tuple because strxfrm() results can contain any code point, so no string reliably sorts last.
+    """
+    return (1, '') if text is None else (0, get_collation_key(text))
+
+def sort_rows(model, rows: list, key, reverse: bool = False):
+    """
+    Sorts the rows list backing model in place, emitting layout change signals so that persistent
+    indexes (selections, current item) follow the rows they pointed to.
+
+    The sort is stable, so sorting by several columns in turn orders rows by all of them.
+    """
+    model.layoutAboutToBeChanged.emit()
+    order = sorted(range(len(rows)), key=lambda row: key(rows[row]), reverse=reverse)
+    rows[:] = [rows[row] for row in order]
+
+    new_rows = {old_row: new_row for new_row, old_row in enumerate(order)}
+    persistent_indexes = model.persistentIndexList()
+    model.changePersistentIndexList(
+        persistent_indexes,
+        [model.index(new_rows[index.row()], index.column(), index.parent()) for index in persistent_indexes])
+    model.layoutChanged.emit()
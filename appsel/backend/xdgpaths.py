@@ -0,0 +1,61 @@
+"""
+XDG base directory lookups, without Qt. These follow the behaviour of QStandardPaths on Linux.
+
+Based off of: https://specifications.freedesktop.org/basedir-spec/latest/
+"""
+import os
+import os.path
+
+from typing import List
+
+from appsel.backend.filesystem import REAL_FILESYSTEM, FileSystem
+
+# Base directories for configuration files (e.g. mimeapps.list)
+CONFIG_LOCATION = 'config'
+# Base directories for shared data (e.g. mime/)
+DATA_LOCATION = 'data'
+# Directories containing .desktop entries
+APPLICATIONS_LOCATION = 'applications'
+# User specific cache directory
+CACHE_LOCATION = 'cache'
+# User specific state that should persist between runs (e.g. logs), but isn't worth backing up like configuration
+STATE_LOCATION = 'state'
+
+def _get_dirs(env_var: str, default: str) -> List[str]:
+    # Relative paths are invalid per the spec and must be ignored
+    dirs = [path for path in (os.environ.get(env_var) or default).split(':') if os.path.isabs(path)]
+    return list(dict.fromkeys(dirs))
+
+def writable_location(location: str) -> str:
+    """Returns the user specific directory for the location type, whether or not it exists."""
+    if location == CONFIG_LOCATION:
+        return os.environ.get('XDG_CONFIG_HOME') or os.path.expanduser('~/.config')
+    if location == CACHE_LOCATION:
+        return os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    if location == STATE_LOCATION:
+        return os.environ.get('XDG_STATE_HOME') or os.path.expanduser('~/.local/state')
+    data_home = os.environ.get('XDG_DATA_HOME') or os.path.expanduser('~/.local/share')
+    if location == APPLICATIONS_LOCATION:
+        return os.path.join(data_home, 'applications')
+    return data_home
+
+def standard_locations(location: str) -> List[str]:
+    """Returns all directories for the location type, in order of decreasing priority."""
+    if location == CONFIG_LOCATION:
+        system_dirs = _get_dirs('XDG_CONFIG_DIRS', '/etc/xdg')
+    elif location in {CACHE_LOCATION, STATE_LOCATION}:
+        system_dirs = []
+    else:
+        system_dirs = _get_dirs('XDG_DATA_DIRS', '/usr/local/share:/usr/share')
+        if location == APPLICATIONS_LOCATION:
+            system_dirs = [os.path.join(path, 'applications') for path in system_dirs]
+    return list(dict.fromkeys([writable_location(location)] + system_dirs))
+
+def locate_all(location: str, filename: str, fs: FileSystem = REAL_FILESYSTEM) -> List[str]:
+    """Returns the paths of all existing files named filename in the location type's directories."""
+    return [path for path in (os.path.join(directory, filename) for directory in standard_locations(location))
+            if fs.exists(path)]
+
+def get_current_desktops() -> List[str]:
+    """Returns the list of current desktop environments, from $XDG_CURRENT_DESKTOP."""
+    return os.environ.get('XDG_CURRENT_DESKTOP', '').split(':')
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+appsel command line interface.
+"""
+import argparse
+import json
+import logging
+import shlex
+import sys
+
+# Backend modules are imported by each command as needed, to keep startup fast for commands like open
+
+def _load_manager():
+    # pylint: disable=import-outside-toplevel
+    from appsel.backend.desktopentries import DesktopEntriesList
+    from appsel.backend.mimetypesmanager import MimeTypesManager
+
+    return MimeTypesManager(DesktopEntriesList())
+
+def audit(args):
+    """Prints the MIME type and default application of each file under the given paths."""
+    from appsel.backend.fileaudit import FileHandlerResolver  # pylint: disable=import-outside-toplevel
+
+    resolver = FileHandlerResolver(_load_manager(), sniff_content=not args.no_sniff)
+    for result in resolver.resolve(args.paths, workers=args.workers):
+        if args.format == 'json':
+            line = json.dumps({'path': result.path, 'mimetype': result.mimetype, 'app_id': result.app_id})
+        else:
+            line = f"{result.path}\t{result.mimetype}\t{result.app_id or ''}"
+        print(line)
+
+def compare_desktops(args):
+    """Prints the effective default applications (or app visibility) for several desktops side by side."""
+    # pylint: disable=import-outside-toplevel
+    from appsel.backend.desktopcomparison import DesktopComparison
+    from appsel.backend.desktopentries import DesktopEntriesList
+
+    comparison = DesktopComparison(DesktopEntriesList(), args.desktops)
+    rows = comparison.iter_visibility() if args.apps else comparison.iter_default_apps()
+    if args.format == 'tsv':
+        print('\t'.join(['app' if args.apps else 'mimetype'] + args.desktops))
+    for row in rows:
+        if not args.all and not row.differs:
+            continue
+        if args.format == 'json':
+            print(json.dumps({'name': row.name, 'values': row.values, 'differs': row.differs}))
+        else:
+            print('\t'.join([row.name] + ['' if value is None else str(value) for value in row.values.values()]))
+
+def export_sqlite(args):
+    """Exports resolved associations to a SQLite database."""
+    # pylint: disable=import-outside-toplevel
+    from appsel.backend.sqliteexport import ForeignDatabaseError, export_database
+
+    try:
+        export_database(_load_manager(), args.database, force=args.force)
+    except ForeignDatabaseError as e:
+        print(f"appsel: {args.database}: {e} (use --force to replace its tables)", file=sys.stderr)
+        sys.exit(2)
+
+def fingerprint(args):
+    """Prints a fingerprint of the effective associations as JSON."""
+    from appsel.backend.fingerprint import AssociationFingerprint  # pylint: disable=import-outside-toplevel
+
+    print(json.dumps(AssociationFingerprint(_load_manager()).to_dict(include_types=not args.summary), indent=1))
+
+def compare_fingerprints(args):
+    """Prints the MIME types that differ between two fingerprints. Exits with status 1 if there are any."""
+    from appsel.backend.fingerprint import compare_fingerprints as compare  # pylint: disable=import-outside-toplevel
+
+    fingerprints = []
+    for path in (args.first, args.second):
+        with open(path, encoding='utf-8') as f:
+            fingerprints.append(json.load(f))
+    differences = compare(fingerprints[0], fingerprints[1])
+    for mimetype in differences:
+        print(mimetype)
+    if differences:
+        sys.exit(1)
+
+def _parse_rule(spec: str):
+    from appsel.backend.rules import DefaultAppRule  # pylint: disable=import-outside-toplevel
+
+    pattern, sep, app_id = spec.partition('=')
+    if not sep or not pattern or not app_id:
+        raise argparse.ArgumentTypeError(f"invalid rule {spec!r}, expected PATTERN=APP_ID[@PRIORITY]")
+    app_id, sep, priority = app_id.partition('@')
+    try:
+        return DefaultAppRule(pattern, app_id, priority=int(priority) if sep else 0)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid priority in rule {spec!r}") from None
+
+def apply_rules(args):
+    """Sets default applications for all MIME types matching wildcard rules."""
+    manager = _load_manager()
+    for rule in args.rules:
+        rule.exclude = args.exclude
+    if args.dry_run:
+        changes = manager.preview_rules(args.rules)
+    else:
+        changes = manager.apply_rules(args.rules)
+    for mimetype, (old_app, new_app) in sorted(changes.items()):
+        print(f"{mimetype}\t{old_app or ''} -> {new_app}")
+
+def recommend(args):
+    """Prints the MIME types an app is recommended to become the default for, best first."""
+    from appsel.backend.mimecache import MimeCacheDatabase  # pylint: disable=import-outside-toplevel
+
+    manager = _load_manager()
+    if args.app_id not in manager.desktop_entries.entries:
+        print(f"appsel: unknown app {args.app_id!r}", file=sys.stderr)
+        sys.exit(2)
+    recommendations = [recommendation for recommendation in
+                       manager.recommend_defaults(args.app_id, get_parents=MimeCacheDatabase().get_parents)
+                       if recommendation.score >= args.min_score]
+    for recommendation in recommendations:
+        print(f"{recommendation.mimetype}\t{recommendation.current_app or ''}\t{recommendation.score:.2f}\t"
+              f"{recommendation.reason}")
+    if args.apply:
+        manager.set_default_apps({recommendation.mimetype: args.app_id for recommendation in recommendations})
+
+def explain(args):
+    """Prints how the default application for each MIME type was chosen, with the file and line of each entry."""
+    manager = _load_manager()
+    for mimetype in args.mimetypes:
+        explanation = manager.explain(mimetype)
+        print(json.dumps(explanation.to_dict()) if args.format == 'json' else explanation)
+
+def export_changes(args):
+    """Prints the changes made since a sequence number as a JSON delta, for apply-changes on another machine."""
+    print(json.dumps(_load_manager().export_changes(since=args.since), indent=1))
+
+def apply_changes(args):
+    """Replays a delta from export-changes. Exits with status 1 if some changes conflict with local edits."""
+    from appsel.backend.changelog import load_delta  # pylint: disable=import-outside-toplevel
+
+    try:
+        with (sys.stdin if args.delta == '-' else open(args.delta, encoding='utf-8')) as f:
+            changes = load_delta(json.load(f))
+    except ValueError as e:
+        print(f"appsel: {e}", file=sys.stderr)
+        sys.exit(2)
+    result = _load_manager().apply_delta(changes, overwrite=args.overwrite, dry_run=args.dry_run)
+    for change in result.applied:
+        print(f"applied\t{change}")
+    for change in result.unchanged:
+        print(f"unchanged\t{change}")
+    for conflict in result.conflicts:
+        print(f"conflict\t{conflict}")
+    if result.conflicts:
+        sys.exit(1)
+
+def open_command(args):
+    """Opens files or URLs with their default applications."""
+    from appsel import launcher  # pylint: disable=import-outside-toplevel
+
+    try:
+        for command in launcher.open_targets(args.targets, dry_run=args.dry_run):
+            if args.dry_run:
+                print(shlex.join(command))
+    except launcher.LaunchError as e:
+        print(f"appsel: {e}", file=sys.stderr)
+        sys.exit(4)
+
+def _add_open_parser(subparsers):
+    parser = subparsers.add_parser('open', help="open files or URLs with their default applications")
+    parser.add_argument('targets', nargs='+', metavar='FILE|URL', help="files or URLs to open")
+    parser.add_argument('-n', '--dry-run', action='store_true', help="only print the commands that would be run")
+    parser.set_defaults(func=open_command)
+
+def _add_audit_parser(subparsers):
+    parser = subparsers.add_parser('audit', help="show which application opens each file in a directory tree")
+    parser.add_argument('paths', nargs='+', help="files or directories to check")
+    parser.add_argument('--format', choices=['tsv', 'json'], default='tsv',
+                        help="output format: tab separated values or JSON lines (default: %(default)s)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="number of threads used to classify files (default: number of CPUs)")
+    parser.add_argument('--no-sniff', action='store_true',
+                        help="classify files by name only, without reading their contents")
+    parser.set_defaults(func=audit)
+
+def _add_compare_desktops_parser(subparsers):
+    parser = subparsers.add_parser('compare-desktops', help="compare default applications between desktop environments")
+    parser.add_argument('desktops', nargs='+',
+                        help="desktops to compare, in $XDG_CURRENT_DESKTOP format (e.g. GNOME, KDE, XFCE)")
+    parser.add_argument('--apps', action='store_true',
+                        help="compare whether each app is shown, instead of default applications")
+    parser.add_argument('--all', action='store_true', help="show all entries, not only those where the desktops differ")
+    parser.add_argument('--format', choices=['tsv', 'json'], default='tsv',
+                        help="output format: tab separated values or JSON lines (default: %(default)s)")
+    parser.set_defaults(func=compare_desktops)
+
+def _add_export_sqlite_parser(subparsers):
+    parser = subparsers.add_parser('export-sqlite',
+                                   help="export apps, MIME types and associations to a SQLite database")
+    parser.add_argument('database', help="database file to create or update")
+    parser.add_argument('--force', action='store_true',
+                        help="drop all tables of an existing database that wasn't created by appsel")
+    parser.set_defaults(func=export_sqlite)
+
+def _add_apply_rules_parser(subparsers):
+    parser = subparsers.add_parser('apply-rules', help="set default applications for all MIME types matching patterns")
+    parser.add_argument('rules', nargs='+', type=_parse_rule, metavar='PATTERN=APP_ID[@PRIORITY]',
+                        help="e.g. 'video/*=mpv.desktop'. Higher priority rules win; ties go to the first rule")
+    parser.add_argument('--exclude', action='append', default=[], metavar='PATTERN',
+                        help="MIME types to leave alone (can be given multiple times)")
+    parser.add_argument('-n', '--dry-run', action='store_true', help="only show the changes that would be made")
+    parser.set_defaults(func=apply_rules)
+
+def _add_fingerprint_parser(subparsers):
+    parser = subparsers.add_parser('fingerprint', help="print a hashed fingerprint of the effective associations")
+    parser.add_argument('--summary', action='store_true', help="only include the root and per media type hashes")
+    parser.set_defaults(func=fingerprint)
+
+def _add_compare_fingerprints_parser(subparsers):
+    parser = subparsers.add_parser('compare-fingerprints',
+                                   help="show the MIME types that differ between two fingerprints")
+    parser.add_argument('first', help="fingerprint file from the fingerprint command")
+    parser.add_argument('second', help="fingerprint file from the fingerprint command")
+    parser.set_defaults(func=compare_fingerprints)
+
+def _add_recommend_parser(subparsers):
+    parser = subparsers.add_parser('recommend', help="show the MIME types an app should become the default for")
+    parser.add_argument('app_id', help="desktop entry ID of the app (e.g. mpv.desktop)")
+    parser.add_argument('--min-score', type=float, default=0.0,
+                        help="only show recommendations with at least this score, from 0 to 1")
+    parser.add_argument('--apply', action='store_true', help="set the app as default for all of them")
+    parser.set_defaults(func=recommend)
+
+def _add_explain_parser(subparsers):
+    parser = subparsers.add_parser('explain', help="show why a MIME type opens with its default application")
+    parser.add_argument('mimetypes', nargs='+', metavar='MIMETYPE', help="MIME types to explain")
+    parser.add_argument('--format', choices=['text', 'json'], default='text',
+                        help="output format: text or JSON lines (default: %(default)s)")
+    parser.set_defaults(func=explain)
+
+def _add_export_changes_parser(subparsers):
+    parser = subparsers.add_parser('export-changes', help="print the changes made with appsel as a delta to sync")
+    parser.add_argument('--since', type=int, default=0, metavar='SEQUENCE',
+                        help="only include changes after this sequence number, e.g. the "
+                             "last_sequence of the previous export")
+    parser.set_defaults(func=export_changes)
+
+def _add_apply_changes_parser(subparsers):
+    parser = subparsers.add_parser('apply-changes', help="replay a delta from export-changes")
+    parser.add_argument('delta', help="delta file from export-changes, or - for standard input")
+    parser.add_argument('--overwrite', action='store_true',
+                        help="apply default changes even where the default was changed locally")
+    parser.add_argument('-n', '--dry-run', action='store_true', help="only show what would be applied")
+    parser.set_defaults(func=apply_changes)
+
+def get_parser() -> argparse.ArgumentParser:
+    """Returns the argument parser for the CLI."""
+    parser = argparse.ArgumentParser(prog='appsel', description="Manage default applications for file types")
+    parser.add_argument('-v', '--verbose', action='store_true', help="enable debug logging")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    _add_open_parser(subparsers)
+    _add_audit_parser(subparsers)
+    _add_compare_desktops_parser(subparsers)
+    _add_export_sqlite_parser(subparsers)
+    _add_apply_rules_parser(subparsers)
+    _add_fingerprint_parser(subparsers)
+    _add_compare_fingerprints_parser(subparsers)
+    _add_recommend_parser(subparsers)
+    _add_explain_parser(subparsers)
+    _add_export_changes_parser(subparsers)
+    _add_apply_changes_parser(subparsers)
+    return parser
+
+def main(argv=None):
+    """Entrypoint for the CLI"""
+    args = get_parser().parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+    try:
+        args.func(args)
+    except BrokenPipeError:
+        # Output was piped to something like head, which exited early
+        sys.stderr.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Long-running query daemon: keeps the backend loaded and answers JSON requests over a Unix domain socket.
+
+Each request is one line of JSON: either a single request object or a list of them (a batch). The response is one
+line of JSON with a result object (or list of result objects, for batches) in the same order. Example:
+
+    [{"method": "get_default_app", "mimetype": "text/plain"},
+     {"method": "set_default_app", "mimetype": "image/png", "app_id": "org.gnome.eog.desktop"}]
+    => [{"result": "org.gnome.gedit.desktop"}, {"result": null}]
+"""
+import argparse
+import dataclasses
+import json
+import logging
+import os
+import socket
+import socketserver
+import stat
+import sys
+import threading
+
+from appsel.backend.desktopentries import DesktopEntriesList
+from appsel.backend.mimetypesmanager import MimeTypesManager
+
+DEFAULT_SOCKET_NAME = "appsel.sock"
+# How often to check the backend's files for changes, in seconds
+DEFAULT_POLL_INTERVAL = 2.0
+
+def get_default_socket_path() -> str:
+    """Returns the default socket path, $XDG_RUNTIME_DIR/appsel.sock"""
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR') or f"/tmp/appsel-{os.getuid()}"
+    return os.path.join(runtime_dir, DEFAULT_SOCKET_NAME)
+
+class QueryDaemonError(Exception):
+    """Raised for invalid requests sent to the daemon, or when it can't start."""
+
+class QueryBackend():
+    """
+    Holds the loaded backend state and dispatches requests to it.
+
+    Writes and reloads are serialized through a lock; reads use the manager's current snapshot and don't block on them.
+    The files the backend is loaded from are polled for changes, and the state is reloaded when they change.
+    """
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.desktop_entries = None
+        self.manager = None
+        self._file_state = None
+        self.reload()
+
+    def reload(self):
+        """Loads (or reloads) desktop entries and MIME associations."""
+        with self.lock:
+            self.desktop_entries = DesktopEntriesList()
+            self.manager = MimeTypesManager(self.desktop_entries)
+            self._file_state = self._get_file_state()
+            logging.info("Loaded %d desktop entries", len(self.desktop_entries.entries))
+
+    def _get_watched_paths(self):
+        yield from self.manager.get_source_paths()
+        yield from self.manager.fs.iter_directories(self.desktop_entries.locations)
+        yield from self.desktop_entries.desktop_entry_paths.values()
+
+    def _get_file_state(self):
+        return self.manager.fs.get_mtimes(self._get_watched_paths())
+
+    def check_for_changes(self):
+        """Reloads the backend if any of the files it was loaded from changed."""
+        with self.lock:
+            if self._get_file_state() != self._file_state:
+                logging.info("Backend files changed, reloading")
+                self.reload()
+
+    def _after_write(self):
+        # Don't trigger a full reload for our own writes
+        self._file_state = self._get_file_state()
+
+    @staticmethod
+    def _get_argument(request: dict, name: str, expected_type: type = str, default=None):
+        """Helper: returns a request argument, checking that it is given (unless it has a default) and its type."""
+        if name not in request:
+            if default is None:
+                raise QueryDaemonError(f"Missing argument {name!r} for method {request.get('method')!r}")
+            return default
+        value = request[name]
+        if not isinstance(value, expected_type):
+            raise QueryDaemonError(f"Argument {name!r} must be of type {expected_type.__name__}")
+        return value
+
+    def _get_app_id(self, request: dict, snapshot) -> str:
+        """Helper: returns the app_id argument of a request, checking that the desktop entry exists."""
+        app_id = self._get_argument(request, 'app_id')
+        if app_id not in snapshot.desktop_entries.entries:
+            raise QueryDaemonError(f"Unknown app {app_id!r}")
+        return app_id
+
+    def handle_request(self, request: dict):
+        """Runs a single request and returns its result."""
+        if not isinstance(request, dict):
+            raise QueryDaemonError("Request must be a JSON object")
+        method = request.get('method')
+        if method in ('get_default_app', 'get_supported_apps', 'get_supported_types'):
+            # Reads don't need the lock: a snapshot stays consistent even if a write or reload happens meanwhile
+            snapshot = self.manager.snapshot()
+            if method == 'get_default_app':
+                return snapshot.get_default_app(self._get_argument(request, 'mimetype'),
+                                                use_fallback=self._get_argument(request, 'use_fallback', bool, True))
+            elif method == 'get_supported_apps':
+                return {app_id: dataclasses.asdict(options) for app_id, options in
+                        snapshot.get_supported_apps(self._get_argument(request, 'mimetype')).items()}
+            else:
+                return {mimetype: dataclasses.asdict(options) for mimetype, options in
+                        snapshot.get_supported_types(self._get_app_id(request, snapshot)).items()}
+        with self.lock:
+            if method == 'set_default_app':
+                mimetype = self._get_argument(request, 'mimetype')
+                # Like the GUI, only installed apps can be made the default
+                self.manager.set_default_app(mimetype, self._get_app_id(request, self.manager.snapshot()))
+                self._after_write()
+                return None
+            elif method == 'clear_default_app':
+                self.manager.clear_default_app(self._get_argument(request, 'mimetype'))
+                self._after_write()
+                return None
+        raise QueryDaemonError(f"Unknown method {method!r}")
+
+    def handle_line(self, line: bytes) -> bytes:
+        """Parses a line of JSON requests and returns a line of JSON responses."""
+        try:
+            requests = json.loads(line)
+        except ValueError as e:
+            return json.dumps({'error': f"Invalid JSON: {e}"}).encode() + b'\n'
+
+        is_batch = isinstance(requests, list)
+        responses = []
+        for request in (requests if is_batch else [requests]):
+            try:
+                responses.append({'result': self.handle_request(request)})
+            except QueryDaemonError as e:
+                responses.append({'error': str(e)})
+            except Exception as e:  # pylint: disable=broad-except; e.g. OSError from a write, reported to the client
+                logging.exception("Failed to handle request %r", request)
+                responses.append({'error': f"Internal error: {e}"})
+        return json.dumps(responses if is_batch else responses[0]).encode() + b'\n'
+
+class QueryRequestHandler(socketserver.StreamRequestHandler):
+    """Handles one client connection, which may send any number of request lines."""
+    def handle(self):
+        for line in self.rfile:
+            if line.strip():
+                self.wfile.write(self.server.backend.handle_line(line))
+                self.wfile.flush()
+
+class QueryServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix socket server answering backend queries, one thread per client."""
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, backend: QueryBackend):
+        self.backend = backend
+        super().__init__(socket_path, QueryRequestHandler)
+
+def _watch_files(backend: QueryBackend, interval: float, stop: threading.Event):
+    while not stop.wait(interval):
+        try:
+            backend.check_for_changes()
+        except Exception:  # pylint: disable=broad-except
+            logging.exception("Failed to reload backend state")
+
+def _check_socket_directory(directory: str):
+    """
+    Creates the directory of the socket if needed, and checks that only the current user can access it. Otherwise
+    another user could create it first (e.g. under /tmp) and replace the socket.
+    """
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid() or stat.S_IMODE(info.st_mode) != 0o700:
+        raise QueryDaemonError(f"{directory} must be a directory owned by the current user with mode 0700")
+
+def _is_daemon_running(socket_path: str) -> bool:
+    """Returns whether a daemon is listening on socket_path, as opposed to a stale socket left behind."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        try:
+            client.connect(socket_path)
+        except OSError:
+            return False
+    return True
+
+def serve(socket_path: str, poll_interval: float = DEFAULT_POLL_INTERVAL):
+    """
+    Runs the query daemon on socket_path until interrupted. Raises QueryDaemonError if the socket's directory isn't
+    private or another daemon is already listening on it.
+    """
+    _check_socket_directory(os.path.dirname(socket_path))
+    if os.path.lexists(socket_path):
+        if _is_daemon_running(socket_path):
+            raise QueryDaemonError(f"Another daemon is already listening on {socket_path}")
+        os.unlink(socket_path)
+    backend = QueryBackend()
+
+    stop = threading.Event()
+    watcher = threading.Thread(target=_watch_files, args=(backend, poll_interval, stop), daemon=True)
+    with QueryServer(socket_path, backend) as server:
+        os.chmod(socket_path, 0o600)
+        watcher.start()
+        logging.info("Listening on %s", socket_path)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            stop.set()
+            os.unlink(socket_path)
+
+def main():
+    """Entrypoint for the query daemon"""
+    parser = argparse.ArgumentParser(description="appsel query daemon")
+    parser.add_argument('--socket', default=get_default_socket_path(),
+                        help="path of the Unix socket to listen on (default: %(default)s)")
+    parser.add_argument('--poll-interval', type=float, default=DEFAULT_POLL_INTERVAL,
+                        help="how often to check for changed files, in seconds (default: %(default)s)")
+    parser.add_argument('-v', '--verbose', action='store_true', help="enable debug logging")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+    try:
+        serve(args.socket, poll_interval=args.poll_interval)
+    except QueryDaemonError as e:
+        logging.error("%s", e)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
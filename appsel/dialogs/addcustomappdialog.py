@@ -3,19 +3,18 @@
 from PyQt5.QtWidgets import QDialog
 from PyQt5.uic import loadUi
 
-from appsel.backend.models.appslistmodel import AppsListModel
+from appsel.backend.models.apppickermodel import AppPickerModel
 
 class AddCustomAppDialog(QDialog):
     """
     Dialog to add a custom application for a MIME type.
     """
     uifile = "ui/addcustomappdialog.ui"
-    def __init__(self, desktop_entries, parent=None):
+    def __init__(self, app_catalog, mimetype: str = None, parent=None):
         super().__init__()
         self._app = parent
-        self.desktop_entries = desktop_entries
 
-        self.model = AppsListModel(desktop_entries)
+        self.model = AppPickerModel(app_catalog, mimetype)
 
         # Selection state
         self.current_index = None
@@ -29,15 +28,22 @@ class AddCustomAppDialog(QDialog):
         # ListView
         self._ui.appsView.setModel(self.model)
         self._ui.appsView.selectionModel().selectionChanged.connect(self.on_row_changed)
+        self._ui.appsView.doubleClicked.connect(self.accept)
+        # Search bar
+        self._ui.searchBar.textChanged.connect(self.on_search)
+        self._ui.searchBar.setFocus()
         self._ui.show()
 
+    def on_search(self, text):
+        # The model is reset, so the previous selection is gone
+        self.current_index = None
+        self.model.set_query(text)
+
     def on_row_changed(self, selected, _deselected):
         if selected.indexes():
             self.current_index = selected.indexes()[0].row()
 
     def get_selected_app(self):
         if self.current_index is not None:
-            try:
-                return self.model.apps[self.current_index]
-            except IndexError:
-                return None
+            return self.model.get_app_id(self.current_index)
+        return None
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+from PyQt5.QtCore import QTimer
+from PyQt5.QtGui import QFontDatabase
+from PyQt5.QtWidgets import QDialog
+from PyQt5.uic import loadUi
+
+from appsel.backend import metrics
+
+class MetricsDialog(QDialog):
+    """
+    Debug panel showing live call counts and timings collected by appsel.backend.metrics.
+    """
+    uifile = "ui/metricsdialog.ui"
+    REFRESH_INTERVAL = 1000  # ms
+    def __init__(self, parent=None):
+        super().__init__()
+        self._app = parent
+
+        self._ui = loadUi(self.uifile, self)
+        # XXX: internationalize
+        self._ui.setWindowTitle("Performance metrics")
+        self._ui.reportView.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        # Buttons
+        self._ui.resetButton.clicked.connect(self.reset)
+        self._ui.buttonBox.rejected.connect(self.reject)
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(self.REFRESH_INTERVAL)
+        self.refresh()
+        self._ui.show()
+
+    def refresh(self):
+        """Updates the report with the latest numbers."""
+        scrollbar = self._ui.reportView.verticalScrollBar()
+        position = scrollbar.value()
+        self._ui.reportView.setPlainText(metrics.registry.format_report())
+        scrollbar.setValue(position)
+
+    def reset(self):
+        """Button handler: clears all collected metrics."""
+        metrics.registry.reset()
+        self.refresh()
@@ -2,10 +2,11 @@
 import enum
 import logging
 
-from PyQt5.QtWidgets import QDialog
+from PyQt5.QtWidgets import QDialog, QMessageBox
 from PyQt5.uic import loadUi
 
 from .addcustomappdialog import AddCustomAppDialog  # pylint: disable=relative-beyond-top-level
+from appsel.backend.appcatalog import AppCatalog
 from appsel.backend.models.defaultappoptionsmodel import DefaultAppOptionsModel
 
 class ToggleApplicationAction(enum.Enum):
@@ -39,6 +40,7 @@ class SetDefaultAppDialog(QDialog):
         self._ui.addApplication.clicked.connect(self.on_add_application)
         self._ui.toggleApplication.clicked.connect(self.on_toggle_application)
         self._ui.setAsDefault.clicked.connect(self.on_set_default)
+        self._ui.explainDefault.clicked.connect(self.on_explain_default)
         # ListView
         self._ui.appsView.setModel(self.model)
         self._ui.appsView.selectionModel().selectionChanged.connect(self.on_row_changed)
@@ -68,8 +70,10 @@ class SetDefaultAppDialog(QDialog):
             self._update_toggle_action()
 
     def on_add_application(self, _event):
-        dlg = AddCustomAppDialog(self.manager.desktop_entries)
-        if dlg.exec_():
+        # Reuse the main window's catalog, so the picker doesn't have to load every app again
+        app_catalog = self._app.app_catalog if self._app else AppCatalog(self.manager)
+        dlg = AddCustomAppDialog(app_catalog, self.mimetype)
+        if dlg.exec_() and dlg.get_selected_app():
             self.manager.add_association(self.mimetype, dlg.get_selected_app())
             self._refresh()
 
@@ -90,6 +94,16 @@ class SetDefaultAppDialog(QDialog):
                 self.manager.set_default_app(self.mimetype, app_id)
             self._refresh()
 
+    def on_explain_default(self, _event):
+        """Button handler: shows which mimeapps.list and mimeinfo.cache entries decided the default application."""
+        explanation = self.manager.explain(self.mimetype)
+        default_app = explanation.default_app
+        # XXX: internationalize text strings
+        summary = f"{self.mimetype} opens with {self.manager.desktop_entries.get_name(default_app)} ({default_app})." \
+            if default_app else f"{self.mimetype} has no default application."
+        details = '\n'.join(str(step) for step in explanation.steps) or "No entries are listed for this type."
+        QMessageBox.information(self, f"Default application for {self.mimetype}", f"{summary}\n\n{details}")
+
     def on_toggle_application(self, _event):
         """Button handler: enable, disable, or remove the application from the handlers for a file type."""
         if self.current_index is None:
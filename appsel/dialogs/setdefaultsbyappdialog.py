@@ -3,7 +3,9 @@ from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import QDialog
 from PyQt5.uic import loadUi
 
+from appsel.backend import metrics, utils
 from appsel.backend.models.defaultsforappmodel import DefaultsForAppModel
+from appsel.backend.models.recommendationsmodel import RecommendationsModel
 from .setdefaultappdialog import SetDefaultAppDialog
 
 class SetDefaultsByAppDialog(QDialog):
@@ -19,6 +21,8 @@ class SetDefaultsByAppDialog(QDialog):
 
         self.app_id = app_id
         self.model = DefaultsForAppModel(manager, app_id)
+        type_info = self._app.type_info if self._app else utils.QMimeDatabaseTypeInfo()
+        self.recommendations_model = RecommendationsModel(manager, app_id, get_parents=type_info.get_parents)
 
         self._ui = loadUi(self.uifile, self)
         # XXX: internationalize
@@ -26,6 +30,8 @@ class SetDefaultsByAppDialog(QDialog):
         # Buttons
         self._ui.selectAllButton.clicked.connect(self.select_all)
         self._ui.deselectAllButton.clicked.connect(self.deselect_all)
+        self._ui.applyRecommendationsButton.clicked.connect(self.apply_recommendations)
+        self._ui.recommendationsView.setModel(self.recommendations_model)
         # ListView
         self._ui.tableView.setModel(self.model)
         self._ui.tableView.resizeColumnsToContents()
@@ -42,15 +48,37 @@ class SetDefaultsByAppDialog(QDialog):
 
     def select_all(self):
         """
-        Handler for the select all button.
+        Handler for the select all button. Types in BLACKLISTED_CATEGORIES (e.g. inode/directory) are skipped.
         """
-        self._check_all(Qt.Checked)
+        with metrics.ui_action("select all"):
+            self.manager.set_default_apps({
+                mimetype: self.app_id for mimetype, _options in self.model.supported_types
+                if not any(mimetype.startswith(category) for category in self.BLACKLISTED_CATEGORIES)
+            })
+            self._refresh()
+
+    def apply_recommendations(self):
+        """
+        Handler for the apply recommended button: sets the app as default for all checked recommendations.
+        """
+        with metrics.ui_action("apply recommendations"):
+            self.manager.set_default_apps({mimetype: self.app_id
+                                           for mimetype in self.recommendations_model.get_checked()})
+            self._refresh()
+
+    def _refresh(self):
+        self.model.refresh()
+        self.recommendations_model.refresh()
+        if self._app:
+            self._app.refresh()
 
     def deselect_all(self):
         """
         Handler for the deselect all button.
         """
-        self._check_all(Qt.Unchecked)
+        with metrics.ui_action("deselect all"):
+            self._check_all(Qt.Unchecked)
+            self.recommendations_model.refresh()
 
     def configure_default_app(self, index):
         """Launches a dialog to set the default app for a MIME type."""
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+import logging
+import os
+import sys
+
+from PyQt5.QtGui import QKeySequence
+from PyQt5.QtWidgets import QMainWindow, QApplication, QShortcut
+from PyQt5.uic import loadUi
+from PyQt5.QtCore import Qt
+
+from appsel import __version__
+from appsel.backend import metrics, utils
+from appsel.backend.appcatalog import AppCatalog
+from appsel.backend.mimecache import MimeCacheDatabase
+from appsel.backend.models.mimetypeslistmodel import MimeTypesListModel
+from appsel.backend.models.mimetypestreemodel import MimeTypesTreeModel
+from appsel.backend.models.appslistmodel import AppsListModel
+from appsel.backend.models.filteredappslistmodel import FilteredAppsListModel
+from appsel.backend.models.filteredmimetypesmodel import FilteredMimeTypesModel
+from appsel.backend.mimetypesmanager import MimeTypesManager
+from appsel.backend.typecatalog import TypeKind
+from appsel.backend.desktopentries import DesktopEntriesList
+
+from appsel.dialogs.metricsdialog import MetricsDialog
+from appsel.dialogs.setdefaultappdialog import SetDefaultAppDialog
+from appsel.dialogs.setdefaultsbyappdialog import SetDefaultsByAppDialog
+
+# Set APPSEL_MIME_CACHE=1 to read MIME type details straight from shared-mime-info's mime.cache instead of through
+# QMimeDatabase. It starts faster, but lists file extensions in a different order than Qt for some types
+USE_MIME_CACHE = os.environ.get('APPSEL_MIME_CACHE', '') not in {'', '0'}
+
+class AppSelector(QMainWindow):
+    """App Selector main window"""
+
+    def __init__(self, app, uifile, manager: MimeTypesManager = None, type_info=None):
+        super().__init__()
+        self._app = app
+        self._ui = loadUi(uifile, self)
+        self._ui.show()
+
+        # Initialize backend. A manager can be passed in to run against another XDG tree (see appsel.guibench)
+        self.manager = manager or MimeTypesManager(DesktopEntriesList())
+        self.desktop_entries = self.manager.desktop_entries
+        if type_info is None:
+            mime_cache = MimeCacheDatabase(fs=self.manager.fs) if USE_MIME_CACHE else None
+            type_info = mime_cache if mime_cache and mime_cache.caches else utils.QMimeDatabaseTypeInfo()
+        self.type_info = type_info
+        self.mimetypesmodel = MimeTypesListModel(self.manager, type_info=self.type_info)
+        # Grouped view of the same types, created the first time it is shown
+        self.mimetypestreemodel = None
+        # Shared by the main apps list and the app pickers in dialogs
+        self.app_catalog = AppCatalog(self.manager)
+        self.appslistmodel = AppsListModel(self.manager, app_catalog=self.app_catalog)
+
+        # Filter models
+        self.filteredmimetypesmodel = FilteredMimeTypesModel(self)
+        self.filteredmimetypesmodel.setFilterCaseSensitivity(False)
+        self.filteredmimetypesmodel.setSourceModel(self.mimetypesmodel)
+        self.filteredmimetypesmodel.setFilterKeyColumn(-1)  # search all columns
+        self.filteredmimetypesmodel.setSortRole(utils.SortKeyRole)
+        self.filteredmimetypesmodel.sort(0, Qt.AscendingOrder)
+        self.filteredappslistmodel = FilteredAppsListModel(self, self.manager, self._ui)
+        self.filteredappslistmodel.setFilterCaseSensitivity(False)
+        self.filteredappslistmodel.setSortRole(utils.SortKeyRole)
+        self.filteredappslistmodel.setSourceModel(self.appslistmodel)
+
+        # UI bindings - select by MIME type tab
+        self._ui.typesView.setModel(self.filteredmimetypesmodel)
+        self._ui.typesView.activated.connect(self.configure_default_app)
+        self._ui.typesView.sizeHintForColumn = self.types_view_size_hint
+        self._ui.typesView.resizeColumnsToContents()
+        self._ui.typesSearchBar.textChanged.connect(self.filter_types)
+        for kind in TypeKind:
+            self._ui.typesKindComboBox.addItem(kind.value, kind)
+        self._ui.typesKindComboBox.setCurrentIndex(list(TypeKind).index(self.filteredmimetypesmodel.kind))
+        self._ui.typesKindComboBox.currentIndexChanged.connect(self.filter_types_by_kind)
+        self._ui.typesTreeView.activated.connect(self.configure_default_app_from_tree)
+        self._ui.groupTypesCheckBox.stateChanged.connect(self.set_types_grouped)
+
+        # UI bindings - select by app tab
+        self._ui.appsView.setModel(self.filteredappslistmodel)
+        self._ui.appsView.activated.connect(self.configure_defaults_by_app)
+        self._ui.appsView.sizeHintForColumn = self.apps_view_size_hint
+        self._ui.appsView.resizeColumnsToContents()
+        self._ui.appsSearchBar.textChanged.connect(self.filteredappslistmodel.setFilterFixedString)
+        self._ui.showAllAppsCheckBox.stateChanged.connect(self.filteredappslistmodel.invalidate)
+
+        # Hidden debug panel for performance metrics (see appsel.backend.metrics)
+        if metrics.ENABLED:
+            self.metrics_shortcut = QShortcut(QKeySequence("Ctrl+Shift+M"), self)
+            self.metrics_shortcut.activated.connect(self.show_metrics)
+
+    def show_metrics(self):
+        """Launches the performance metrics panel."""
+        return MetricsDialog(parent=self)
+
+    def filter_types(self, text):
+        """Filters the MIME types list by a search query."""
+        with metrics.ui_action("filter types"):
+            if self.mimetypestreemodel is not None and self._ui.groupTypesCheckBox.isChecked():
+                self.mimetypestreemodel.set_filter(text)
+            else:
+                self.filteredmimetypesmodel.setFilterFixedString(text)
+
+    def filter_types_by_kind(self, combo_index):
+        """Filters the MIME types list by kind (file types with or without apps, URL handlers)."""
+        with metrics.ui_action("filter types by kind"):
+            self.filteredmimetypesmodel.set_kind(self._ui.typesKindComboBox.itemData(combo_index))
+
+    def set_types_grouped(self, grouped):
+        """Switches between the flat and grouped views of MIME types."""
+        with metrics.ui_action("toggle grouped types"):
+            if grouped and self.mimetypestreemodel is None:
+                # The grouped view shows every kind of type, e.g. URL handlers under x-scheme-handler/
+                self.mimetypestreemodel = MimeTypesTreeModel(self.manager, list(self.mimetypesmodel.catalog),
+                                                             type_info=self.type_info)
+                self._ui.typesTreeView.setModel(self.mimetypestreemodel)
+                self._ui.typesTreeView.setColumnWidth(0, self.types_view_size_hint(0))
+            self._ui.typesView.setVisible(not grouped)
+            self._ui.typesKindComboBox.setEnabled(not grouped)
+            self._ui.typesTreeView.setVisible(bool(grouped))
+            # Apply the current search to the view being shown
+            self.filter_types(self._ui.typesSearchBar.text())
+
+    def types_view_size_hint(self, column):
+        if column in {1, 2}:  # File Extensions, Status
+            return int(self.width() * 0.15)
+        else:
+            return int(self.width() * 0.32)
+
+    def apps_view_size_hint(self, column):
+        if column in {0}:  # App name
+            return int(self.width() * 0.5)
+        else:
+            return int(self.width() * 0.15)
+
+    def configure_default_app(self, index):
+        """Launches a dialog to set the default app for a MIME type."""
+        unfiltered_index = self.filteredmimetypesmodel.mapToSource(index)
+        mimetype = self.mimetypesmodel.mimetypes[unfiltered_index.row()]
+        with metrics.ui_action("open SetDefaultAppDialog"):
+            return SetDefaultAppDialog(self.manager, mimetype, parent=self)
+
+    def configure_default_app_from_tree(self, index):
+        """Launches a dialog to set the default app for a MIME type in the grouped view."""
+        mimetype = self.mimetypestreemodel.get_mimetype(index)
+        if mimetype is not None:  # Activating a group row just expands it
+            with metrics.ui_action("open SetDefaultAppDialog"):
+                return SetDefaultAppDialog(self.manager, mimetype, parent=self)
+        return None
+
+    def configure_defaults_by_app(self, index):
+        """Launches a dialog to set default associations by application."""
+        unfiltered_index = self.filteredappslistmodel.mapToSource(index)
+        app_id = self.appslistmodel.apps[unfiltered_index.row()]
+        with metrics.ui_action("open SetDefaultsByAppDialog"):
+            return SetDefaultsByAppDialog(self.manager, app_id, parent=self)
+
+    def refresh(self):
+        """Refresh root-level model instances."""
+        logging.debug("Called root refresh() method")
+        with metrics.ui_action("refresh main window"):
+            self.mimetypesmodel.refresh()
+            if self.mimetypestreemodel is not None:
+                self.mimetypestreemodel.refresh()
+            self.appslistmodel.refresh()
+
+def main():
+    """Entrypoint: runs program and inits UI"""
+    logging.basicConfig(level=logging.DEBUG)
+    app = QApplication(sys.argv)
+    app.setApplicationName('appsel')
+    app.setApplicationVersion(__version__)
+    with metrics.ui_action("open main window"):
+        AppSelector(app, "ui/appsel.ui")
+    sys.exit(app.exec_())
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Scripted GUI performance scenarios, run on the offscreen Qt platform against a generated corpus.
+
+    python3 -m appsel.guibench --apps 500 --types 5000 --budget "select all=800"
+
+Interactions are driven through QTest like a user would (typing, clicking headers and buttons). For each action the
+latency (until pending events are processed) and the longest time the event loop was blocked are recorded, and the
+run exits with status 1 if any action goes over its budget. Must be run from the repository root, like main.py.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional
+
+# Without a display server, Qt needs the offscreen platform. This must be set before QApplication is created
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+# pylint: disable=wrong-import-position
+from PyQt5.QtCore import QPoint, Qt, QTimer
+from PyQt5.QtTest import QTest
+from PyQt5.QtWidgets import QApplication
+
+from appsel.backend import metrics, utils
+from appsel.backend.corpus import generate_corpus
+from appsel.gui import AppSelector
+
+# Interval of the heartbeat timer used to detect event loop blocking, in milliseconds
+HEARTBEAT_INTERVAL = 5
+# How long to keep the event loop running after each action, so that deferred work (e.g. repaints) is measured too
+SETTLE_TIME = 50
+SEARCH_QUERY = 'video/x'
+# Per action latency budgets, in milliseconds
+DEFAULT_BUDGETS = {
+    "open main window": 3000,
+    "search keystroke": 100,
+    "clear search": 200,
+    "sort by default application": 500,
+    "sort by MIME type": 500,
+    "open SetDefaultsByAppDialog": 1000,
+    "select all": 1000,
+}
+DEFAULT_BLOCKING_BUDGET = 3000
+
+@dataclass
+class ActionResult:
+    """Timings of one scripted action, in milliseconds."""
+    name: str
+    latency: float
+    blocking: float
+    budget: Optional[float]
+
+    @property
+    def over_budget(self) -> bool:
+        """Returns whether the action took longer than its budget."""
+        return self.budget is not None and self.latency > self.budget
+
+class EventLoopMonitor():
+    """
+    Detects event loop blocking with a heartbeat timer: the longest gap between two ticks, minus the timer interval,
+    is the longest time no events were processed.
+    """
+    def __init__(self, interval: int = HEARTBEAT_INTERVAL):
+        self.interval = interval
+        self.timer = QTimer()
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self._tick)
+        self._last_tick = time.perf_counter()
+        self.max_gap = 0.0
+
+    def _tick(self):
+        now = time.perf_counter()
+        self.max_gap = max(self.max_gap, now - self._last_tick)
+        self._last_tick = now
+
+    def start(self):
+        """Starts the heartbeat."""
+        self._last_tick = time.perf_counter()
+        self.timer.start()
+
+    def reset(self) -> float:
+        """Returns the longest blocking time (in milliseconds) since the last reset, and starts a new measurement."""
+        self._tick()
+        blocking = max(self.max_gap * 1e3 - self.interval, 0.0)
+        self.max_gap = 0.0
+        return blocking
+
+class ScenarioRunner():
+    """Runs actions from inside the event loop, and records their timings."""
+    def __init__(self, budgets: Dict[str, float], blocking_budget: float):
+        self.budgets = budgets
+        self.blocking_budget = blocking_budget
+        self.results: List[ActionResult] = []
+        self.monitor = EventLoopMonitor()
+        self.monitor.start()
+
+    def run(self, name: str, action: Callable[[], object]):
+        """Runs an action once the event loop is idle, waits for it to settle, and returns the action's result."""
+        QTest.qWait(SETTLE_TIME)
+        self.monitor.reset()
+        outcome = {}
+
+        def dispatch():
+            start = time.perf_counter()
+            try:
+                with metrics.ui_action(f"guibench: {name}"):
+                    outcome['result'] = action()
+                    QApplication.processEvents()
+            except Exception as e:  # pylint: disable=broad-except; re-raised outside of the event loop
+                outcome['error'] = e
+            outcome['latency'] = (time.perf_counter() - start) * 1e3
+        QTimer.singleShot(0, dispatch)
+        while 'latency' not in outcome:
+            QTest.qWait(1)
+        if 'error' in outcome:
+            raise outcome['error']
+        QTest.qWait(SETTLE_TIME)
+        self.results.append(ActionResult(name, outcome['latency'], self.monitor.reset(), self.budgets.get(name)))
+        return outcome['result']
+
+    def get_failures(self) -> List[str]:
+        """Returns a description of each action that went over its latency or blocking budget."""
+        failures = []
+        for result in self.results:
+            if result.over_budget:
+                failures.append(f"{result.name}: took {result.latency:.1f} ms (budget {result.budget:.0f} ms)")
+            if result.blocking > self.blocking_budget:
+                failures.append(f"{result.name}: blocked the event loop for {result.blocking:.1f} ms "
+                                f"(budget {self.blocking_budget:.0f} ms)")
+        return failures
+
+    def format_report(self) -> str:
+        """Returns a table of the worst latency and blocking time of each action."""
+        summary: Dict[str, List[ActionResult]] = {}
+        for result in self.results:
+            summary.setdefault(result.name, []).append(result)
+        lines = [f"{'Action':<32} {'Runs':>5} {'Max ms':>10} {'Mean ms':>10} {'Blocked ms':>11} {'Budget ms':>10}"]
+        for name, results in summary.items():
+            latencies = [result.latency for result in results]
+            budget = self.budgets.get(name)
+            lines.append(f"{name:<32} {len(results):>5} {max(latencies):>10.1f} "
+                         f"{sum(latencies) / len(latencies):>10.1f} "
+                         f"{max(result.blocking for result in results):>11.1f} "
+                         f"{'-' if budget is None else f'{budget:.0f}':>10}")
+        return '\n'.join(lines)
+
+def _click_header(view, column: int):
+    header = view.horizontalHeader()
+    position = QPoint(header.sectionViewportPosition(column) + header.sectionSize(column) // 2, header.height() // 2)
+    QTest.mouseClick(header.viewport(), Qt.LeftButton, Qt.NoModifier, position)
+
+def run_scenarios(app, corpus, runner: ScenarioRunner):
+    """Scripts the main window and SetDefaultsByAppDialog interactions."""
+    manager = corpus.create_manager()
+    type_info = utils.QMimeDatabaseTypeInfo()
+    window = runner.run("open main window", lambda: AppSelector(app, "ui/appsel.ui", manager, type_info))
+    window.resize(1280, 800)
+
+    # Select by MIME type tab
+    search_bar = window.typesSearchBar
+    search_bar.setFocus()
+    for char in SEARCH_QUERY:
+        runner.run("search keystroke", lambda char=char: QTest.keyClicks(search_bar, char))
+
+    def clear_search():
+        QTest.keyClick(search_bar, Qt.Key_A, Qt.ControlModifier)
+        QTest.keyClick(search_bar, Qt.Key_Backspace)
+    runner.run("clear search", clear_search)
+    runner.run("sort by default application", lambda: _click_header(window.typesView, 3))
+    runner.run("sort by MIME type", lambda: _click_header(window.typesView, 0))
+
+    # Select by app tab, with the app supporting the most types
+    window.tabWidget.setCurrentWidget(window.tabByApp)
+    row = window.appslistmodel.apps.index(corpus.largest_app)
+    index = window.filteredappslistmodel.mapFromSource(window.appslistmodel.index(row, 0))
+    dialog = runner.run("open SetDefaultsByAppDialog", lambda: window.configure_defaults_by_app(index))
+    runner.run("select all", lambda: QTest.mouseClick(dialog.selectAllButton, Qt.LeftButton))
+    dialog.close()
+    window.close()
+
+def _parse_budget(spec: str):
+    name, sep, budget = spec.rpartition('=')
+    if not sep or not name:
+        raise argparse.ArgumentTypeError(f"expected ACTION=MILLISECONDS, got {spec!r}")
+    try:
+        return name, float(budget)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid budget {budget!r}") from None
+
+def get_parser() -> argparse.ArgumentParser:
+    """Returns the argument parser for the benchmark."""
+    parser = argparse.ArgumentParser(prog='appsel.guibench', description="appsel GUI performance scenarios")
+    parser.add_argument('--apps', type=int, default=200, help="number of generated desktop entries")
+    parser.add_argument('--types', type=int, default=2000, help="number of generated MIME types")
+    parser.add_argument('--types-per-app', type=int, default=20, help="MIME types supported by each app")
+    parser.add_argument('--largest-app-types', type=int, default=500,
+                        help="MIME types supported by the largest app, used for the select all scenario")
+    parser.add_argument('--seed', type=int, default=0, help="random seed for the corpus")
+    parser.add_argument('--budget', type=_parse_budget, action='append', default=[], metavar='ACTION=MS',
+                        help="latency budget for an action, e.g. 'select all=500'. Can be repeated")
+    parser.add_argument('--blocking-budget', type=float, default=DEFAULT_BLOCKING_BUDGET, metavar='MS',
+                        help="longest the event loop may be blocked by any action")
+    parser.add_argument('--format', choices=['table', 'json'], default='table')
+    return parser
+
+def main(argv=None):
+    """Entrypoint: generates a corpus, runs the scenarios and reports their timings."""
+    args = get_parser().parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    budgets = dict(DEFAULT_BUDGETS, **dict(args.budget))
+
+    app = QApplication(sys.argv[:1])
+    corpus = generate_corpus(n_apps=args.apps, n_types=args.types, types_per_app=args.types_per_app,
+                             largest_app_types=args.largest_app_types, seed=args.seed)
+    runner = ScenarioRunner(budgets, args.blocking_budget)
+    run_scenarios(app, corpus, runner)
+
+    if args.format == 'json':
+        print(json.dumps([asdict(result) for result in runner.results], indent=1))
+    else:
+        print(runner.format_report())
+        if metrics.ENABLED:
+            print(metrics.registry.format_report())
+    failures = runner.get_failures()
+    for failure in failures:
+        logging.error("Over budget: %s", failure)
+    sys.exit(1 if failures else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Fast file / URL launcher: opens a file or URL with its default application.
+
+Lookups go through a precomputed index of default applications in $XDG_CACHE_HOME/appsel, so a launch only needs to
+stat the files the index was built from, classify the file using shared-mime-info's cache, and start the app. The
+full backend (every .desktop entry and mimeapps.list) is only loaded to rebuild the index when it is stale.
+
+This module deliberately imports as little as possible at startup; in particular, it never imports Qt.
+"""
+import json
+import logging
+import os
+import shlex
+import subprocess
+import sys
+import urllib.parse
+
+from typing import List
+
+from appsel.backend import xdgpaths
+from appsel.backend.filesystem import REAL_FILESYSTEM, FileSystem
+from appsel.backend.mimecache import MimeCacheDatabase
+
+INDEX_VERSION = 1
+INDEX_FILENAME = 'open-index.json'
+
+# MIME type for files that could not be classified
+DEFAULT_MIMETYPE = 'application/octet-stream'
+
+class LaunchError(Exception):
+    """Raised when a file or URL cannot be opened."""
+
+def get_index_path() -> str:
+    """Returns the path of the launcher index, $XDG_CACHE_HOME/appsel/open-index.json"""
+    return os.path.join(xdgpaths.writable_location(xdgpaths.CACHE_LOCATION), 'appsel', INDEX_FILENAME)
+
+def build_index(fs: FileSystem = REAL_FILESYSTEM) -> dict:
+    """
+    Resolves the default application for every known MIME type using the full backend, and returns the index.
+    """
+    # pylint: disable=import-outside-toplevel
+    from appsel.backend.desktopentries import DesktopEntriesList
+    from appsel.backend.mimetypesmanager import MimeTypesManager
+
+    desktop_entries = DesktopEntriesList(fs=fs)
+    manager = MimeTypesManager(desktop_entries)
+
+    defaults = {}
+    apps = {}
+    for mimetype in manager.get_all_mimetypes():
+        app_id = manager.get_default_app(mimetype)
+        if app_id is None:
+            continue
+        defaults[mimetype] = app_id
+        if app_id not in apps:
+            entry = desktop_entries.entries[app_id]
+            apps[app_id] = {
+                'exec': entry.getExec(),
+                'name': entry.getName(),
+                'icon': entry.getIcon(),
+                'terminal': bool(entry.getTerminal()),
+                'path': desktop_entries.desktop_entry_paths[app_id],
+            }
+
+    # Directories are included so that newly created files (e.g. a first ~/.config/mimeapps.list) are noticed
+    sources = manager.get_source_paths() + \
+        list(fs.iter_directories(desktop_entries.locations)) + \
+        [app['path'] for app in apps.values()]
+    return {
+        'version': INDEX_VERSION,
+        'desktops': xdgpaths.get_current_desktops(),
+        'sources': fs.get_mtimes(sources),
+        'defaults': defaults,
+        'apps': apps,
+    }
+
+def _is_fresh(index: dict, fs: FileSystem) -> bool:
+    return index.get('version') == INDEX_VERSION and index.get('desktops') == xdgpaths.get_current_desktops() and \
+        fs.get_mtimes(index['sources']) == index['sources']
+
+def load_index(path: str = None, fs: FileSystem = REAL_FILESYSTEM) -> dict:
+    """Returns the launcher index, rebuilding it if it is missing or out of date."""
+    path = path or get_index_path()
+    try:
+        index = json.loads(fs.read_text(path))
+        if _is_fresh(index, fs):
+            return index
+        logging.debug("Launcher index %s is out of date, rebuilding", path)
+    except (OSError, ValueError, KeyError):
+        logging.debug("Launcher index %s is missing or invalid, rebuilding", path)
+
+    index = build_index(fs)
+    try:
+        fs.write_atomic(path, json.dumps(index))
+    except OSError:
+        logging.warning("Could not save launcher index to %s", path, exc_info=True)
+    return index
+
+def get_mimetype(target: str, mime_cache: MimeCacheDatabase, fs: FileSystem = REAL_FILESYSTEM) -> str:
+    """Returns the MIME type for a local path or URL. URLs use x-scheme-handler/<scheme>"""
+    scheme = urllib.parse.urlsplit(target).scheme
+    if len(scheme) > 1 and scheme != 'file':  # Single letter "schemes" are more likely Windows drive letters
+        return f'x-scheme-handler/{scheme.lower()}'
+    path = _to_local_path(target)
+    if fs.is_dir(path):
+        return 'inode/directory'
+    return mime_cache.get_mimetype_for_filename(os.path.basename(path)) or DEFAULT_MIMETYPE
+
+def _to_local_path(target: str) -> str:
+    if target.startswith('file://'):
+        return urllib.parse.unquote(urllib.parse.urlsplit(target).path)
+    return target
+
+def _to_url(target: str) -> str:
+    if urllib.parse.urlsplit(target).scheme:
+        return target
+    return 'file://' + urllib.parse.quote(os.path.abspath(target))
+
+def expand_exec(app: dict, targets: List[str]) -> List[str]:
+    """
+    Expands the field codes in a desktop entry's Exec key for the given files or URLs, and returns the command line.
+
+    Based off of: https://specifications.freedesktop.org/desktop-entry-spec/latest/ar01s07.html
+    """
+    args = []
+    targets_used = False
+    for arg in shlex.split(app['exec']):
+        if arg in ('%f', '%F', '%u', '%U'):
+            convert = _to_local_path if arg in ('%f', '%F') else _to_url
+            # %f and %u only take one file; extra files are dropped, as most launchers do
+            args += [convert(target) for target in (targets if arg in ('%F', '%U') else targets[:1])]
+            targets_used = True
+        elif arg == '%i':
+            if app.get('icon'):
+                args += ['--icon', app['icon']]
+        else:
+            expanded = []
+            chars = iter(arg)
+            for char in chars:
+                if char != '%':
+                    expanded.append(char)
+                    continue
+                code = next(chars, '')
+                if code == '%':
+                    expanded.append('%')
+                elif code == 'c':
+                    expanded.append(app.get('name') or '')
+                elif code == 'k':
+                    expanded.append(app.get('path') or '')
+                elif code and code in 'fFuU':
+                    # Field codes embedded in a larger argument only take a single file
+                    if targets:
+                        expanded.append((_to_local_path if code in 'fF' else _to_url)(targets[0]))
+                    targets_used = True
+                # Other codes (%d, %D, %n, %N, %v, %m) are deprecated and are removed
+            args.append(''.join(expanded))
+    if not targets_used and targets:
+        # Apps without a field code still get the file, as xdg-open does
+        args += targets
+    return args
+
+def open_targets(targets: List[str], *, dry_run: bool = False, fs: FileSystem = REAL_FILESYSTEM) -> List[List[str]]:
+    """
+    Opens files or URLs with their default applications, and returns the command lines that were run.
+    Targets with the same default app are opened in one command if the app supports multiple files.
+    """
+    index = load_index(fs=fs)
+    mime_cache = MimeCacheDatabase(fs=fs)
+
+    targets_by_app = {}
+    for target in targets:
+        mimetype = get_mimetype(target, mime_cache, fs)
+        app_id = None
+        # Fall back to ancestor types, e.g. text/plain for text/x-log, or application/octet-stream for any file
+        for candidate in [mimetype] + mime_cache.get_ancestors(mimetype):
+            app_id = index['defaults'].get(candidate)
+            if app_id:
+                break
+        if app_id is None:
+            raise LaunchError(f"No application found to open {target} ({mimetype})")
+        targets_by_app.setdefault(app_id, []).append(target)
+
+    commands = []
+    for app_id, app_targets in targets_by_app.items():
+        app = index['apps'][app_id]
+        if '%F' in app['exec'] or '%U' in app['exec']:
+            app_commands = [expand_exec(app, app_targets)]
+        else:
+            app_commands = [expand_exec(app, [target]) for target in app_targets]
+        if app['terminal']:
+            terminal = os.environ.get('TERMINAL', 'xterm')
+            app_commands = [[terminal, '-e'] + command for command in app_commands]
+        commands += app_commands
+
+    for command in commands:
+        logging.debug("Running %s", command)
+        if not dry_run:
+            subprocess.Popen(command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,  # pylint: disable=consider-using-with
+                             stderr=subprocess.DEVNULL, start_new_session=True)
+    return commands
+
+def main(argv=None):
+    """Entrypoint for the launcher: opens each file or URL given on the command line"""
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv:
+        print("usage: python3 -m appsel.launcher FILE|URL...", file=sys.stderr)
+        sys.exit(2)
+    try:
+        open_targets(argv)
+    except LaunchError as e:
+        print(f"appsel: {e}", file=sys.stderr)
+        sys.exit(4)
+
+if __name__ == '__main__':
+    main()
@@ -3,7 +3,7 @@
 appsel entrypoint.
 """
 
-from appsel import main
+from appsel.gui import main
 
 if __name__ == '__main__':
     main()
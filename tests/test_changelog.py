@@ -0,0 +1,127 @@
+import json
+
+import pytest
+
+from appsel.backend.changelog import Change, ChangeKind, ChangeLog, compact_changes, export_delta, load_delta
+from appsel.backend.filesystem import MemoryFileSystem, RealFileSystem
+from appsel.backend.mimetypesmanager import MimeTypesManager
+
+LOG_PATH = '/state/appsel/changes.jsonl'
+
+def test_sequence_numbers_start_at_one():
+    log = ChangeLog(LOG_PATH, MemoryFileSystem())
+    assert log.get_last_sequence() == 0
+    assert log.record(ChangeKind.SET_DEFAULT, 'text/plain', 'a.desktop').sequence == 1
+    assert [change.sequence for change in log.record_all([(ChangeKind.ADD_ASSOCIATION, 'text/plain', 'b.desktop', None),
+                                                          (ChangeKind.CLEAR_DEFAULT, 'image/png', None, 'a.desktop')])] \
+        == [2, 3]
+    assert [change.sequence for change in ChangeLog(LOG_PATH, log.fs).changes] == [1, 2, 3]
+
+def test_logs_sharing_a_file_get_unique_sequence_numbers():
+    fs = MemoryFileSystem()
+    first, second = ChangeLog(LOG_PATH, fs), ChangeLog(LOG_PATH, fs)
+    assert first.changes == [] and second.changes == []
+    first.record(ChangeKind.SET_DEFAULT, 'text/plain', 'a.desktop')
+    second.record(ChangeKind.SET_DEFAULT, 'image/png', 'b.desktop')
+    first.record(ChangeKind.CLEAR_DEFAULT, 'image/png', previous_app='b.desktop')
+    assert [change.sequence for change in first.changes] == [1, 2, 3]
+    assert first.export_delta()['last_sequence'] == 3
+    assert second.export_delta()['last_sequence'] == 3
+
+def test_sequence_numbers_on_disk(tmp_path):
+    path = str(tmp_path / 'appsel' / 'changes.jsonl')
+    first, second = ChangeLog(path, RealFileSystem()), ChangeLog(path, RealFileSystem())
+    for i in range(3):
+        first.record(ChangeKind.SET_DEFAULT, f'text/x-{i}', 'a.desktop')
+        second.record(ChangeKind.SET_DEFAULT, f'image/x-{i}', 'b.desktop')
+    assert [change.sequence for change in ChangeLog(path).changes] == list(range(1, 7))
+
+def test_incomplete_and_invalid_lines():
+    fs = MemoryFileSystem({LOG_PATH: '{"sequence": 1, "kind": "set_default", "mimetype": "text/plain"}\n'
+                                     'not json\n'
+                                     '{"sequence": 2, "kind": "unknown", "mimetype": "text/plain"}\n'
+                                     '{"sequence": 3, "kind": "clear_def'})
+    log = ChangeLog(LOG_PATH, fs)
+    # The last line is still being written by another process
+    assert [change.sequence for change in log.changes] == [1]
+    fs.append_text(LOG_PATH, 'ault", "mimetype": "text/plain"}\n')
+    assert log.record(ChangeKind.ADD_ASSOCIATION, 'text/plain', 'a.desktop').sequence == 4
+    assert [change.sequence for change in log.changes] == [1, 3, 4]
+
+def test_replaced_file_is_read_again():
+    fs = MemoryFileSystem()
+    log = ChangeLog(LOG_PATH, fs)
+    log.record(ChangeKind.SET_DEFAULT, 'text/plain', 'a.desktop')
+    log.record(ChangeKind.SET_DEFAULT, 'text/plain', 'b.desktop')
+    fs.write_bytes(LOG_PATH, b'')
+    assert log.record(ChangeKind.SET_DEFAULT, 'image/png', 'a.desktop').sequence == 1
+
+def test_compaction_keeps_last_change_and_first_previous_app():
+    changes = [
+        Change(1, ChangeKind.SET_DEFAULT, 'text/plain', 'a.desktop', previous_app='old.desktop'),
+        Change(2, ChangeKind.ADD_ASSOCIATION, 'text/plain', 'b.desktop'),
+        Change(3, ChangeKind.SET_DEFAULT, 'text/plain', 'c.desktop', previous_app='a.desktop'),
+        Change(4, ChangeKind.REMOVE_ASSOCIATION, 'text/plain', 'b.desktop'),
+    ]
+    assert compact_changes(changes) == [
+        Change(3, ChangeKind.SET_DEFAULT, 'text/plain', 'c.desktop', previous_app='old.desktop'),
+        Change(4, ChangeKind.REMOVE_ASSOCIATION, 'text/plain', 'b.desktop'),
+    ]
+
+def test_compaction_drops_reverted_defaults():
+    changes = [
+        Change(1, ChangeKind.SET_DEFAULT, 'text/plain', 'a.desktop', previous_app='old.desktop'),
+        Change(2, ChangeKind.SET_DEFAULT, 'text/plain', 'old.desktop', previous_app='a.desktop'),
+        Change(3, ChangeKind.SET_DEFAULT, 'image/png', 'a.desktop'),
+        Change(4, ChangeKind.CLEAR_DEFAULT, 'image/png', previous_app='a.desktop'),
+    ]
+    assert compact_changes(changes) == []
+
+def test_export_delta_since():
+    changes = [Change(1, ChangeKind.SET_DEFAULT, 'text/plain', 'a.desktop'),
+               Change(2, ChangeKind.SET_DEFAULT, 'image/png', 'a.desktop')]
+    delta = export_delta(changes, since=1)
+    assert delta['since'] == 1 and delta['last_sequence'] == 2
+    assert load_delta(json.loads(json.dumps(delta))) == changes[1:]
+    assert export_delta([], since=5) == {'since': 5, 'last_sequence': 5, 'changes': []}
+
+@pytest.mark.parametrize('data', [
+    {},
+    {'changes': None},
+    {'changes': [{'kind': 'set_default', 'mimetype': 'text/plain'}]},
+    {'changes': [{'sequence': 'one', 'kind': 'set_default', 'mimetype': 'text/plain'}]},
+    {'changes': [{'sequence': 1, 'kind': 'rename', 'mimetype': 'text/plain'}]},
+    {'changes': ['set_default']},
+])
+def test_load_delta_rejects_invalid_deltas(data):
+    with pytest.raises(ValueError):
+        load_delta(data)
+
+class FakeDesktopEntries():
+    """The parts of DesktopEntriesList used by the manager."""
+    def __init__(self, app_ids, fs):
+        self.entries = dict.fromkeys(app_ids)
+        self.desktop_entry_paths = {app_id: f'/apps/{app_id}' for app_id in app_ids}
+        self.fs = fs
+
+def create_manager(**kwargs):
+    fs = MemoryFileSystem({'/config/mimeapps.list': '[Default Applications]\ntext/plain=a.desktop\n'})
+    return MimeTypesManager(FakeDesktopEntries(['a.desktop', 'b.desktop'], fs), paths=['/config/mimeapps.list'],
+                            cache_paths=[], **kwargs)
+
+def test_manager_records_changes_once_written():
+    manager = create_manager(change_log_path=LOG_PATH)
+    manager.set_default_app('text/plain', 'b.desktop')
+    manager.clear_default_app('text/plain')
+    manager.add_association('image/png', 'a.desktop')
+    assert [str(change) for change in ChangeLog(LOG_PATH, manager.fs).changes] == [
+        '#1 set_default text/plain b.desktop', '#2 clear_default text/plain', '#3 add_association image/png a.desktop']
+    assert manager.export_changes(since=2)['last_sequence'] == 3
+
+def test_manager_of_other_files_keeps_no_log(tmp_path, monkeypatch):
+    monkeypatch.setenv('XDG_STATE_HOME', str(tmp_path))
+    manager = create_manager()
+    manager.set_default_app('text/plain', 'b.desktop')
+    assert manager.change_log is None
+    assert manager.export_changes() == {'since': 0, 'last_sequence': 0, 'changes': []}
+    assert not list(tmp_path.iterdir())
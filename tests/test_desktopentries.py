@@ -0,0 +1,46 @@
+import re
+
+import pytest
+
+pytest.importorskip('xdg.DesktopEntry')
+
+# pylint: disable=wrong-import-position
+import xdg.DesktopEntry
+import xdg.Exceptions
+
+from appsel.backend.desktopentries import DesktopEntriesList, parse_desktop_entry
+from appsel.backend.filesystem import MemoryFileSystem
+
+ENTRY = '[Desktop Entry]\nType=Application\nName=Viewer\nMimeType=image/png;\n'
+
+@pytest.mark.parametrize('text', [
+    ENTRY,
+    # A repeated group starts over, and a repeated key replaces the earlier value
+    ENTRY + '[Desktop Action new]\nName=New\n[Desktop Entry]\nName=Viewer 2\nName = Viewer 3\nExec=viewer\n',
+    '# Comment\n\n  [KDE Desktop Entry]  \r\nName=Old\rIcon=old\n',
+    '[Desktop Entry\nName=Unclosed\n',
+    'Name=Viewer\n[Desktop Entry]\n',
+    ENTRY + 'not a key\n',
+    '[Other]\nName=Viewer\n',
+    # Only \n, \r\n and \r end lines
+    '[Desktop Entry]\nName=Page\x0cbreak\u2028here\n',
+])
+def test_parsed_like_pyxdg(tmp_path, text):
+    path = tmp_path / 'viewer.desktop'
+    path.write_bytes(text.encode())
+    try:
+        expected = xdg.DesktopEntry.DesktopEntry(str(path))
+    except xdg.Exceptions.ParsingError as e:
+        with pytest.raises(xdg.Exceptions.ParsingError, match=re.escape(e.msg)):
+            parse_desktop_entry(str(path), text)
+        return
+    entry = parse_desktop_entry(str(path), text)
+    assert (entry.content, entry.defaultGroup, entry.filename) == \
+        (expected.content, expected.defaultGroup, expected.filename)
+
+def test_invalid_entries_are_skipped():
+    fs = MemoryFileSystem({'/apps/viewer.desktop': ENTRY, '/apps/broken.desktop': 'Name=Broken\n'})
+    desktop_entries = DesktopEntriesList(['/apps'], fs=fs)
+    assert list(desktop_entries.entries) == ['viewer.desktop']
+    assert desktop_entries.get_name('viewer.desktop') == 'Viewer'
+    assert 'broken.desktop' not in desktop_entries.desktop_entry_paths
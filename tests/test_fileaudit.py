@@ -0,0 +1,98 @@
+import fnmatch
+
+import pytest
+
+pytest.importorskip('PyQt5.QtCore')
+
+# pylint: disable=wrong-import-position
+from appsel.backend import fileaudit
+from appsel.backend.fileaudit import FileHandlerResolver
+
+class FakeMimeType():
+    def __init__(self, name, globs):
+        self._name = name
+        self._globs = globs
+
+    def name(self):
+        return self._name
+
+    def globPatterns(self):
+        return self._globs
+
+class FakeMimeDatabase():
+    """Matches file names like QMimeDatabase: the longest matching glob wins. Counts name lookups."""
+    TYPES = [
+        FakeMimeType('text/plain', ['*.txt']),
+        FakeMimeType('text/x-cmake', ['*.cmake', 'CMakeLists.txt']),
+        FakeMimeType('application/gzip', ['*.gz']),
+        FakeMimeType('application/x-compressed-tar', ['*.tar.gz']),
+        FakeMimeType('image/jpeg', ['*.jpg', '*.jpeg']),
+        FakeMimeType('text/x-c++src', ['*.C', '*.cpp']),
+        FakeMimeType('text/x-csrc', ['*.c']),
+        FakeMimeType('text/x-readme', ['README*']),
+        FakeMimeType('application/x-ambiguous-a', ['*.amb']),
+        FakeMimeType('application/x-ambiguous-b', ['*.amb']),
+    ]
+
+    def __init__(self):
+        self.lookups = 0
+
+    def allMimeTypes(self):
+        return self.TYPES
+
+    def mimeTypesForFileName(self, filename):
+        self.lookups += 1
+        # Globs match case-insensitively, but a case-sensitive match (e.g. *.C for main.C) takes precedence
+        matches = [(len(glob), mimetype) for mimetype in self.TYPES for glob in mimetype.globPatterns()
+                   if fnmatch.fnmatchcase(filename, glob)]
+        if not matches:
+            matches = [(len(glob), mimetype) for mimetype in self.TYPES for glob in mimetype.globPatterns()
+                       if fnmatch.fnmatchcase(filename.lower(), glob.lower())]
+        longest = max((length for length, _mimetype in matches), default=0)
+        return [mimetype for length, mimetype in matches if length == longest]
+
+    def mimeTypeForFile(self, _path, _mode):
+        return FakeMimeType('application/octet-stream', [])
+
+@pytest.fixture(name='resolver')
+def fixture_resolver():
+    return FileHandlerResolver(None, qmimedb=FakeMimeDatabase())
+
+@pytest.mark.parametrize('filename, mimetype', [
+    ('notes.txt', 'text/plain'),
+    ('NOTES.TXT', 'text/plain'),
+    ('CMakeLists.txt', 'text/x-cmake'),
+    ('archive.tar.gz', 'application/x-compressed-tar'),
+    ('archive.gz', 'application/gzip'),
+    ('photo.2023-01-01.jpg', 'image/jpeg'),
+    ('main.C', 'text/x-c++src'),
+    ('main.c', 'text/x-csrc'),
+    ('README.txt', 'text/x-readme'),
+    ('data.amb', 'application/octet-stream'),
+    ('Makefile', 'application/octet-stream'),
+])
+def test_get_mimetype(resolver, filename, mimetype):
+    assert resolver.get_mimetype(f'/src/{filename}') == mimetype
+
+def test_cache_is_keyed_on_known_suffixes(resolver):
+    for filename in ['CMakeLists.txt', 'a.txt', 'b.txt', 'photo.2023-01-01.jpg', 'photo.2023-01-02.jpg',
+                     'x.tar.gz', 'y.tar.gz', 'main.C', 'main.c']:
+        resolver.get_mimetype(f'/src/{filename}')
+    assert resolver._extension_cache == {  # pylint: disable=protected-access
+        'txt': 'text/plain', 'jpg': 'image/jpeg', 'tar.gz': 'application/x-compressed-tar',
+        'C': 'text/x-c++src', 'c': 'text/x-csrc'}
+    # CMakeLists.txt is always looked up, and every other suffix only once
+    assert resolver.qmimedb.lookups == 6
+
+def test_names_matched_by_other_globs_bypass_the_cache(resolver):
+    resolver.get_mimetype('/src/a.txt')
+    assert resolver.get_mimetype('/src/CMakeLists.txt') == 'text/x-cmake'
+    assert resolver.get_mimetype('/src/README.txt') == 'text/x-readme'
+    assert resolver.get_mimetype('/src/b.txt') == 'text/plain'
+
+def test_cache_size_is_bounded(resolver, monkeypatch):
+    monkeypatch.setattr(fileaudit, 'MAX_CACHED_SUFFIXES', 2)
+    for filename in ['a.txt', 'b.jpg', 'c.gz', 'd.cpp']:
+        resolver.get_mimetype(f'/src/{filename}')
+    assert len(resolver._extension_cache) == 2  # pylint: disable=protected-access
+    assert resolver.get_mimetype('/src/e.cpp') == 'text/x-c++src'
@@ -0,0 +1,31 @@
+from appsel.backend.filesystem import MemoryFileSystem
+from appsel.backend.fingerprint import AssociationFingerprint, compare_fingerprints
+from appsel.backend.mimetypesmanager import MimeTypesManager
+
+class FakeDesktopEntries():
+    """The parts of DesktopEntriesList used by the manager."""
+    def __init__(self, app_ids, fs):
+        self.entries = dict.fromkeys(app_ids)
+        self.desktop_entry_paths = {app_id: f'/apps/{app_id}' for app_id in app_ids}
+        self.fs = fs
+
+def create_manager(fs):
+    return MimeTypesManager(FakeDesktopEntries(['a.desktop', 'b.desktop'], fs), paths=['/config/mimeapps.list'],
+                            cache_paths=[], change_log_path=None)
+
+def test_incremental_updates_match_a_fresh_fingerprint():
+    fs = MemoryFileSystem({'/config/mimeapps.list': '[Default Applications]\ntext/plain=a.desktop\n'})
+    manager = create_manager(fs)
+    fingerprint = AssociationFingerprint(manager)
+    empty = fingerprint.to_dict()
+
+    manager.add_association('image/png', 'b.desktop')
+    manager.add_association('text/html', 'b.desktop')
+    assert fingerprint.to_dict() == AssociationFingerprint(create_manager(fs)).to_dict()
+    assert compare_fingerprints(empty, fingerprint.to_dict()) == ['image/png', 'text/html']
+
+    # Removing every entry for a type drops it, and its media type once that is empty too
+    manager.remove_association('image/png', 'b.desktop')
+    manager.remove_association('text/html', 'b.desktop')
+    assert fingerprint.to_dict() == AssociationFingerprint(create_manager(fs)).to_dict() == empty
+    assert list(fingerprint.get_group_hashes()) == ['text']
@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+
+pytest.importorskip('PyQt5.QtWidgets')
+pytest.importorskip('xdg.DesktopEntry')
+
+# pylint: disable=wrong-import-position
+from PyQt5.QtWidgets import QApplication
+
+from appsel import guibench
+from appsel.backend.corpus import generate_corpus
+
+REPOSITORY_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+@pytest.fixture(name='app', scope='module')
+def fixture_app():
+    return QApplication.instance() or QApplication(sys.argv[:1])
+
+def test_scenarios_stay_within_budget(app, monkeypatch):
+    # The main window loads its .ui files relative to the repository root
+    monkeypatch.chdir(REPOSITORY_ROOT)
+    corpus = generate_corpus(n_apps=50, n_types=500, largest_app_types=200)
+    runner = guibench.ScenarioRunner(guibench.DEFAULT_BUDGETS, guibench.DEFAULT_BLOCKING_BUDGET)
+    guibench.run_scenarios(app, corpus, runner)
+
+    assert {result.name for result in runner.results} == set(guibench.DEFAULT_BUDGETS)
+    assert runner.get_failures() == []
+
+def test_over_budget_actions_are_reported(app):  # pylint: disable=unused-argument; timers need a QApplication
+    runner = guibench.ScenarioRunner({'slow': 10}, blocking_budget=100)
+    runner.results.append(guibench.ActionResult('slow', latency=25.0, blocking=150.0, budget=10))
+    assert runner.get_failures() == ["slow: took 25.0 ms (budget 10 ms)",
+                                     "slow: blocked the event loop for 150.0 ms (budget 100 ms)"]
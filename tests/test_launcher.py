@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from appsel import launcher
+from appsel.backend.filesystem import MemoryFileSystem
+from appsel.launcher import LaunchError, expand_exec, get_mimetype, open_targets
+
+APP = {'exec': '', 'name': 'Viewer', 'icon': 'viewer', 'path': '/usr/share/applications/viewer.desktop'}
+
+def expand(exec_line, targets):
+    return expand_exec(dict(APP, exec=exec_line), targets)
+
+@pytest.mark.parametrize('code, expected', [
+    ('%f', ['viewer', '/tmp/a b']),
+    ('%F', ['viewer', '/tmp/a b', '/tmp/c']),
+    ('%u', ['viewer', 'file:///tmp/a%20b']),
+    ('%U', ['viewer', 'file:///tmp/a%20b', 'file:///tmp/c']),
+])
+def test_standalone_field_codes(code, expected):
+    assert expand(f'viewer {code}', ['/tmp/a b', '/tmp/c']) == expected
+
+def test_urls_are_converted_to_paths_for_file_codes():
+    assert expand('viewer %f', ['file:///tmp/a%20b']) == ['viewer', '/tmp/a b']
+    assert expand('viewer %u', ['https://example.org/']) == ['viewer', 'https://example.org/']
+
+def test_embedded_field_codes_convert_the_file():
+    assert expand('viewer --url=%u --path=%f', ['/tmp/a b']) == \
+        ['viewer', '--url=file:///tmp/a%20b', '--path=/tmp/a b']
+
+def test_embedded_field_code_takes_a_single_file():
+    assert expand('viewer --open=%U', ['/tmp/a', '/tmp/b']) == ['viewer', '--open=file:///tmp/a']
+
+def test_trailing_percent_does_not_consume_the_file():
+    # A lone % is invalid and dropped; since there is no field code the file is appended
+    assert expand('viewer 100%', ['/tmp/a']) == ['viewer', '100', '/tmp/a']
+
+def test_escaped_percent_and_deprecated_codes():
+    assert expand('viewer --zoom=50%% %d %m', ['/tmp/a']) == ['viewer', '--zoom=50%', '', '', '/tmp/a']
+
+def test_name_location_and_icon_codes():
+    assert expand('viewer --title=%c --from=%k %i %f', ['/tmp/a']) == \
+        ['viewer', '--title=Viewer', f"--from={APP['path']}", '--icon', 'viewer', '/tmp/a']
+
+def test_icon_code_without_icon_is_removed():
+    assert expand_exec({'exec': 'viewer %i %f'}, ['/tmp/a']) == ['viewer', '/tmp/a']
+
+def test_no_field_code_appends_targets():
+    assert expand('viewer --new-window', ['/tmp/a', '/tmp/b']) == ['viewer', '--new-window', '/tmp/a', '/tmp/b']
+
+def test_no_targets():
+    assert expand('viewer %F', []) == ['viewer']
+    assert expand('viewer --open=%u', []) == ['viewer', '--open=']
+
+class FakeMimeCache():
+    """The parts of MimeCacheDatabase used by the launcher."""
+    PARENTS = {'text/x-log': ['text/plain', 'application/octet-stream'], 'application/x-data': ['application/octet-stream']}
+
+    def __init__(self, fs=None):
+        self.fs = fs
+
+    def get_mimetype_for_filename(self, filename):
+        return {'.log': 'text/x-log', '.bin': 'application/x-data'}.get(filename[filename.rfind('.'):])
+
+    def get_ancestors(self, mimetype):
+        return self.PARENTS.get(mimetype, [])
+
+def test_get_mimetype():
+    fs = MemoryFileSystem({'/home/user/docs/build.log': ''})
+    assert get_mimetype('/home/user/docs', FakeMimeCache(), fs) == 'inode/directory'
+    assert get_mimetype('file:///home/user/docs/build.log', FakeMimeCache(), fs) == 'text/x-log'
+    assert get_mimetype('/home/user/docs/unknown', FakeMimeCache(), fs) == 'application/octet-stream'
+    assert get_mimetype('HTTPS://example.org/', FakeMimeCache(), fs) == 'x-scheme-handler/https'
+
+def test_ancestor_types_are_used_when_there_is_no_default(monkeypatch):
+    monkeypatch.setattr(launcher, 'MimeCacheDatabase', FakeMimeCache)
+    apps = {app_id: {'exec': f'{app_id} %F', 'terminal': False} for app_id in ('editor', 'hexedit')}
+    fs = MemoryFileSystem({launcher.get_index_path(): json.dumps({
+        'version': launcher.INDEX_VERSION, 'desktops': launcher.xdgpaths.get_current_desktops(), 'sources': {},
+        'defaults': {'text/plain': 'editor', 'application/octet-stream': 'hexedit'}, 'apps': apps})})
+    assert open_targets(['a.log', 'b.bin'], dry_run=True, fs=fs) == [['editor', 'a.log'], ['hexedit', 'b.bin']]
+    with pytest.raises(LaunchError):
+        open_targets(['https://example.org/'], dry_run=True, fs=fs)
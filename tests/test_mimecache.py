@@ -0,0 +1,108 @@
+import struct
+
+import pytest
+
+from appsel.backend.filesystem import MemoryFileSystem
+from appsel.backend.mimecache import MimeCacheDatabase
+
+def build_cache(literals=(), suffixes=(), globs=(), parents=None):
+    """
+    Builds a mime.cache holding only filename patterns and parent types. The pattern arguments are lists of
+    (pattern, MIME type, weight); suffixes are given without the leading *. parents maps MIME types to their parents.
+    """
+    data = bytearray(struct.pack('>HH9I', 1, 2, *[0] * 9))
+    strings = {}
+
+    def add(payload):
+        offset = len(data)
+        data.extend(payload)
+        return offset
+
+    def string(text):
+        if text not in strings:
+            strings[text] = add(text.encode() + b'\0')
+        return strings[text]
+
+    def glob_list(entries):
+        return add(struct.pack('>I', len(entries)) + b''.join(
+            struct.pack('>III', string(pattern), string(mimetype), weight)
+            for pattern, mimetype, weight in sorted(entries)))
+
+    def tree_nodes(tree):
+        # Leaves (character 0) sort first, then children by character
+        children = sorted(tree.items(), key=lambda item: item[0])
+        packed = []
+        for character, child in children:
+            if character == 0:
+                mimetype, weight = child
+                packed.append(struct.pack('>III', 0, string(mimetype), weight))
+            else:
+                n_children, first_child = tree_nodes(child)
+                packed.append(struct.pack('>III', character, n_children, first_child))
+        return len(packed), add(b''.join(packed))
+
+    tree = {}
+    for suffix, mimetype, weight in suffixes:
+        node = tree
+        for char in reversed(suffix):
+            node = node.setdefault(ord(char), {})
+        node[0] = (mimetype, weight)
+
+    empty_list = add(struct.pack('>I', 0))
+    literal_list = glob_list(literals)
+    suffix_tree = add(struct.pack('>II', *tree_nodes(tree)))
+    other_globs = glob_list(globs)
+    parent_entries = [(string(mimetype), add(struct.pack(f'>{len(names) + 1}I', len(names), *map(string, names))))
+                      for mimetype, names in sorted((parents or {}).items())]
+    parent_list = add(struct.pack('>I', len(parent_entries)) +
+                      b''.join(struct.pack('>II', *entry) for entry in parent_entries))
+    struct.pack_into('>9I', data, 4, empty_list, parent_list, literal_list, suffix_tree, other_globs,
+                     empty_list, empty_list, empty_list, empty_list)
+    return bytes(data)
+
+@pytest.fixture(name='mime_cache')
+def fixture_mime_cache():
+    cache = build_cache(
+        literals=[('Makefile', 'text/x-makefile', 50)],
+        suffixes=[('.1', 'application/x-not-man', 40), ('.txt', 'text/plain', 50), ('.gz', 'application/gzip', 50),
+                  ('.tar.gz', 'application/x-compressed-tar', 50), ('.C', 'text/x-c++src', 50 | 0x100),
+                  ('.c', 'text/x-csrc', 50)],
+        globs=[('*.[1-9]', 'application/x-troff-man', 50), ('*.anim[1-9j]', 'video/x-anim', 50),
+               ('README*', 'text/x-readme', 10), ('*.[Aa][Bb]', 'application/x-case-sensitive', 50 | 0x100)])
+    return MimeCacheDatabase(['/mime'], fs=MemoryFileSystem({'/mime/mime.cache': cache}))
+
+@pytest.mark.parametrize('filename, mimetype', [
+    ('Makefile', 'text/x-makefile'),
+    ('notes.TXT', 'text/plain'),
+    ('archive.tar.gz', 'application/x-compressed-tar'),
+    ('main.C', 'text/x-c++src'),
+    ('main.c', 'text/x-csrc'),
+    # Only matched by complex globs
+    ('a.anim1', 'video/x-anim'),
+    ('a.ANIMJ', 'video/x-anim'),
+    ('x.aB', 'application/x-case-sensitive'),
+    ('ls.1', 'application/x-troff-man'),
+    # A higher weight wins over a longer pattern
+    ('README.txt', 'text/plain'),
+    ('README', 'text/x-readme'),
+    ('unknown', None),
+])
+def test_get_mimetype_for_filename(mime_cache, filename, mimetype):
+    assert mime_cache.get_mimetype_for_filename(filename) == mimetype
+
+@pytest.mark.parametrize('mimetype, ancestors', [
+    ('application/x-shellscript', ['application/x-executable', 'text/plain', 'application/octet-stream']),
+    ('text/x-log', ['text/plain', 'application/octet-stream']),
+    ('image/svg+xml', ['application/xml', 'text/plain', 'application/octet-stream']),
+    ('application/octet-stream', []),
+    ('inode/directory', []),
+    ('x-scheme-handler/https', []),
+])
+def test_get_ancestors(mimetype, ancestors):
+    cache = build_cache(parents={
+        'application/x-shellscript': ['application/x-executable', 'text/plain'],
+        'image/svg+xml': ['application/xml'],
+        'application/xml': ['text/plain'],
+    })
+    mime_cache = MimeCacheDatabase(['/mime'], fs=MemoryFileSystem({'/mime/mime.cache': cache}))
+    assert mime_cache.get_ancestors(mimetype) == ancestors
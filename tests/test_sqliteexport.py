@@ -0,0 +1,105 @@
+import sqlite3
+
+import pytest
+
+from appsel.backend import sqliteexport
+from appsel.backend.filesystem import MemoryFileSystem
+from appsel.backend.mimetypesmanager import MimeTypesManager
+from appsel.backend.sqliteexport import APPLICATION_ID, ForeignDatabaseError, export_database
+
+class FakeDesktopEntries():
+    """The parts of DesktopEntriesList used by the manager and the export."""
+    def __init__(self, names, fs):
+        self.entries = dict(names)
+        self.desktop_entry_paths = {app_id: f'/apps/{app_id}' for app_id in names}
+        self.fs = fs
+
+    def get_name(self, app_id):
+        return self.entries.get(app_id, app_id)
+
+    def is_shown(self, app_id, _desktops=None):
+        return True
+
+@pytest.fixture(name='manager')
+def fixture_manager():
+    fs = MemoryFileSystem({
+        '/config/mimeapps.list': '[Default Applications]\ntext/plain=editor.desktop\n',
+        '/apps/mimeinfo.cache': '[MIME Cache]\ntext/plain=viewer.desktop;editor.desktop;\nimage/png=viewer.desktop;\n',
+    })
+    desktop_entries = FakeDesktopEntries({'editor.desktop': 'Editor', 'viewer.desktop': 'Viewer'}, fs)
+    return MimeTypesManager(desktop_entries, paths=['/config/mimeapps.list'], cache_paths=['/apps/mimeinfo.cache'],
+                            change_log_path='/state/changes.jsonl')
+
+def get_tables(db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        return {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    finally:
+        conn.close()
+
+def test_export_and_reexport(manager, tmp_path):
+    db_path = str(tmp_path / 'appsel.db')
+    assert export_database(manager, db_path) > 0
+    # Nothing changed, so nothing is written
+    assert export_database(manager, db_path) == 0
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("PRAGMA application_id").fetchone()[0] == APPLICATION_ID
+    assert conn.execute("SELECT default_app, default_source FROM mimetypes WHERE mimetype = 'image/png'").fetchone() \
+        == ('viewer.desktop', 'mimeinfo.cache')
+    conn.close()
+
+def test_foreign_database_is_left_alone(manager, tmp_path):
+    db_path = str(tmp_path / 'notes.db')
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE notes (text TEXT)")
+    conn.execute("INSERT INTO notes VALUES ('keep me')")
+    conn.execute("PRAGMA user_version = 1")
+    conn.commit()
+    conn.close()
+
+    with pytest.raises(ForeignDatabaseError):
+        export_database(manager, db_path)
+    conn = sqlite3.connect(db_path)
+    assert conn.execute("SELECT text FROM notes").fetchall() == [('keep me',)]
+    conn.close()
+
+    export_database(manager, db_path, force=True)
+    assert get_tables(db_path) == sqliteexport.TABLES
+
+def test_export_without_application_id(manager, tmp_path):
+    # Exports made before the application ID was set are still recognized
+    db_path = str(tmp_path / 'appsel.db')
+    export_database(manager, db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA application_id = 0")
+    conn.commit()
+    conn.close()
+    assert export_database(manager, db_path) == 0
+
+def test_empty_database_is_used(manager, tmp_path):
+    db_path = str(tmp_path / 'empty.db')
+    sqlite3.connect(db_path).close()
+    export_database(manager, db_path)
+    assert get_tables(db_path) == sqliteexport.TABLES
+
+def test_failed_export_leaves_no_schema(manager, tmp_path, monkeypatch):
+    def fail(*_args):
+        raise RuntimeError("export failed")
+    monkeypatch.setattr(sqliteexport, '_sync_table', fail)
+    db_path = str(tmp_path / 'appsel.db')
+    with pytest.raises(RuntimeError):
+        export_database(manager, db_path)
+    assert not get_tables(db_path)
+
+def test_sync_table_writes_only_differences():
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE pairs (a TEXT, b TEXT, value TEXT, PRIMARY KEY (a, b))")
+    def sync(rows):
+        return sqliteexport._sync_table(conn, 'pairs', ('a', 'b'), ('value',), rows)  # pylint: disable=protected-access
+    assert sync([('x', '1', 'one'), ('x', '2', None), ('y', '1', 'three')]) == 3
+    assert sync([('x', '1', 'one'), ('x', '2', None), ('y', '1', 'three')]) == 0
+    # One changed, one added, one removed
+    assert sync([('x', '1', 'one'), ('x', '2', 'two'), ('z', '1', None)]) == 3
+    assert conn.execute("SELECT * FROM pairs ORDER BY a, b").fetchall() == \
+        [('x', '1', 'one'), ('x', '2', 'two'), ('z', '1', None)]
+    assert conn.execute("SELECT name FROM sqlite_temp_master").fetchall() == []
@@ -0,0 +1,13 @@
+import pytest
+
+pytest.importorskip('PyQt5.QtCore')
+
+# pylint: disable=wrong-import-position
+from appsel.backend import utils
+
+def test_missing_values_sort_last():
+    # Collation keys can contain code points above U+FFFF (the C locale returns the text itself)
+    texts = [None, 'b', '\U0001F600 emoji', 'a']
+    keys = sorted(texts, key=utils.get_optional_collation_key)
+    assert keys[-1] is None
+    assert sorted(texts[1:], key=utils.get_collation_key) == keys[:-1]